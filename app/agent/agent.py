@@ -1,19 +1,67 @@
-from langchain_core.messages import SystemMessage, HumanMessage
 from app.agent.prompt_3 import SYSTEM_PROMPT
 from app.agent.output_parser import AgentOutput
 from app.agent.intent_handler import consume_intent
+from app.agent.planner import planner, record_covered_intent, answer_accepted, covered_topics
+from app.agent.dedup import get_question_index
 from app.config import settings
 from fastapi import HTTPException
 from app.utils.llm_utils import call_llm_with_fallback, clean_json_content
+from app.utils.metrics import record_parse, record_retry
+from app.utils.tracing import traced, set_span_attributes
+import threading
 import logging
+import time
+import re
 
 logger = logging.getLogger(__name__)
 
+# "Fishing" / idea-pitching phrasings the prompt forbids
+FISHING_RE = re.compile(
+    r"are there any other|such as|would you like to add|common entities include",
+    re.IGNORECASE)
+
+
+class RepetitionStats:
+    """
+    Counts LLM turns that needed a repetition/fishing retry and the extra
+    completions those retries cost.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.retried_turns = 0
+        self.extra_calls = 0
+        self.forced_rejects = 0
+
+    def record(self, extra_calls: int, forced_reject: bool) -> None:
+        with self._lock:
+            self.turns += 1
+            self.extra_calls += extra_calls
+            if extra_calls:
+                self.retried_turns += 1
+            if forced_reject:
+                self.forced_rejects += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "turns": self.turns,
+                "retried_turns": self.retried_turns,
+                "retry_rate": self.retried_turns / self.turns if self.turns else 0.0,
+                "extra_calls": self.extra_calls,
+                "forced_rejects": self.forced_rejects,
+            }
+
+
+repetition_stats = RepetitionStats()
+
 
 class RequirementAgent:
     def __init__(self):
         pass
 
+    @traced("agent.run")
     def run(
         self,
         *,
@@ -24,8 +72,11 @@ class RequirementAgent:
         additional_questions_asked: int,
         last_question: str = None,
         asked_questions: list = [],
-        company_profile: dict = None
+        company_profile: dict = None,
+        session_id: str | None = None
     ) -> AgentOutput:
+        from langchain_core.messages import SystemMessage, HumanMessage
+        started_at = time.perf_counter()
 
         # ------------------------------------------------------------------
         # STRIKE SYSTEM LOGIC (SOLUTION C)
@@ -34,11 +85,13 @@ class RequirementAgent:
 
         # 1. Retrieve or initialize the strike counter from context
         # We use a hidden key '_meta' to store agent state without polluting requirements
-        meta_state = context.get(
-            "_meta", {"last_intent_type": None, "strike_count": 0})
+        meta_state = dict(context.get(
+            "_meta", {"last_intent_type": None, "strike_count": 0}))
 
         current_intent_type = pending_intent.get(
             "type") if pending_intent else None
+        set_span_attributes(**{"session.id": session_id, "agent.phase": phase,
+                               "agent.intent": current_intent_type})
 
         # Check if we are looping on the same intent
         if current_intent_type and current_intent_type == meta_state["last_intent_type"]:
@@ -71,9 +124,39 @@ class RequirementAgent:
             answer=answer
         )
 
-        # Save meta state back to updated_context so it persists to next turn
+        # Save meta state back to updated_context so it persists to next turn.
+        # The intent counts as covered only once the turn accepts the answer.
         updated_context["_meta"] = meta_state
 
+        # Per-session TF-IDF index of asked questions (repetition guard)
+        question_index = get_question_index(session_id, asked_questions)
+
+        # ------------------------------------------------------------------
+        # LOCAL FAST-PATH
+        # Trivially structured answers (skips, short lists) are merged above;
+        # if the next checklist item is unambiguous, no LLM call is needed.
+        # ------------------------------------------------------------------
+        if settings.local_planner_enabled and not force_move_message:
+            local_output = planner.plan(
+                pending_intent=effective_intent,
+                answer=answer,
+                updated_context=updated_context,
+                last_question=last_question,
+                question_index=question_index,
+                additional_questions_asked=additional_questions_asked
+            )
+            if local_output:
+                # The planner only moves on from answers it accepted
+                record_covered_intent(meta_state, effective_intent)
+                set_span_attributes(**{"agent.local_planner": True})
+                planner.stats.record_local(time.perf_counter() - started_at)
+                stats = planner.stats.snapshot()
+                logger.info(
+                    f"Local planner served turn ({current_intent_type} -> {local_output.pending_intent.type.value}). "
+                    f"Local turns: {stats['local_turns']}/{stats['local_turns'] + stats['llm_turns']}, "
+                    f"~{stats['estimated_saved_seconds']:.1f}s LLM latency saved.")
+                return local_output
+
         user_payload = {
             "metadata": {
                 "current_phase": phase,
@@ -82,7 +165,8 @@ class RequirementAgent:
                 "pending_intent": effective_intent,  # Send the cleared intent if stuck
                 "additional_questions_asked": additional_questions_asked
             },
-            "HISTORY_OF_ASKED_QUESTIONS": asked_questions,
+            # Compact digest instead of the full question history
+            "COVERED_TOPICS": covered_topics(updated_context, meta_state, asked_questions),
             "requirements_registry": updated_context,
             "original_registry": context,
             "company_profile": company_profile
@@ -99,127 +183,87 @@ class RequirementAgent:
 
         try:
             response = call_llm_with_fallback(
-                messages, temperature=0, response_format="json_object")
+                messages, temperature=0, response_format="json_object", schema=AgentOutput, agent="requirement")
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
         # ------------------------------------------------------------------
         # CLEAN & PARSE JSON
         # ------------------------------------------------------------------
-        raw_content = response.content
-        cleaned_content = clean_json_content(raw_content)
-
-        # Extra safety: Ensure it starts and ends with {}
-        cleaned_content = cleaned_content.strip()
-
-        # If the content contains markdown JSON blocks, clean_json_content should handle it,
-        # but let's be extremely safe with raw string stripping
-        if "```json" in cleaned_content:
-            cleaned_content = cleaned_content.split(
-                "```json")[-1].split("```")[0].strip()
-        elif "```" in cleaned_content:
-            cleaned_content = cleaned_content.split(
-                "```")[-1].split("```")[0].strip()
-
-        if not cleaned_content.startswith("{"):
-            idx = cleaned_content.find("{")
-            if idx != -1:
-                cleaned_content = cleaned_content[idx:]
-
-        if not cleaned_content.endswith("}"):
-            idx = cleaned_content.rfind("}")
-            if idx != -1:
-                cleaned_content = cleaned_content[:idx+1]
+        # Single pass: fences, comments, trailing commas, truncated closers
+        cleaned_content = clean_json_content(response.content)
 
         try:
             parsed = AgentOutput.model_validate_json(cleaned_content)
             agent_output = parsed.root
+            record_parse("requirement", True)
 
             # ------------------------------------------------------------------
-            # INTERNAL REPETITION & FISHING GUARD (LOOPED)
+            # INTERNAL REPETITION & FISHING GUARD
+            # Repetition is prevented up front (COVERED_TOPICS); this local
+            # check only catches what slips through, with a bounded retry.
             # ------------------------------------------------------------------
-            max_retries = 3
+            max_retries = settings.max_repetition_retries
             current_retry = 0
-
-            def is_semantic_duplicate(new_q: str, history: list) -> bool:
-                """Check if the new question is semantically similar to any in history."""
-                new_q_lower = new_q.lower()
-
-                # Extract key entities/roles from the new question
-                # Look for patterns like 'for the X role' or 'for X'
-                import re
-                role_match = re.search(
-                    r"for (?:the )?['\"]?([^'\"?]+)['\"]?(?: role)?", new_q_lower)
-                entity_match = re.search(
-                    r"(?:data fields?|entities?|features?) (?:for|of|required for) ['\"]?([^'\"?]+)['\"]?", new_q_lower)
-
-                extracted_subject = None
-                if role_match:
-                    extracted_subject = role_match.group(1).strip()
-                elif entity_match:
-                    extracted_subject = entity_match.group(1).strip()
-
-                for hist_q in history:
-                    hist_q_lower = hist_q.lower().strip()
-
-                    # Exact match
-                    if new_q_lower == hist_q_lower:
-                        return True
-
-                    # Check if same subject/entity is mentioned in both
-                    if extracted_subject and extracted_subject in hist_q_lower:
-                        # Check if both are asking about data fields/entities/features
-                        if any(kw in new_q_lower for kw in ["data field", "entities", "workflow", "features"]) and \
-                           any(kw in hist_q_lower for kw in ["data field", "entities", "workflow", "features"]):
-                            return True
-
-                return False
+            rejected_questions = []
 
             while agent_output.status == "ASK" and current_retry < max_retries:
                 generated_q = agent_output.question.strip()
-                q_lower = generated_q.lower()
-
-                # Check for exact and semantic duplicates
-                is_duplicate = is_semantic_duplicate(
-                    generated_q, asked_questions)
-
-                # Check for "Fishing" patterns
-                is_fishing = any(pattern in q_lower for pattern in [
-                                 "are there any other", "such as", "would you like to add", "common entities include"])
 
-                if is_duplicate or is_fishing:
-                    current_retry += 1
-                    reason = "REPETITION" if is_duplicate else "FISHING/IDEA PITCHING"
-                    logger.warning(
-                        f"Loop/Fishing Detected ({reason}) [Try {current_retry}/{max_retries}]: AI generated '{generated_q}'. Retrying...")
-
-                    retry_instruction = f"STOP. You just generated: '{generated_q}'. This is forbidden because it is a {reason}. You are STRICTLY FORBIDDEN from 'fishing' for more entities or suggesting what the user might need. If you already have some data, MOVE TO THE NEXT TOPIC/INTENT IMMEDIATELY. Do not use phrases like 'Are there any other' or 'such as'. Ask a direct question about a MISSING area only."
-
-                    # Create a new message list for the retry to avoid accumulating STOP messages in the main 'messages' list if we don't want to
-                    # Actually, keeping them might help the LLM see what NOT to do.
-                    messages.append(HumanMessage(content=retry_instruction))
-
-                    response = call_llm_with_fallback(
-                        messages, temperature=0.3 + (current_retry * 0.1), response_format="json_object")
-                    cleaned_content = clean_json_content(response.content)
-                    parsed = AgentOutput.model_validate_json(cleaned_content)
-                    agent_output = parsed.root
-                else:
-                    break  # Not a duplicate/fishing
+                is_duplicate = question_index.is_duplicate(generated_q)
+                is_fishing = bool(FISHING_RE.search(generated_q))
+                if not (is_duplicate or is_fishing):
+                    break
+
+                current_retry += 1
+                reason = "REPETITION" if is_duplicate else "FISHING/IDEA PITCHING"
+                rejected_questions.append(generated_q)
+                record_retry("requirement", "repetition" if is_duplicate else "fishing")
+                logger.warning(
+                    f"Loop/Fishing Detected ({reason}) [Try {current_retry}/{max_retries}]: AI generated '{generated_q}'. Retrying...")
+
+                retry_instruction = f"STOP. These questions are forbidden (repetition or fishing): {rejected_questions}. You are STRICTLY FORBIDDEN from 'fishing' for more entities or suggesting what the user might need. Do not ask about anything listed in COVERED_TOPICS. MOVE TO THE NEXT TOPIC/INTENT IMMEDIATELY and ask a direct question about a MISSING area only."
+
+                # One STOP message listing every rejected question, replacing
+                # the previous one instead of growing the prompt each try
+                retry_messages = messages + \
+                    [HumanMessage(content=retry_instruction)]
+                response = call_llm_with_fallback(
+                    retry_messages, temperature=0.3 + (current_retry * 0.1), response_format="json_object", schema=AgentOutput, agent="requirement")
+                cleaned_content = clean_json_content(response.content)
+                parsed = AgentOutput.model_validate_json(cleaned_content)
+                agent_output = parsed.root
 
             # Final check: if we exhausted retries and it's still a duplicate, reject it
+            forced_reject = False
             if agent_output.status == "ASK":
                 generated_q = agent_output.question.strip()
 
-                if is_semantic_duplicate(generated_q, asked_questions):
+                if question_index.is_duplicate(generated_q):
                     logger.error(
                         "CRITICAL: Agent still repeating after max retries. Forcing REJECT.")
+                    forced_reject = True
                     # Return a REJECT output
                     agent_output.status = "REJECT"
                     agent_output.question = "I apologize, I seem to be repeating myself. Could you please provide more details about your requirements or skip to the next topic?"
 
+                # The LLM rewrites the registry; keep the hidden agent state
+                agent_output.updated_context["_meta"] = meta_state
+
+            if answer and answer_accepted(effective_intent, agent_output):
+                record_covered_intent(meta_state, effective_intent)
+
+            repetition_stats.record(current_retry, forced_reject)
+            if current_retry:
+                stats = repetition_stats.snapshot()
+                logger.info(
+                    f"Repetition retries: {stats['retried_turns']}/{stats['turns']} LLM turns "
+                    f"({stats['extra_calls']} extra calls, {stats['forced_rejects']} forced rejects).")
+
+            planner.stats.record_llm(time.perf_counter() - started_at)
             return agent_output
         except Exception as parse_err:
+            record_parse("requirement", False)
             logger.error(
                 f"JSON Parse Error: {str(parse_err)}\nRaw Content: {response.content}")
             raise HTTPException(
@@ -1,10 +1,10 @@
-from langchain_core.messages import SystemMessage, HumanMessage
 from app.config import settings
 from app.schemas.branding import CompanyProfile
 from pydantic import BaseModel, Field
 from typing import Optional, List, Any
 from fastapi import HTTPException
 from app.utils.llm_utils import call_llm_with_fallback, clean_json_content
+from app.utils.metrics import record_parse
 import logging
 
 logger = logging.getLogger(__name__)
@@ -108,6 +108,7 @@ class BrandingAgent:
         pass
 
     def run(self, current_profile: CompanyProfile, last_user_answer: str, last_question: Optional[str] = None) -> BrandingAgentOutput:
+        from langchain_core.messages import SystemMessage, HumanMessage
         # 1. Serialize current state
         profile_json = current_profile.model_dump_json()
 
@@ -131,15 +132,19 @@ class BrandingAgent:
 
         # 3. Invoke AI with Fallback
         try:
-            response = call_llm_with_fallback(messages, temperature=0.3)
+            response = call_llm_with_fallback(
+                messages, temperature=0.3, schema=BrandingAgentOutput, agent="branding")
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
         # 4. Clean and Parse JSON Output
         cleaned_content = clean_json_content(response.content)
         try:
-            return BrandingAgentOutput.model_validate_json(cleaned_content)
+            output = BrandingAgentOutput.model_validate_json(cleaned_content)
+            record_parse("branding", True)
+            return output
         except Exception as parse_err:
+            record_parse("branding", False)
             logger.error(
                 f"Branding JSON Parse Error: {str(parse_err)}\nRaw Content: {response.content}")
             raise HTTPException(
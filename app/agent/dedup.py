@@ -0,0 +1,195 @@
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING
+from app.config import settings
+from app.agent.planner import CHECKLIST
+
+# numpy/scipy/sklearn are imported on first use (worker start-up time)
+if TYPE_CHECKING:
+    import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Interview boilerplate that says nothing about the topic being asked
+_QUESTION_WORDS = {"please", "could", "would", "tell", "provide", "share",
+                   "need", "needs", "like", "want", "does", "do", "plan",
+                   "mind", "use", "used", "using", "required", "require",
+                   "briefly", "specific", "main", "expected", "access"}
+
+_SYNONYMS = {"app": "application", "apps": "application", "describe": "description",
+             "party": "third", "interact": "use", "attribute": "field"}
+
+# The planner's question bank doubles as background corpus: its document
+# frequencies make generic interview vocabulary ("role", "feature", "data",
+# "system") weigh less than the subject of a question (the role, entity or
+# module) even while a session's history is still short.
+_BACKGROUND_QUESTIONS = [item[3] for item in CHECKLIST] + [
+    "Which data fields are required for each entity, role, page or module?",
+    "Which features does each role, page or module of the system require?",
+]
+_BACKGROUND_DOCS = len(_BACKGROUND_QUESTIONS)
+
+
+@lru_cache(maxsize=None)
+def _stop_words() -> frozenset:
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+    return ENGLISH_STOP_WORDS | _QUESTION_WORDS
+
+
+def _tokenize(text: str) -> list[str]:
+    stop_words = _stop_words()
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in stop_words:
+            continue
+        # Cheap plural folding ("features" == "feature", "entities" == "entity")
+        if len(token) > 4 and token.endswith("ies"):
+            token = token[:-3] + "y"
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        token = _SYNONYMS.get(token, token)
+        if token not in stop_words:
+            tokens.append(token)
+    return tokens
+
+
+@lru_cache(maxsize=None)
+def _vectorizer():
+    """
+    (vectorizer, background document frequencies), built on first use.
+    """
+    import numpy as np
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    # Stateless: terms hashed into a fixed space, so vectors for new questions
+    # never require refitting.
+    vectorizer = HashingVectorizer(
+        tokenizer=_tokenize,
+        token_pattern=None,
+        lowercase=False,
+        n_features=2 ** 18,
+        alternate_sign=False,
+        norm=None,
+    )
+    background = vectorizer.transform(_BACKGROUND_QUESTIONS)
+    background.data[:] = 1
+    return vectorizer, np.asarray(background.sum(axis=0)).ravel()
+
+
+class DuplicateQuestionIndex:
+    """
+    TF-IDF index over a session's asked questions.
+
+    Term counts are hashed unigrams; IDF is computed from the session's own
+    history (plus the planner's question bank), so boilerplate shared by many questions ("what features does
+    the ... role need") weighs little and the subject (the role, entity or
+    module) dominates. A query is one sparse matrix-vector product.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        import numpy as np
+        self.questions: list[str] = []
+        self._normalized: set[str] = set()
+        self._counts = None
+        self._doc_freq = _vectorizer()[1].astype(np.float64)
+        self._weighted = None
+        self._idf_cache = None
+
+    def sync(self, asked_questions: list) -> None:
+        """
+        Brings the index up to date with the (append-only) asked questions.
+        """
+        with self._lock:
+            known = len(self.questions)
+            if asked_questions[:known] != self.questions:
+                self._reset()
+                known = 0
+            new_questions = [str(q) for q in asked_questions[known:]]
+            if new_questions:
+                self._add(new_questions)
+
+    def _add(self, new_questions: list[str]) -> None:
+        import numpy as np
+        from scipy import sparse
+        counts = _vectorizer()[0].transform(new_questions).tocsr()
+        self._counts = counts if self._counts is None else sparse.vstack(
+            [self._counts, counts], format="csr")
+
+        present = counts.copy()
+        present.data[:] = 1
+        self._doc_freq += np.asarray(present.sum(axis=0)).ravel()
+
+        self.questions.extend(new_questions)
+        self._normalized.update(q.strip().lower() for q in new_questions)
+        self._weighted = None
+
+    def _idf(self) -> "np.ndarray":
+        import numpy as np
+        n = len(self.questions) + _BACKGROUND_DOCS
+        return np.log((1 + n) / (1 + self._doc_freq)) + 1.0
+
+    @staticmethod
+    def _weigh(counts, idf: "np.ndarray"):
+        """
+        TF-IDF weighting + L2 row normalization, done on the CSR arrays directly.
+        """
+        import numpy as np
+        weighted = counts.tocsr(copy=True).astype(np.float64)
+        weighted.data *= idf[weighted.indices]
+        norms = np.sqrt(np.asarray(
+            weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        weighted.data /= np.repeat(norms, np.diff(weighted.indptr))
+        return weighted
+
+    def max_similarity(self, question: str) -> float:
+        """
+        Highest cosine similarity between the question and any asked question.
+        """
+        with self._lock:
+            if not self.questions:
+                return 0.0
+            if question.strip().lower() in self._normalized:
+                return 1.0
+
+            if self._weighted is None:
+                self._idf_cache = self._idf()
+                self._weighted = self._weigh(self._counts, self._idf_cache)
+
+            query = self._weigh(_vectorizer()[0].transform(
+                [question]), self._idf_cache)
+            scores = (self._weighted @ query.T).toarray().ravel()
+            return float(scores.max()) if scores.size else 0.0
+
+    def is_duplicate(self, question: str, threshold: float | None = None) -> bool:
+        if threshold is None:
+            threshold = settings.duplicate_question_threshold
+        return self.max_similarity(question) >= threshold
+
+
+_indexes: "OrderedDict[str, DuplicateQuestionIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_question_index(session_id: str | None, asked_questions: list) -> DuplicateQuestionIndex:
+    """
+    Returns the session's index (LRU cached per process), synced with
+    asked_questions. Without a session_id a throwaway index is built.
+    """
+    if session_id is None:
+        index = DuplicateQuestionIndex()
+    else:
+        with _indexes_lock:
+            index = _indexes.pop(session_id, None) or DuplicateQuestionIndex()
+            _indexes[session_id] = index
+            while len(_indexes) > settings.duplicate_index_max_sessions:
+                _indexes.popitem(last=False)
+
+    index.sync(asked_questions)
+    return index
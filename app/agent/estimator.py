@@ -1,10 +1,17 @@
 import json
+import orjson
 import re
-from langchain_core.messages import SystemMessage, HumanMessage
+import contextvars
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
 from app.config import settings
-from app.schemas.estimation import SiteMapResponse
+from app.schemas.estimation import SiteMapResponse, PageSchema
 from fastapi import HTTPException
-from app.utils.llm_utils import call_llm_with_fallback
+from app.utils.llm_utils import call_llm_with_fallback, parse_json_content
+from app.utils.metrics import record_parse
+
+logger = logging.getLogger(__name__)
 
 ESTIMATION_SYSTEM_PROMPT = """
 You are an expert UX Architect and Technical Business Analyst.
@@ -46,57 +53,244 @@ Return a SINGLE JSON object:
 """
 
 
+# Registry keys that give every slice its bearings in map-reduce mode.
+CONTEXT_KEYS = ("project_scope", "scope_details",
+                "project_description", "business_goals")
+
+COMPLEXITY_RANK = {"Low": 0, "Medium": 1, "High": 2}
+
+GROUP_INSTRUCTIONS = """
+You are estimating ONE SLICE ("{group}") of a larger SRS that was split for size.
+- Only generate pages required by the requirements in THIS slice.
+- {plumbing}
+- Use stable, lowercase, hyphenated URLs (e.g. /admin/user-management) so slices can be merged.
+"""
+
+
 class PageEstimationAgent:
     def __init__(self):
         pass
 
     def estimate(self, srs_data: dict, branding_data: dict | None) -> SiteMapResponse:
+        from langchain_core.messages import SystemMessage, HumanMessage
+        # Very large registries are estimated slice by slice (map-reduce)
+        try:
+            srs_size = len(json.dumps(srs_data, ensure_ascii=False))
+        except:
+            srs_size = len(str(srs_data))
+
+        if srs_size > settings.estimation_chunk_threshold_chars:
+            logger.info(
+                f"SRS is {srs_size} chars (> {settings.estimation_chunk_threshold_chars}). Using map-reduce estimation.")
+            return self.estimate_chunked(srs_data, branding_data)
+
         # 1. Serialize inputs
         try:
             srs_str = json.dumps(srs_data, indent=2, ensure_ascii=False)
         except:
             srs_str = str(srs_data)
 
-        branding_str = "No Branding Data Available"
-        if branding_data:
-            try:
-                branding_str = json.dumps(
-                    branding_data, indent=2, ensure_ascii=False)
-            except:
-                branding_str = str(branding_data)
-
         # 2. Invoke AI
         messages = [
             SystemMessage(content=ESTIMATION_SYSTEM_PROMPT),
             HumanMessage(content=f"""
             === INPUT 1: BRANDING PROFILE ===
-            {branding_str}
+            {self._serialize_branding(branding_data)}
 
             === INPUT 2: SRS REQUIREMENTS ===
             {srs_str}
             """)
         ]
 
+        return self._invoke(messages)
+
+    # ------------------------------------------------------------------
+    # MAP-REDUCE MODE
+    # ------------------------------------------------------------------
+
+    def estimate_chunked(self, srs_data: dict, branding_data: dict | None) -> SiteMapResponse:
+        """
+        Splits the registry by role and feature area, estimates every slice
+        concurrently and merges the partial sitemaps into one.
+        Fails when a slice still fails after a retry (see _run_groups): a
+        sitemap missing whole role sections must not pass for a complete one.
+        """
+        groups = split_registry(srs_data)
+        results = self._run_groups(
+            groups, self._serialize_branding(branding_data))
+
+        logger.info(
+            f"Merging {len(results)} estimation slices.")
+        return merge_sitemaps(list(results.values()))
+
+    def estimate_incremental(
+        self,
+        old_srs: dict | None,
+        new_srs: dict,
+        old_sitemap: SiteMapResponse,
+        branding_data: dict | None
+    ) -> tuple[SiteMapResponse, list[str]]:
+        """
+        Re-estimates only the slices whose registry keys changed between
+        old_srs and new_srs and keeps every other page of old_sitemap.
+        Returns the merged sitemap and the names of the regenerated pages.
+        Without old_srs (sitemaps saved before this mode existed) every
+        slice counts as changed.
+        """
+        new_groups = split_registry(new_srs)
+        old_groups = split_registry(old_srs) if old_srs is not None else []
+
+        if old_srs is None:
+            changed = None
+        else:
+            changed = diff_registry(old_srs, new_srs)
+            if not changed:
+                return old_sitemap, []
+
+        def is_affected(group: dict) -> bool:
+            if changed is None or changed & set(CONTEXT_KEYS):
+                return True
+            return any(key in changed for key in group["keys"])
+
+        affected_new = [g for g in new_groups if is_affected(g)]
+        affected_names = {g["name"] for g in affected_new} | \
+            {g["name"] for g in old_groups if is_affected(g)}
+
+        # Map existing pages onto the slices they came from (by the OLD registry)
+        page_groups = assign_pages_to_groups(
+            old_sitemap, old_groups or new_groups)
+        stale_pages = [p for p in old_sitemap.pages
+                       if page_groups[p.name] & affected_names]
+
+        logger.info(
+            f"Incremental estimation: changed keys {sorted(changed) if changed is not None else 'ALL'}, "
+            f"re-estimating {len(affected_new)} slice(s), replacing {len(stale_pages)} page(s).")
+
+        results = self._run_groups(
+            affected_new, self._serialize_branding(branding_data), existing_pages=stale_pages)
+
+        kept_pages = [p for p in old_sitemap.pages
+                      if not (page_groups[p.name] & affected_names)]
+
+        merged = merge_sitemaps(
+            [SiteMapResponse(business_type=old_sitemap.business_type, pages=kept_pages)] + list(results.values()))
+        regenerated = [p.name for sitemap in results.values()
+                       for p in sitemap.pages]
+        return merged, regenerated
+
+    def _run_groups(self, groups: list[dict], branding_str: str, existing_pages: list[PageSchema] | None = None) -> dict[str, SiteMapResponse]:
+        """
+        Estimates the slices concurrently; slices that fail or time out are
+        retried once. Returns {slice name: sitemap} in slice order, or raises
+        HTTPException naming the slices that failed twice.
+        """
+        results = self._run_groups_once(groups, branding_str, existing_pages)
+        failed = [g for g in groups if g["name"] not in results]
+        if failed:
+            logger.warning(
+                f"Retrying {len(failed)} failed estimation slice(s): {[g['name'] for g in failed]}")
+            results.update(self._run_groups_once(failed, branding_str, existing_pages))
+            failed = [g["name"] for g in failed if g["name"] not in results]
+            if failed:
+                raise HTTPException(
+                    status_code=500, detail=f"Estimation slice(s) failed after a retry: {', '.join(failed)}")
+
+        # Keep the merge order stable regardless of completion order
+        return {g["name"]: results[g["name"]] for g in groups}
+
+    def _run_groups_once(self, groups: list[dict], branding_str: str, existing_pages: list[PageSchema] | None = None) -> dict[str, SiteMapResponse]:
+        """
+        Estimates the slices concurrently within estimation_timeout_seconds.
+        Returns {slice name: sitemap} for the slices that succeeded.
+        """
+        if not groups:
+            return {}
+
+        results = {}
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, min(settings.estimation_max_workers, len(groups))))
         try:
-            response = call_llm_with_fallback(messages, temperature=0.2)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+            futures = {
+                executor.submit(contextvars.copy_context().run,
+                                self._estimate_group, group, branding_str, existing_pages): group["name"]
+                for group in groups
+            }
+            done, not_done = wait(
+                futures, timeout=settings.estimation_timeout_seconds)
+
+            for future in not_done:
+                logger.error(
+                    f"Estimation slice '{futures[future]}' exceeded {settings.estimation_timeout_seconds}s.")
+
+            for future in done:
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    logger.error(
+                        f"Estimation slice '{futures[future]}' failed: {e}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return results
+
+    def _estimate_group(self, group: dict, branding_str: str, existing_pages: list[PageSchema] | None = None) -> SiteMapResponse:
+        from langchain_core.messages import SystemMessage, HumanMessage
+        if group["name"] == "platform":
+            plumbing = "This is the PLATFORM slice: include the standard plumbing (Home, Login/Auth, Dashboard, Settings, etc.) and shared pages."
+        else:
+            role = group["name"].split(":", 1)[1] if group["name"].startswith("role:") else None
+            plumbing = "DO NOT generate global plumbing pages (Home, Login/Auth, a generic Dashboard, Settings); another slice owns them."
+            if role:
+                plumbing += (f" Name this role's own pages after it and put them under its URL prefix"
+                             f" (e.g. \"{role} Dashboard\" at /{_slugify(role).lstrip('/')}/dashboard).")
+
+        existing_str = ""
+        if existing_pages:
+            existing_str = "\n- These pages exist already; when a page is still needed keep its exact name and URL: " + \
+                json.dumps([{"name": p.name, "url": p.url}
+                           for p in existing_pages], ensure_ascii=False)
+
+        messages = [
+            SystemMessage(content=ESTIMATION_SYSTEM_PROMPT +
+                          GROUP_INSTRUCTIONS.format(group=group["name"], plumbing=plumbing) + existing_str),
+            HumanMessage(content=f"""
+            === INPUT 1: BRANDING PROFILE ===
+            {branding_str}
+
+            === INPUT 2: SRS REQUIREMENTS (SLICE: {group["name"]}) ===
+            {json.dumps(group["registry"], ensure_ascii=False, separators=(",", ":"))}
+            """)
+        ]
 
-        content = response.content.strip()
+        return self._invoke(messages)
 
-        # 3. Cleanup String (Markdown & Commas)
-        if "```" in content:
-            pattern = r"```(?:json)?\s*(.*?)\s*```"
-            match = re.search(pattern, content, re.DOTALL)
-            content = match.group(1) if match else content.replace(
-                "```json", "").replace("```", "").strip()
+    # ------------------------------------------------------------------
+    # SHARED HELPERS
+    # ------------------------------------------------------------------
+
+    def _serialize_branding(self, branding_data: dict | None) -> str:
+        branding_str = "No Branding Data Available"
+        if branding_data:
+            try:
+                branding_str = json.dumps(
+                    branding_data, indent=2, ensure_ascii=False)
+            except:
+                branding_str = str(branding_data)
+        return branding_str
 
-        content = re.sub(r",\s*([\]}])", r"\1", content)
+    def _invoke(self, messages: list) -> SiteMapResponse:
+        try:
+            response = call_llm_with_fallback(
+                messages, temperature=0.2, schema=SiteMapResponse, agent="estimation")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
+        # 3. Cleanup String (Markdown, comments, trailing commas) & parse
         try:
-            data = json.loads(content)
-        except json.JSONDecodeError as e:
-            print(f"JSON Parse Error: {e}\nContent: {content}")
+            data = parse_json_content(response.content)
+        except orjson.JSONDecodeError as e:
+            record_parse("estimation", False)
+            print(f"JSON Parse Error: {e}\nContent: {response.content}")
             raise e
 
         # Case A: Wrapped in "sitemap" key
@@ -113,7 +307,205 @@ class PageEstimationAgent:
             data = {"business_type": "inferred", "pages": data}
 
         try:
-            return SiteMapResponse.model_validate(data)
+            sitemap = SiteMapResponse.model_validate(data)
+            record_parse("estimation", True)
+            return sitemap
         except Exception as e:
+            record_parse("estimation", False)
             print(f"Validation Failed. Data: {data}")
             raise e
+
+
+def split_registry(srs_data: dict) -> list[dict]:
+    """
+    Splits a requirements registry into estimation slices:
+      - one 'role:<name>' slice per role,
+      - 'features:<category>' (or fixed-size chunks) for system features,
+      - a 'platform' slice owning everything else (plumbing, entities, design...).
+    Every slice also carries CONTEXT_KEYS. Each slice lists the registry
+    paths it owns in 'keys'.
+    """
+    shared = {k: srs_data[k] for k in CONTEXT_KEYS if k in srs_data}
+    groups = []
+
+    roles = srs_data.get("roles")
+    if isinstance(roles, dict):
+        for role_name, role_data in roles.items():
+            groups.append({
+                "name": f"role:{role_name}",
+                "keys": [f"roles.{role_name}"],
+                "registry": {**shared, "roles": {role_name: role_data}}
+            })
+
+    features = srs_data.get("system_features")
+    if isinstance(features, dict):
+        for category, items in features.items():
+            groups.append({
+                "name": f"features:{category}",
+                "keys": [f"system_features.{category}"],
+                "registry": {**shared, "system_features": {category: items}}
+            })
+    elif isinstance(features, list) and features:
+        size = max(1, settings.estimation_features_per_group)
+        for i in range(0, len(features), size):
+            groups.append({
+                "name": f"features:{i // size + 1}",
+                "keys": ["system_features"],
+                "registry": {**shared, "system_features": features[i:i + size]}
+            })
+
+    owned = set(CONTEXT_KEYS)
+    if isinstance(roles, dict):
+        owned.add("roles")
+    if isinstance(features, (dict, list)):
+        owned.add("system_features")
+    rest = {k: v for k, v in srs_data.items() if k not in owned}
+
+    groups.insert(0, {
+        "name": "platform",
+        "keys": sorted(rest.keys()),
+        "registry": {**shared, **rest}
+    })
+    return groups
+
+
+def diff_registry(old_srs: dict, new_srs: dict) -> set[str]:
+    """
+    Returns the registry paths that differ, at the granularity used by
+    split_registry ('roles.<name>', 'system_features.<category>' or a
+    top-level key). Internal keys ('_meta') are ignored.
+    """
+    changed = set()
+    for key in set(old_srs) | set(new_srs):
+        if key.startswith("_"):
+            continue
+        old_val, new_val = old_srs.get(key), new_srs.get(key)
+        if old_val == new_val:
+            continue
+
+        if key in ("roles", "system_features") and isinstance(old_val, dict) and isinstance(new_val, dict):
+            for sub_key in set(old_val) | set(new_val):
+                if old_val.get(sub_key) != new_val.get(sub_key):
+                    changed.add(f"{key}.{sub_key}")
+        else:
+            changed.add(key)
+            # A shape change (e.g. list -> dict) touches every sub path as well
+            for val in (old_val, new_val):
+                if key in ("roles", "system_features") and isinstance(val, dict):
+                    changed.update(f"{key}.{sub_key}" for sub_key in val)
+    return changed
+
+
+def assign_pages_to_groups(sitemap: SiteMapResponse, groups: list[dict]) -> dict[str, set[str]]:
+    """
+    Maps every page name to the slices it most likely came from: role slices
+    whose role name appears in the page, feature slices sharing a feature with
+    the page, and 'platform' for pages no slice claims.
+    """
+    assignment = {}
+    for page in sitemap.pages:
+        page_text = " ".join(
+            [page.name, page.url or "", page.description, page.notes] + page.features).lower()
+        page_features = {f.lower() for f in page.features}
+        owners = set()
+
+        for group in groups:
+            registry = group["registry"]
+            if group["name"].startswith("role:"):
+                role_name = group["name"].split(":", 1)[1].lower()
+                if role_name and role_name in page_text:
+                    owners.add(group["name"])
+            elif group["name"].startswith("features:"):
+                features = registry.get("system_features")
+                if isinstance(features, dict):
+                    features = [f for items in features.values()
+                                for f in (items if isinstance(items, list) else [items])]
+                for feature in features or []:
+                    feature = str(feature).lower()
+                    if feature in page_features or feature in page_text:
+                        owners.add(group["name"])
+                        break
+
+        assignment[page.name] = owners or {"platform"}
+    return assignment
+
+
+def _url_key(url: str | None) -> str | None:
+    if not url:
+        return None
+    url = "/" + re.sub(r"/+", "/", url.strip().lower()).strip("/")
+    return url
+
+
+def _name_key(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "", name.lower())
+
+
+def _slugify(name: str) -> str:
+    return "/" + (re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "page")
+
+
+def merge_sitemaps(sitemaps: list[SiteMapResponse]) -> SiteMapResponse:
+    """
+    Reduce step: deduplicates pages, unions their features, keeps the
+    highest complexity and makes URLs unique. Pages are the same when their
+    normalized URLs match; by normalized name only when one of them has no
+    URL (same-named pages at different URLs, e.g. /admin/dashboard and
+    /vendor/dashboard, stay apart).
+    """
+    merged: list[PageSchema] = []
+    by_url: dict[str, PageSchema] = {}
+    by_name: dict[str, list[PageSchema]] = {}
+
+    def page_url_key(page: PageSchema) -> str | None:
+        url_key = _url_key(page.url)
+        # "/" is often a placeholder, so it never identifies a page on its own
+        return None if url_key == "/" else url_key
+
+    for sitemap in sitemaps:
+        for page in sitemap.pages:
+            url_key = page_url_key(page)
+            name_key = _name_key(page.name)
+            existing = by_url.get(url_key) if url_key else None
+            if existing is None:
+                existing = next((candidate for candidate in by_name.get(name_key, [])
+                                 if url_key is None or page_url_key(candidate) is None), None)
+
+            if existing is None:
+                existing = page.model_copy(deep=True)
+                merged.append(existing)
+            else:
+                for feature in page.features:
+                    if feature not in existing.features:
+                        existing.features.append(feature)
+                if COMPLEXITY_RANK.get(page.complexity, 1) > COMPLEXITY_RANK.get(existing.complexity, 1):
+                    existing.complexity = page.complexity
+                if page.notes and page.notes not in existing.notes:
+                    existing.notes = f"{existing.notes} {page.notes}".strip()
+                if not existing.url and page.url:
+                    existing.url = page.url
+
+            if url_key:
+                by_url.setdefault(url_key, existing)
+            same_name = by_name.setdefault(name_key, [])
+            if not any(candidate is existing for candidate in same_name):
+                same_name.append(existing)
+
+    # Unify URLs: normalized, present and unique
+    seen_urls = set()
+    for page in merged:
+        url = _url_key(page.url) or _slugify(page.name)
+        if url in seen_urls:
+            url = _slugify(page.name)
+        candidate, suffix = url, 2
+        while candidate in seen_urls:
+            candidate = f"{url}-{suffix}"
+            suffix += 1
+        seen_urls.add(candidate)
+        page.url = candidate
+
+    business_types = Counter(s.business_type for s in sitemaps)
+    return SiteMapResponse(
+        business_type=business_types.most_common(1)[0][0],
+        pages=merged
+    )
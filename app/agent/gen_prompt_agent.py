@@ -1,14 +1,13 @@
 import json
 import re
-import os
-import glob
 import base64
-from langchain_core.messages import SystemMessage, HumanMessage
+import hashlib
 from app.config import settings
 from app.schemas.gen_prompts import PromptGenerationOutput, ScreenDetail
-from app.utils.llm_utils import call_llm_with_fallback
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
+from app.utils.llm_utils import call_llm_with_fallback, parse_json_content
+from app.utils.metrics import invoke_instrumented, record_parse, record_retry
+from app.utils.tracing import start_span
+from app.services.asset_store import asset_store, IMAGE_EXTENSIONS
 
 IMAGE_ANALYSIS_SYSTEM_PROMPT = """
 You are a Senior UI/UX Designer and Visual Analyst.
@@ -58,11 +57,30 @@ DO NOT be generic. Use ACTUAL facts from the Branding Profile and Design Require
 """
 
 
+def page_fingerprint(page_data: dict) -> str:
+    """
+    Stable hash of a sitemap page definition, used to detect changed screens.
+    """
+    return hashlib.sha256(json.dumps(page_data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
 class PromptGenerationAgent:
     def __init__(self):
         pass
 
-    def generate(self, session_id: str, sitemap_data: dict, branding_data: dict | None = None) -> PromptGenerationOutput:
+    def generate(
+        self,
+        session_id: str,
+        sitemap_data: dict,
+        branding_data: dict | None = None,
+        previous_screens: list[dict] | None = None,
+        previous_fingerprints: dict | None = None
+    ) -> PromptGenerationOutput:
+        """
+        Generates prompts for every screen of the sitemap. When the previous
+        output and its screen fingerprints are given, screens whose page
+        definition is unchanged reuse their previous prompts.
+        """
         # 1. Determine Project Name
         if branding_data and "company_name" in branding_data:
             project_name = branding_data["company_name"]
@@ -72,18 +90,35 @@ class PromptGenerationAgent:
         branding_context = json.dumps(
             branding_data, indent=2, ensure_ascii=False) if branding_data else "No branding data available."
 
-        # 2. Perform Image Analysis if images exist
-        visual_context = self._analyze_images(session_id)
-
         screens_output = []
         pages = sitemap_data.get("pages", [])
 
+        reusable = {}
+        if previous_screens and previous_fingerprints:
+            previous_by_name = {screen.get("screen_name"): screen
+                                for screen in previous_screens}
+            for page_data in pages:
+                name = page_data.get("name")
+                if name in previous_by_name and previous_fingerprints.get(name) == page_fingerprint(page_data):
+                    reusable[name] = ScreenDetail.model_validate(
+                        previous_by_name[name])
+
+        # 2. Perform Image Analysis if images exist (only needed for screens we regenerate)
+        visual_context = self._analyze_images(
+            session_id) if len(reusable) < len(pages) else ""
+
         print(
             f"Generating prompts for {len(pages)} screens for project: {project_name}")
 
         # 3. Iterate through screens one by one to avoid token limits
         import time
         for i, page_data in enumerate(pages):
+            if page_data.get("name") in reusable:
+                print(
+                    f"Reusing unchanged screen {i+1}/{len(pages)}: {page_data.get('name')}")
+                screens_output.append(reusable[page_data.get("name")])
+                continue
+
             print(
                 f"Processing screen {i+1}/{len(pages)}: {page_data.get('name')}")
 
@@ -98,6 +133,7 @@ class PromptGenerationAgent:
                     break
 
                 if attempt < max_retries - 1:
+                    record_retry("prompt_generation", "screen_failed")
                     print(
                         f"Retrying screen '{page_data.get('name')}' (Attempt {attempt + 2}/{max_retries})...")
                     time.sleep(2)  # Wait 2 seconds before retry
@@ -114,6 +150,7 @@ class PromptGenerationAgent:
         )
 
     def _generate_single_screen(self, branding_context: str, visual_context: str, page_data: dict) -> ScreenDetail | None:
+        from langchain_core.messages import SystemMessage, HumanMessage
         screen_context = json.dumps(page_data, indent=2, ensure_ascii=False)
 
         messages = [
@@ -123,69 +160,66 @@ class PromptGenerationAgent:
         ]
 
         try:
-            response = call_llm_with_fallback(messages, temperature=0.2)
+            response = call_llm_with_fallback(
+                messages, temperature=0.2, schema=ScreenDetail, agent="prompt_generation")
             raw_content = response.content.strip()
 
-            # Use robust cleaning utility
-            from app.utils.llm_utils import clean_json_content
-            cleaned_content = clean_json_content(raw_content)
-
-            try:
-                data = json.loads(cleaned_content)
-            except json.JSONDecodeError:
-                # Fallback: if it still fails, try to find the first { and last }
-                start_idx = cleaned_content.find("{")
-                end_idx = cleaned_content.rfind("}")
-                if start_idx != -1 and end_idx != -1:
-                    cleaned_content = cleaned_content[start_idx:end_idx+1]
-                data = json.loads(cleaned_content)
+            data = parse_json_content(raw_content)
 
             # Normalization
             if "screen_name" not in data and "name" in data:
                 data["screen_name"] = data.pop("name")
 
             # Validation
-            return ScreenDetail.model_validate(data)
+            screen = ScreenDetail.model_validate(data)
+            record_parse("prompt_generation", True)
+            return screen
         except Exception as e:
+            record_parse("prompt_generation", False)
             print(
                 f"Error generating prompts for screen: {page_data.get('name')}. Error: {e}")
             return None
 
     def _analyze_images(self, session_id: str) -> str:
         """
-        Scans for images in the session folder and uses Gemini to analyze them.
+        Enumerates the session's assets from its manifest and uses Gemini to analyze them.
+        Analyses are cached per content hash, so a re-uploaded asset is never re-analyzed.
         """
-        image_dir = settings.EXPORT_IMAGES_DIR / session_id
-        if not os.path.exists(image_dir):
-            return "No visual assets found."
+        from langchain_core.messages import SystemMessage, HumanMessage
+        assets = [a for a in asset_store.list_assets(session_id)
+                  if a["ext"] in IMAGE_EXTENSIONS]
 
-        image_extensions = ["*.png", "*.jpg", "*.jpeg", "*.webp"]
-        image_files = []
-        for ext in image_extensions:
-            image_files.extend(glob.glob(str(image_dir / ext)))
-
-        if not image_files:
+        if not assets:
             return "No visual assets found."
 
         print(
-            f"Analyzing {len(image_files)} images for session {session_id}...")
+            f"Analyzing {len(assets)} images for session {session_id}...")
 
         analysis_results = []
+        gemini_vision = None
 
-        # Use Gemini 2.0 Flash for Image Analysis via OpenRouter
-        gemini_vision = ChatGoogleGenerativeAI(
-            model=settings.gemini_model,
-            google_api_key=settings.google_api_key,
-            temperature=0.1
-        )
-
-        for img_path in image_files:
+        for asset in assets:
+            filename = f"{asset['key']}{asset['ext']}"
             try:
-                with open(img_path, "rb") as f:
+                analysis = asset_store.get_analysis(asset["hash"])
+                if analysis is not None:
+                    analysis_results.append(
+                        f"ASSET: {filename}\nANALYSIS:\n{analysis}\n---")
+                    print(f"Reused cached analysis for {filename}")
+                    continue
+
+                # Use Gemini 2.0 Flash for Image Analysis (created only on a cache miss)
+                if gemini_vision is None:
+                    from langchain_google_genai import ChatGoogleGenerativeAI
+                    gemini_vision = ChatGoogleGenerativeAI(
+                        model=settings.gemini_model,
+                        google_api_key=settings.google_api_key,
+                        temperature=0.1
+                    )
+
+                with open(asset["path"], "rb") as f:
                     base64_image = base64.b64encode(f.read()).decode('utf-8')
 
-                filename = os.path.basename(img_path)
-
                 messages = [
                     SystemMessage(content=IMAGE_ANALYSIS_SYSTEM_PROMPT),
                     HumanMessage(content=[
@@ -199,13 +233,17 @@ class PromptGenerationAgent:
                     ])
                 ]
 
-                response = gemini_vision.invoke(messages)
+                with start_span("llm.invoke", {"llm.agent": "vision", "llm.model": settings.gemini_model}):
+                    response = invoke_instrumented(
+                        gemini_vision, messages, agent="vision", model=settings.gemini_model)
+                analysis = str(response.content)
+                asset_store.save_analysis(asset["hash"], analysis)
                 analysis_results.append(
-                    f"ASSET: {filename}\nANALYSIS:\n{response.content}\n---")
+                    f"ASSET: {filename}\nANALYSIS:\n{analysis}\n---")
                 print(f"Analyzed {filename}")
 
             except Exception as e:
-                print(f"Error analyzing image {img_path}: {e}")
+                print(f"Error analyzing image {asset['path']}: {e}")
                 continue
 
         return "\n".join(analysis_results) if analysis_results else "Image analysis failed or no content extracted."
@@ -15,11 +15,24 @@ from app.utils.merge import (
     merge_additional_info,
 )
 from app.agent.intents import IntentType
+from app.utils.tracing import traced, set_span_attributes
 import logging
 
 logger = logging.getLogger(__name__)
 
+SKIP_KEYWORDS = {"i don't know", "no", "none", "skip",
+                 "unsure", "unknown", "n/a", "not applicable"}
 
+
+def is_skip_answer(answer) -> bool:
+    """
+    True when the answer declines the question ("skip", "n/a", ...).
+    """
+    cleaned_answer = str(answer).strip().lower()
+    return cleaned_answer in SKIP_KEYWORDS or len(cleaned_answer) < 2
+
+
+@traced("agent.consume_intent")
 def consume_intent(
     *,
     intent: dict | None,
@@ -34,15 +47,13 @@ def consume_intent(
     if not intent or not answer:
         return context
 
-    # --- NEW: DETECT SKIP/UNKNOWN ANSWERS ---
-    skip_keywords = {"i don't know", "no", "none", "skip",
-                     "unsure", "unknown", "n/a", "not applicable"}
-    cleaned_answer = str(answer).strip().lower()
+    set_span_attributes(**{"agent.intent": intent.get("type")})
 
+    # --- NEW: DETECT SKIP/UNKNOWN ANSWERS ---
     # If the user skips, we force a specific placeholder string.
     # The merge functions will treat this as a valid entry, stopping the loop.
     effective_answer = answer
-    if cleaned_answer in skip_keywords or len(cleaned_answer) < 2:
+    if is_skip_answer(answer):
         effective_answer = "Not Provided"
     # ----------------------------------------
 
@@ -0,0 +1,349 @@
+import re
+import threading
+import logging
+from typing import TYPE_CHECKING
+from app.agent.intents import IntentType
+from app.agent.intent_handler import is_skip_answer
+from app.agent.output_parser import AskOutput, PendingIntentModel
+
+if TYPE_CHECKING:
+    from app.agent.dedup import DuplicateQuestionIndex
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------
+# CHECKLIST
+# (phase, intent, registry path, question). Order follows the
+# PHASE & INTENT DESCRIPTIONS of the system prompt. Intents the prompt
+# treats as conditional or consultative (SCOPE_CLARIFICATION,
+# MIGRATION_STRATEGY, ADDITIONAL_INFO / COMPLETE) are left to the LLM.
+# ----------------------------------------------------------------------
+CHECKLIST = [
+    ("SCOPE_DEFINITION", IntentType.DEFINE_SCOPE, "project_scope",
+     "Is this a completely new build, or are we updating/refactoring an existing application?"),
+    ("INIT", IntentType.PROJECT_DESCRIPTION, "project_description",
+     "Could you briefly describe what the application should do?"),
+    ("BUSINESS", IntentType.ROLE_DEFINITION, "roles",
+     "Which user roles will use the system?"),
+    ("BUSINESS", IntentType.BUSINESS_GOALS, "business_goals",
+     "What are the main business goals for this project?"),
+    ("BUSINESS", IntentType.CURRENT_PROCESS, "current_process",
+     "How is this process handled today?"),
+    ("FUNCTIONAL", IntentType.ROLE_FEATURES, "roles.*",
+     "What features does the {role} role need?"),
+    ("FUNCTIONAL", IntentType.SCREENS_PAGES, "screens_pages",
+     "Which new pages or screens are being added or redesigned?"),
+    ("FUNCTIONAL", IntentType.DATA_ENTITIES, "data_entities",
+     "What data entities does the system manage, and which fields does each need?"),
+    ("FUNCTIONAL", IntentType.SYSTEM_FEATURES, "system_features",
+     "Which system-wide features or modules are required?"),
+    ("FUNCTIONAL", IntentType.INTEGRATIONS, "integrations",
+     "Which existing systems must the application integrate with?"),
+    ("FUNCTIONAL", IntentType.THIRD_PARTY_SERVICES, "third_party_services",
+     "Which third-party services (payments, email, maps, etc.) will be used?"),
+    ("DESIGN", IntentType.CURRENT_APP_URL, "design_requirements.current_app_url",
+     "What is the URL of the current application that needs changing?"),
+    ("DESIGN", IntentType.INSPIRATION_URLS, "design_requirements.inspiration_urls",
+     "Are there any inspiration sources (URLs) whose design style you admire?"),
+    ("DESIGN", IntentType.DESIGN_PREFERENCES, "design_requirements.design_preferences",
+     "Do you have brand colors (hex codes), guidelines or a visual vibe in mind?"),
+    ("DESIGN", IntentType.ASSETS_UPLOAD, "design_requirements.assets_upload",
+     "Do you have any logos, mockups or style guides to upload?"),
+    ("NON_FUNCTIONAL", IntentType.SECURITY_REQUIREMENTS, "non_functional_requirements.security_requirements",
+     "What security requirements apply (authentication, encryption, access control)?"),
+    ("NON_FUNCTIONAL", IntentType.COMPLIANCE_REQUIREMENTS, "non_functional_requirements.compliance",
+     "Are there any compliance standards to meet (e.g. GDPR, HIPAA)?"),
+    ("NON_FUNCTIONAL", IntentType.PERFORMANCE_REQUIREMENTS, "non_functional_requirements.performance_requirements",
+     "What performance targets apply (expected users, response times)?"),
+    ("NON_FUNCTIONAL", IntentType.TECH_STACK_PREFERENCE, "non_functional_requirements.tech_stack_preference",
+     "Do you have a preferred technology stack?"),
+    ("ADDITIONAL", IntentType.PROJECT_TIMELINE, "project_timeline",
+     "What is the expected timeline or deadline for the project?"),
+    ("ADDITIONAL", IntentType.BUDGET, "budget",
+     "What is the budget range for this project?"),
+    ("ADDITIONAL", IntentType.CONSTRAINTS, "constraints",
+     "Are there any constraints, dependencies or blockers we should know about?"),
+]
+
+# Asked in every interview even when the context already holds a value
+# (the system prompt's ADDITIONAL phase requires all three)
+ALWAYS_ASK = {IntentType.PROJECT_TIMELINE, IntentType.BUDGET, IntentType.CONSTRAINTS}
+
+# Items that only apply to one project scope
+SCOPE_ONLY = {
+    IntentType.SCREENS_PAGES: "PARTIAL_UPDATE",
+    IntentType.CURRENT_APP_URL: "PARTIAL_UPDATE",
+    IntentType.INSPIRATION_URLS: "NEW_BUILD",
+}
+
+# Intents whose answer is merged verbatim as a list of items
+LIST_INTENTS = {
+    IntentType.ROLE_DEFINITION, IntentType.ROLE_FEATURES, IntentType.SCREENS_PAGES,
+    IntentType.BUSINESS_GOALS, IntentType.THIRD_PARTY_SERVICES,
+    IntentType.DESIGN_PREFERENCES, IntentType.INSPIRATION_URLS, IntentType.ASSETS_UPLOAD,
+}
+
+# Intents whose answer is stored as a short scalar
+SCALAR_INTENTS = {
+    IntentType.DEFINE_SCOPE, IntentType.CURRENT_APP_URL,
+    IntentType.SECURITY_REQUIREMENTS, IntentType.COMPLIANCE_REQUIREMENTS,
+    IntentType.PERFORMANCE_REQUIREMENTS, IntentType.TECH_STACK_PREFERENCE,
+    IntentType.PROJECT_TIMELINE, IntentType.BUDGET, IntentType.CONSTRAINTS,
+}
+
+MAX_LIST_ITEMS = 20
+MAX_ITEM_WORDS = 4
+MAX_SCALAR_WORDS = 8
+
+_SPLIT_RE = re.compile(r"[,\n]")
+# Sentence-like punctuation means free-form text the LLM should summarize
+_FREE_FORM_RE = re.compile(r"[?!;]|:(?!//)|\.\s")
+
+
+class PlannerStats:
+    """
+    Thread-safe counters for local vs LLM turns. 'saved' latency is
+    estimated as (mean LLM turn latency - local latency) per local turn.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.local_turns = 0
+        self.llm_turns = 0
+        self.local_seconds = 0.0
+        self.llm_seconds = 0.0
+
+    def record_local(self, seconds: float) -> None:
+        with self._lock:
+            self.local_turns += 1
+            self.local_seconds += seconds
+
+    def record_llm(self, seconds: float) -> None:
+        with self._lock:
+            self.llm_turns += 1
+            self.llm_seconds += seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = self.local_turns + self.llm_turns
+            mean_llm = self.llm_seconds / self.llm_turns if self.llm_turns else 0.0
+            return {
+                "local_turns": self.local_turns,
+                "llm_turns": self.llm_turns,
+                "local_fraction": self.local_turns / total if total else 0.0,
+                "mean_local_ms": 1000 * self.local_seconds / self.local_turns if self.local_turns else 0.0,
+                "mean_llm_ms": 1000 * mean_llm,
+                "estimated_saved_seconds": max(0.0, self.local_turns * mean_llm - self.local_seconds),
+            }
+
+
+def classify_answer(answer) -> str | None:
+    """
+    Returns 'skip', 'list' or 'scalar' for trivially structured answers,
+    None for free-form text that needs the LLM.
+    """
+    if answer is None or not isinstance(answer, str):
+        return None
+    if is_skip_answer(answer):
+        return "skip"
+    if _FREE_FORM_RE.search(answer):
+        return None
+
+    items = [item.strip() for item in _SPLIT_RE.split(answer) if item.strip()]
+    if not items or len(items) > MAX_LIST_ITEMS:
+        return None
+    if len(items) == 1 and len(items[0].split()) <= MAX_SCALAR_WORDS:
+        return "scalar"
+    if all(len(item.split()) <= MAX_ITEM_WORDS for item in items):
+        return "list"
+    return None
+
+
+def _is_filled(context: dict, path: str) -> bool:
+    node = context
+    for part in path.split("."):
+        if not isinstance(node, dict) or part not in node:
+            return False
+        node = node[part]
+    return node not in (None, "", [], {})
+
+
+def _intent_name(intent_type) -> str | None:
+    if intent_type is None:
+        return None
+    return getattr(intent_type, "value", str(intent_type))
+
+
+def record_covered_intent(meta_state: dict, pending_intent: dict | None) -> None:
+    """
+    Remembers (in the hidden '_meta' state) which intents already received
+    an answer, e.g. 'DATA_ENTITIES' or 'ROLE_FEATURES:Admin'.
+    """
+    if not pending_intent or not pending_intent.get("type"):
+        return
+    name = _intent_name(pending_intent.get("type"))
+    if pending_intent.get("role"):
+        name = f"{name}:{pending_intent['role']}"
+    covered = meta_state.get("covered_intents", [])
+    if name not in covered:
+        meta_state["covered_intents"] = covered + [name]
+
+
+def answer_accepted(pending_intent: dict | None, output) -> bool:
+    """
+    Whether a turn consumed the pending intent: COMPLETE, or an ASK that moved
+    on to another intent (or role). REJECT and re-asking the same intent don't.
+    """
+    if not pending_intent or not pending_intent.get("type"):
+        return False
+    if output.status == "COMPLETE":
+        return True
+    if output.status != "ASK":
+        return False
+    return (_intent_name(output.pending_intent.type), output.pending_intent.role) != \
+        (_intent_name(pending_intent.get("type")), pending_intent.get("role"))
+
+
+def covered_topics(context: dict, meta_state: dict, asked_questions: list, recent: int = 5) -> dict:
+    """
+    Compact digest of what the interview already covered, sent to the LLM
+    in place of the full question history:
+      answered     - checklist intents whose registry field is filled
+      declined     - intents the user skipped ("Not Provided")
+      covered      - intents that already received an answer (from '_meta')
+      recent       - the last few questions, verbatim
+    """
+    answered, declined = [], []
+    for _, intent, path, _ in CHECKLIST:
+        name = _intent_name(intent)
+        if intent == IntentType.ROLE_FEATURES:
+            roles = context.get("roles")
+            if isinstance(roles, dict):
+                for role, data in roles.items():
+                    if data:
+                        answered.append(f"{name}:{role}")
+            continue
+
+        node = context
+        for part in path.split("."):
+            node = node.get(part) if isinstance(node, dict) else None
+        if node == "Not Provided" or node == ["Not Provided"]:
+            declined.append(name)
+        elif _is_filled(context, path):
+            answered.append(name)
+
+    return {
+        "answered": answered,
+        "declined": declined,
+        "covered": list(meta_state.get("covered_intents", [])),
+        "questions_asked": len(asked_questions),
+        "recent": list(asked_questions[-recent:]),
+    }
+
+
+class NextQuestionPlanner:
+    """
+    Rule-based next-question planner. Serves a turn locally when the answer
+    to the pending intent is trivially structured and the next checklist
+    item is unambiguous; returns None whenever the LLM is needed.
+    """
+
+    def __init__(self):
+        self.stats = PlannerStats()
+
+    def plan(
+        self,
+        *,
+        pending_intent: dict | None,
+        answer,
+        updated_context: dict,
+        last_question: str | None,
+        question_index: "DuplicateQuestionIndex",
+        additional_questions_asked: int
+    ) -> AskOutput | None:
+        if not pending_intent or answer is None:
+            return None
+
+        intent_type = pending_intent.get("type")
+        kind = classify_answer(answer)
+        if kind is None or not self._accepts(intent_type, kind):
+            return None
+
+        # Echoing the question back is a REJECT the LLM must phrase
+        if last_question and str(answer).strip().lower() == last_question.strip().lower():
+            return None
+
+        # Scope answers must resolve deterministically
+        if intent_type == IntentType.DEFINE_SCOPE and updated_context.get("project_scope") not in ("NEW_BUILD", "PARTIAL_UPDATE"):
+            return None
+
+        # The registry needs LLM restructuring before we can move on
+        if any(isinstance(updated_context.get(key), dict) and "Pending Categorization" in updated_context[key]
+               for key in ("data_entities", "integrations", "system_features")):
+            return None
+
+        next_item = self._next_item(intent_type, updated_context)
+        if next_item is None:
+            return None
+
+        phase, next_intent, role, question = next_item
+        if question_index.is_duplicate(question):
+            return None
+
+        return AskOutput(
+            status="ASK",
+            phase=phase,
+            question=question,
+            updated_context=updated_context,
+            pending_intent=PendingIntentModel(type=next_intent, role=role),
+            additional_questions_asked=additional_questions_asked
+        )
+
+    def _accepts(self, intent_type, kind: str) -> bool:
+        if kind == "skip":
+            return any(intent_type == item[1] for item in CHECKLIST)
+        if kind == "list":
+            return intent_type in LIST_INTENTS
+        return intent_type in LIST_INTENTS or intent_type in SCALAR_INTENTS
+
+    def _next_item(self, intent_type, context: dict):
+        """
+        Walks the checklist forward from the current intent and returns
+        (phase, intent, role, question) for the first unfilled item.
+        """
+        positions = [i for i, item in enumerate(CHECKLIST)
+                     if item[1] == intent_type]
+        if not positions:
+            return None
+
+        scope = context.get("project_scope")
+        start = positions[0]
+        # ROLE_FEATURES stays current while other roles still lack features
+        if intent_type != IntentType.ROLE_FEATURES:
+            start += 1
+
+        for phase, intent, path, question in CHECKLIST[start:]:
+            if intent in SCOPE_ONLY and SCOPE_ONLY[intent] != scope:
+                continue
+
+            if intent == IntentType.ROLE_FEATURES:
+                roles = context.get("roles")
+                if not isinstance(roles, dict):
+                    continue
+                # A skipped ROLE_DEFINITION leaves {"Not Provided": {}}: no role to ask about
+                pending_roles = [name for name, data in roles.items()
+                                 if not data and name != "Not Provided"]
+                if pending_roles:
+                    role = pending_roles[0]
+                    return phase, intent, role, question.format(role=role)
+                continue
+
+            if intent in ALWAYS_ASK or not _is_filled(context, path):
+                return phase, intent, None, question
+
+        # Checklist exhausted: ADDITIONAL_INFO / COMPLETE belong to the LLM
+        return None
+
+
+planner = NextQuestionPlanner()
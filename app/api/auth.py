@@ -1,8 +1,8 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_db
 from app.services.auth_service import auth_service
 from app.services.user_service import user_service
 from app.schemas.token import Token, RefreshToken
@@ -13,8 +13,8 @@ router = APIRouter()
 
 
 @router.post("/login", response_model=Token)
-async def login_for_access_token(user_login: UserLogin, db: Session = Depends(get_db)):
-    user = user_service.authenticate_user(
+async def login_for_access_token(user_login: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = await user_service.authenticate_user_async(
         db, user_login.email, user_login.password)
     if not user:
         raise HTTPException(
@@ -38,7 +38,7 @@ async def login_for_access_token(user_login: UserLogin, db: Session = Depends(ge
 
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(refresh_token: RefreshToken, db: Session = Depends(get_db)):
+async def refresh_token(refresh_token: RefreshToken, db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -56,7 +56,7 @@ async def refresh_token(refresh_token: RefreshToken, db: Session = Depends(get_d
         )
 
     username: str = payload.get("sub")
-    user = user_service.get_user_by_email(db, email=username)
+    user = await user_service.get_user_by_email_async(db, username)
     if not user:
         raise credentials_exception
 
@@ -0,0 +1,41 @@
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Depends
+from pydantic import BaseModel
+from app.models.user import User
+from app.api.deps import get_current_user
+from app.services.batch_service import BatchJob, start_batch
+
+router = APIRouter()
+
+
+class BatchRequest(BaseModel):
+    # Omit to process every eligible session found in the export directories
+    session_ids: list[str] | None = None
+    # prompts only: regenerate changed screens of sessions that already have prompts
+    incremental: bool = False
+
+
+def _require_superuser(current_user: User) -> None:
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=403, detail="User is not authorized to run batch jobs")
+
+
+@router.post("/batch/{kind}", status_code=202)
+def create_batch(kind: Literal["estimate", "prompts"], request: BatchRequest, current_user: User = Depends(get_current_user)):
+    """
+    Starts a batch estimation / prompt generation in the background.
+    Poll GET /batch/{job_id} for progress and the summary.
+    """
+    _require_superuser(current_user)
+    job = start_batch(kind, request.session_ids, request.incremental)
+    return {"job_id": job.job_id, "sessions": len(job.state["sessions"])}
+
+
+@router.get("/batch/{job_id}")
+def get_batch(job_id: str, current_user: User = Depends(get_current_user)):
+    _require_superuser(current_user)
+    job = BatchJob.load(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return {**job.state, "summary": job.state.get("summary") or job.summary()}
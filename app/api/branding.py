@@ -3,18 +3,20 @@ from pydantic import BaseModel
 import glob
 import os
 import json
+import asyncio
 from datetime import datetime
 from app.config import settings
+from app.utils.metrics import start_turn
+from app.utils.lifecycle import lifecycle
+from app.utils.recorder import record_request
 from app.services.branding_service import branding_service
 from app.services.export_service import save_branding_files
+from app.services.rate_limiter import rate_limiter, RateLimitExceeded
 from app.agent.branding_agent import BrandingAgent
 from app.schemas.branding import BrandingResponse, BrandingAskResponse, BrandingCompleteResponse, BrandingTurn
 from typing import Optional, Any, List
 from app.models.user import User
-from app.api.deps import get_current_user, get_db
-from sqlalchemy.orm import Session
-from app.services.auth_service import auth_service
-from app.services.user_service import user_service
+from app.api.deps import get_current_user, get_websocket_user, rate_limit
 
 router = APIRouter()
 agent = BrandingAgent()
@@ -25,28 +27,16 @@ class BrandingRequest(BaseModel):
     answer: Optional[Any] = None
 
 
-async def get_websocket_user(websocket: WebSocket, token: str, db: Session):
-    try:
-        payload = auth_service.verify_token(token, None)
-        username = payload.get("sub")
-        if not username:
-            return None
-        return user_service.get_user_by_email(db, email=username)
-    except Exception:
-        return None
-
-
 @router.websocket("/ws/branding/{session_id}")
 async def websocket_branding(
     websocket: WebSocket,
     session_id: str,
-    token: str = Query(...),
-    db: Session = Depends(get_db)
+    token: str = Query(...)
 ):
     await websocket.accept()
 
     # 1. Authenticate
-    current_user = await get_websocket_user(websocket, token, db)
+    current_user = await get_websocket_user(websocket, token)
     if not current_user:
         await websocket.send_json({
             "status": "ERROR",
@@ -68,7 +58,7 @@ async def websocket_branding(
             return
 
         # 2. Load State
-        state = branding_service.get_state(session_id)
+        state = await asyncio.to_thread(branding_service.get_state, session_id)
 
         # 3. If already complete, send complete message and close
         if state.is_complete:
@@ -82,17 +72,35 @@ async def websocket_branding(
 
         # 4. If session just started (no last question), run agent once to get first question
         if not state.last_question and not state.history:
-            agent_result = agent.run(state.profile, None, None)
-            state.last_question = agent_result.next_question
-            state.profile = agent_result.updated_profile
-            branding_service.save_state(session_id, state)
+            if not lifecycle.accepting_turns:
+                await websocket.close(code=status.WS_1012_SERVICE_RESTART)
+                return
+            # The first question is a turn too: same quotas, and shutdown waits for it
+            try:
+                await rate_limiter.check("turns", current_user.id, session_id)
+                slot = await rate_limiter.acquire_slot(current_user.id)
+            except RateLimitExceeded as e:
+                await websocket.send_json({"status": "ERROR", "detail": e.detail, "retry_after": e.retry_after})
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                return
 
-            await websocket.send_json({
-                "status": "ASK",
-                "phase": "BRANDING",
-                "question": agent_result.next_question,
-                "context": state.profile.model_dump(exclude_none=True)
-            })
+            try:
+                with lifecycle.track_turn():
+                    start_turn(session_id)
+                    record_request("/branding/chat", answer=None)
+                    agent_result = await asyncio.to_thread(agent.run, state.profile, None, None)
+                    state.last_question = agent_result.next_question
+                    state.profile = agent_result.updated_profile
+                    await asyncio.to_thread(branding_service.save_state, session_id, state)
+
+                    await websocket.send_json({
+                        "status": "ASK",
+                        "phase": "BRANDING",
+                        "question": agent_result.next_question,
+                        "context": state.profile.model_dump(exclude_none=True)
+                    })
+            finally:
+                await rate_limiter.release_slot(slot)
         else:
             # Send current question if already started
             await websocket.send_json({
@@ -113,49 +121,70 @@ async def websocket_branding(
                 await websocket.send_json({"status": "ERROR", "detail": f"Error receiving message: {str(e)}"})
                 break
 
-            # Reload state
-            state = branding_service.get_state(session_id)
+            if not lifecycle.accepting_turns:
+                # Draining (SIGTERM): the answer is not processed; the client
+                # reconnects to another worker, resumes from Redis and resends it
+                await websocket.close(code=status.WS_1012_SERVICE_RESTART)
+                return
 
-            if state.is_complete:
-                break
+            # Same quotas as the REST endpoints; the socket stays open when limited
+            try:
+                await rate_limiter.check("turns", current_user.id, session_id)
+                slot = await rate_limiter.acquire_slot(current_user.id)
+            except RateLimitExceeded as e:
+                await websocket.send_json({"status": "ERROR", "detail": e.detail, "retry_after": e.retry_after})
+                continue
 
-            # Run Agent
-            agent_result = agent.run(
-                state.profile, answer, state.last_question)
-            state.profile = agent_result.updated_profile
-
-            if not agent_result.is_complete and agent_result.next_question:
-                if answer:
-                    prev_q = state.last_question if state.last_question else "[Initial Inquiry]"
-                    state.history.append(BrandingTurn(
-                        question=prev_q, answer=answer))
-
-                state.last_question = agent_result.next_question
-                branding_service.save_state(session_id, state)
-
-                await websocket.send_json({
-                    "status": "ASK",
-                    "phase": "BRANDING",
-                    "question": agent_result.next_question,
-                    "context": state.profile.model_dump(exclude_none=True)
-                })
-
-            else:
-                state.is_complete = True
-                if answer:
-                    prev_q = state.last_question if state.last_question else "Final Input"
-                    state.history.append(BrandingTurn(
-                        question=prev_q, answer=answer))
-
-                save_branding_files(session_id, state.model_dump())
-                branding_service.delete_state(session_id)
-
-                await websocket.send_json({
-                    "status": "COMPLETE",
-                    "phase": "BRANDING",
-                    "requirements": state.profile.model_dump(exclude_none=True)
-                })
-                break
+            try:
+                with lifecycle.track_turn():
+                    # Reload state
+                    state = await asyncio.to_thread(branding_service.get_state, session_id)
+
+                    if state.is_complete:
+                        break
+
+                    # Run Agent
+                    start_turn(session_id)
+                    record_request("/branding/chat", answer=answer)
+                    agent_result = await asyncio.to_thread(
+                        agent.run,
+                        state.profile, answer, state.last_question)
+                    state.profile = agent_result.updated_profile
+
+                    if not agent_result.is_complete and agent_result.next_question:
+                        if answer:
+                            prev_q = state.last_question if state.last_question else "[Initial Inquiry]"
+                            state.history.append(BrandingTurn(
+                                question=prev_q, answer=answer))
+
+                        state.last_question = agent_result.next_question
+                        await asyncio.to_thread(branding_service.save_state, session_id, state)
+
+                        await websocket.send_json({
+                            "status": "ASK",
+                            "phase": "BRANDING",
+                            "question": agent_result.next_question,
+                            "context": state.profile.model_dump(exclude_none=True)
+                        })
+
+                    else:
+                        state.is_complete = True
+                        if answer:
+                            prev_q = state.last_question if state.last_question else "Final Input"
+                            state.history.append(BrandingTurn(
+                                question=prev_q, answer=answer))
+
+                        await asyncio.to_thread(save_branding_files, session_id, state.model_dump())
+                        await asyncio.to_thread(branding_service.delete_state, session_id)
+
+                        await websocket.send_json({
+                            "status": "COMPLETE",
+                            "phase": "BRANDING",
+                            "requirements": state.profile.model_dump(exclude_none=True)
+                        })
+                        break
+            finally:
+                await rate_limiter.release_slot(slot)
 
     except WebSocketDisconnect:
         pass
@@ -168,7 +197,7 @@ async def websocket_branding(
             pass
 
 
-@router.post("/branding/chat", response_model=BrandingResponse)
+@router.post("/branding/chat", response_model=BrandingResponse, dependencies=[Depends(rate_limit("turns"))])
 async def chat_branding(
     request: Request,
     current_user: User = Depends(get_current_user)
@@ -187,7 +216,7 @@ async def chat_branding(
         raise HTTPException(
             status_code=400, detail="this project requirements are already completed")
 
-    state = branding_service.get_state(session_id)
+    state = await asyncio.to_thread(branding_service.get_state, session_id)
     is_empty_input = (not answer or not str(answer).strip())
     if state.last_question and is_empty_input:
         raise HTTPException(
@@ -196,7 +225,9 @@ async def chat_branding(
     if state.is_complete:
         return BrandingCompleteResponse(status="COMPLETE", phase="BRANDING", requirements=state.profile.model_dump(exclude_none=True))
 
-    agent_result = agent.run(state.profile, answer, state.last_question)
+    start_turn(session_id)
+    record_request("/branding/chat", answer=answer)
+    agent_result = await asyncio.to_thread(agent.run, state.profile, answer, state.last_question)
     state.profile = agent_result.updated_profile
 
     if not agent_result.is_complete and agent_result.next_question:
@@ -204,13 +235,13 @@ async def chat_branding(
             prev_q = state.last_question if state.last_question else "[Initial Inquiry]"
             state.history.append(BrandingTurn(question=prev_q, answer=answer))
         state.last_question = agent_result.next_question
-        branding_service.save_state(session_id, state)
+        await asyncio.to_thread(branding_service.save_state, session_id, state)
         return BrandingAskResponse(status="ASK", phase="BRANDING", question=agent_result.next_question, context=state.profile.model_dump(exclude_none=True))
     else:
         state.is_complete = True
         if answer:
             prev_q = state.last_question if state.last_question else "Final Input"
             state.history.append(BrandingTurn(question=prev_q, answer=answer))
-        save_branding_files(session_id, state.model_dump())
-        branding_service.delete_state(session_id)
+        await asyncio.to_thread(save_branding_files, session_id, state.model_dump())
+        await asyncio.to_thread(branding_service.delete_state, session_id)
         return BrandingCompleteResponse(status="COMPLETE", phase="BRANDING", requirements=state.profile.model_dump(exclude_none=True))
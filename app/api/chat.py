@@ -1,23 +1,26 @@
 from datetime import datetime
 from app.models.user import User
-from app.api.deps import get_current_user, get_db
+from app.api.deps import get_current_user, get_websocket_user, rate_limit
 from fastapi import APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect, Query, status, Request
 from starlette.datastructures import UploadFile
-from sqlalchemy.orm import Session
 import os
 import json
+import asyncio
 
 from app.schemas.response import AskResponse, CompleteResponse
 from app.schemas.state import ConversationItem, LastQuestion
 
-from app.services.redis_service import redis_service
-from app.services.state_manager import initialize_state, build_ask_state
-from app.services.export_service import save_to_excel, get_branding_export, save_requirements
+from app.services.state_manager import initialize_state, build_ask_state, load_session_state, save_session_state, complete_session
+from app.services.export_service import get_branding_export
+from app.services.asset_store import asset_store
+from app.services.rate_limiter import rate_limiter, RateLimitExceeded
 
 from app.agent.agent import RequirementAgent
 from app.config import settings
-from app.services.auth_service import auth_service
-from app.services.user_service import user_service
+from app.utils.metrics import start_turn
+from app.utils.lifecycle import lifecycle
+from app.utils.recorder import record_request
+from app.utils.tracing import start_span
 
 import glob
 import logging
@@ -28,28 +31,16 @@ router = APIRouter()
 agent = RequirementAgent()
 
 
-async def get_websocket_user(websocket: WebSocket, token: str, db: Session):
-    try:
-        payload = auth_service.verify_token(token, None)
-        username = payload.get("sub")
-        if not username:
-            return None
-        return user_service.get_user_by_email(db, email=username)
-    except Exception:
-        return None
-
-
 @router.websocket("/ws/chat/{session_id}")
 async def websocket_chat(
     websocket: WebSocket,
     session_id: str,
-    token: str = Query(...),
-    db: Session = Depends(get_db)
+    token: str = Query(...)
 ):
     await websocket.accept()
 
     # 1. Authenticate
-    current_user = await get_websocket_user(websocket, token, db)
+    current_user = await get_websocket_user(websocket, token)
     if not current_user:
         await websocket.send_json({
             "status": "ERROR",
@@ -71,9 +62,9 @@ async def websocket_chat(
             return
 
         # 2️. Initial Session Load
-        stored_state = redis_service.get_session(session_id)
+        stored_state = await asyncio.to_thread(load_session_state, session_id)
         if not stored_state:
-            branding_data = get_branding_export(session_id)
+            branding_data = await asyncio.to_thread(get_branding_export, session_id)
             if not branding_data:
                 await websocket.send_json({
                     "status": "ERROR",
@@ -89,53 +80,74 @@ async def websocket_chat(
 
         # 3. If session just started and has no history, run agent once to get initial question
         if not session_state.last_question and not session_state.history:
-            agent_result = agent.run(
-                phase=session_state.phase,
-                context=session_state.context,
-                answer=None,
-                pending_intent=None,
-                additional_questions_asked=0,
-                last_question=None,
-                # Pass existing (empty) list
-                asked_questions=session_state.asked_questions,
-                company_profile=session_state.company_profile
-            )
-
-            # Save and send initial question
-            session_state.phase = agent_result.phase
-            session_state.context = agent_result.updated_context
-
-            if agent_result.status == "ASK":
-                session_state.last_question = LastQuestion(
-                    text=agent_result.question,
-                    asked_at=datetime.utcnow().isoformat()
-                )
-
-            # Update asked questions list
-            if agent_result.status == "ASK":
-                session_state.asked_questions.append(agent_result.question)
-
-            redis_service.set_session(
-                session_id,
-                build_ask_state(
-                    phase=agent_result.phase,
-                    context=agent_result.updated_context,
-                    question=agent_result.question,
-                    pending_intent=agent_result.pending_intent.model_dump(
-                    ) if agent_result.pending_intent else None,
-                    additional_questions_asked=agent_result.additional_questions_asked,
-                    history=[],
-                    asked_questions=session_state.asked_questions,
-                    company_profile=session_state.company_profile
-                )
-            )
+            if not lifecycle.accepting_turns:
+                await websocket.close(code=status.WS_1012_SERVICE_RESTART)
+                return
+            # The first question is a turn too: same quotas, and shutdown waits for it
+            try:
+                await rate_limiter.check("turns", current_user.id, session_id)
+                slot = await rate_limiter.acquire_slot(current_user.id)
+            except RateLimitExceeded as e:
+                await websocket.send_json({"status": "ERROR", "detail": e.detail, "retry_after": e.retry_after})
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                return
 
-            await websocket.send_json({
-                "status": agent_result.status,
-                "phase": agent_result.phase,
-                "question": agent_result.question,
-                "context": agent_result.updated_context
-            })
+            try:
+                with start_span("ws.chat.turn", {"session.id": session_id}), lifecycle.track_turn():
+                    start_turn(session_id)
+                    record_request("/chat", answer=None)
+                    agent_result = await asyncio.to_thread(
+                        agent.run,
+                        phase=session_state.phase,
+                        context=session_state.context,
+                        answer=None,
+                        pending_intent=None,
+                        additional_questions_asked=0,
+                        last_question=None,
+                        # Pass existing (empty) list
+                        asked_questions=session_state.asked_questions,
+                        company_profile=session_state.company_profile,
+                        session_id=session_id
+                    )
+
+                    # Save and send initial question
+                    session_state.phase = agent_result.phase
+                    session_state.context = agent_result.updated_context
+
+                    if agent_result.status == "ASK":
+                        session_state.last_question = LastQuestion(
+                            text=agent_result.question,
+                            asked_at=datetime.utcnow().isoformat()
+                        )
+
+                    # Update asked questions list
+                    if agent_result.status == "ASK":
+                        session_state.asked_questions.append(agent_result.question)
+
+                    await asyncio.to_thread(
+                        save_session_state,
+                        session_id,
+                        build_ask_state(
+                            phase=agent_result.phase,
+                            context=agent_result.updated_context,
+                            question=agent_result.question,
+                            pending_intent=agent_result.pending_intent.model_dump(
+                            ) if agent_result.pending_intent else None,
+                            additional_questions_asked=agent_result.additional_questions_asked,
+                            history=[],
+                            asked_questions=session_state.asked_questions,
+                            company_profile=session_state.company_profile
+                        )
+                    )
+
+                    await websocket.send_json({
+                        "status": agent_result.status,
+                        "phase": agent_result.phase,
+                        "question": agent_result.question,
+                        "context": agent_result.updated_context
+                    })
+            finally:
+                await rate_limiter.release_slot(slot)
         else:
             # Send current question if already started
             await websocket.send_json({
@@ -156,85 +168,104 @@ async def websocket_chat(
                 await websocket.send_json({"status": "ERROR", "detail": f"Error receiving message: {str(e)}"})
                 break
 
-            # Note: File uploads are still best handled via REST or
-            # as base64 in the 'answer' field. For now, we assume text 'answer'.
-
-            # Reload session state to ensure fresh data
-            stored_state = redis_service.get_session(session_id)
-            session_state = initialize_state(stored_state)
+            if not lifecycle.accepting_turns:
+                # Draining (SIGTERM): the answer is not processed; the client
+                # reconnects to another worker, resumes from Redis and resends it
+                await websocket.close(code=status.WS_1012_SERVICE_RESTART)
+                return
 
-            if session_state.last_question and answer:
-                new_item = ConversationItem(
-                    question=session_state.last_question.text,
-                    answer=str(answer),
-                    timestamp=datetime.utcnow().isoformat(),
-                    session_id=session_id
-                )
-                session_state.history.append(new_item)
-
-            # Run agent
-            agent_result = agent.run(
-                phase=session_state.phase,
-                context=session_state.context,
-                answer=answer,
-                pending_intent=(
-                    session_state.pending_intent.model_dump()
-                    if session_state.pending_intent
-                    else None
-                ),
-                additional_questions_asked=session_state.additional_questions_asked,
-                last_question=session_state.last_question.text if session_state.last_question else None,
-                asked_questions=session_state.asked_questions,
-                company_profile=session_state.company_profile
-            )
-
-            if agent_result.status == "ASK":
-                q_clean = agent_result.question.strip()
-                if q_clean not in [q.strip() for q in session_state.asked_questions]:
-                    session_state.asked_questions.append(q_clean)
-
-            if agent_result.status in ["ASK", "REJECT"]:
-                redis_service.set_session(
-                    session_id,
-                    build_ask_state(
-                        phase=agent_result.phase,
-                        context=agent_result.updated_context,
-                        question=agent_result.question,
-                        pending_intent=agent_result.pending_intent.model_dump(),
-                        additional_questions_asked=agent_result.additional_questions_asked,
-                        history=[item.model_dump()
-                                 for item in session_state.history],
+            # Same quotas as the REST endpoints; the socket stays open when limited
+            try:
+                await rate_limiter.check("turns", current_user.id, session_id)
+                slot = await rate_limiter.acquire_slot(current_user.id)
+            except RateLimitExceeded as e:
+                await websocket.send_json({"status": "ERROR", "detail": e.detail, "retry_after": e.retry_after})
+                continue
+
+            start_turn(session_id)
+            record_request("/chat", answer=answer)
+            try:
+                with start_span("ws.chat.turn", {"session.id": session_id}), lifecycle.track_turn():
+                    # Note: File uploads are still best handled via REST or
+                    # as base64 in the 'answer' field. For now, we assume text 'answer'.
+
+                    # Reload session state to ensure fresh data
+                    stored_state = await asyncio.to_thread(load_session_state, session_id)
+                    session_state = initialize_state(stored_state)
+
+                    if session_state.last_question and answer:
+                        new_item = ConversationItem(
+                            question=session_state.last_question.text,
+                            answer=str(answer),
+                            timestamp=datetime.utcnow().isoformat(),
+                            session_id=session_id
+                        )
+                        session_state.history.append(new_item)
+
+                    # Run agent
+                    agent_result = await asyncio.to_thread(
+                        agent.run,
+                        phase=session_state.phase,
+                        context=session_state.context,
+                        answer=answer,
+                        pending_intent=(
+                            session_state.pending_intent.model_dump()
+                            if session_state.pending_intent
+                            else None
+                        ),
+                        additional_questions_asked=session_state.additional_questions_asked,
+                        last_question=session_state.last_question.text if session_state.last_question else None,
                         asked_questions=session_state.asked_questions,
-                        company_profile=session_state.company_profile
-                    )
-                )
-
-                await websocket.send_json({
-                    "status": agent_result.status,
-                    "phase": agent_result.phase,
-                    "question": agent_result.question,
-                    "context": agent_result.updated_context
-                })
-
-            elif agent_result.status == "COMPLETE":
-                if session_state.history:
-                    save_to_excel(
-                        session_id=session_id,
-                        history=[item.model_dump()
-                                 for item in session_state.history]
+                        company_profile=session_state.company_profile,
+                        session_id=session_id
                     )
-                    save_requirements(
-                        session_id=session_id,
-                        requirements=agent_result.requirements
-                    )
-
-                redis_service.delete_session(session_id)
 
-                await websocket.send_json({
-                    "status": "COMPLETE",
-                    "requirements": agent_result.requirements
-                })
-                break
+                    if agent_result.status == "ASK":
+                        q_clean = agent_result.question.strip()
+                        if q_clean not in [q.strip() for q in session_state.asked_questions]:
+                            session_state.asked_questions.append(q_clean)
+
+                    if agent_result.status in ["ASK", "REJECT"]:
+                        await asyncio.to_thread(
+                            save_session_state,
+                            session_id,
+                            build_ask_state(
+                                phase=agent_result.phase,
+                                context=agent_result.updated_context,
+                                question=agent_result.question,
+                                pending_intent=agent_result.pending_intent.model_dump(),
+                                additional_questions_asked=agent_result.additional_questions_asked,
+                                history=[item.model_dump()
+                                         for item in session_state.history],
+                                asked_questions=session_state.asked_questions,
+                                company_profile=session_state.company_profile
+                            ),
+                            previous_phase=session_state.phase
+                        )
+
+                        await websocket.send_json({
+                            "status": agent_result.status,
+                            "phase": agent_result.phase,
+                            "question": agent_result.question,
+                            "context": agent_result.updated_context
+                        })
+
+                    elif agent_result.status == "COMPLETE":
+                        await asyncio.to_thread(
+                            complete_session,
+                            session_id,
+                            history=[item.model_dump()
+                                     for item in session_state.history],
+                            requirements=agent_result.requirements
+                        )
+
+                        await websocket.send_json({
+                            "status": "COMPLETE",
+                            "requirements": agent_result.requirements
+                        })
+                        break
+            finally:
+                await rate_limiter.release_slot(slot)
 
     except WebSocketDisconnect:
         pass
@@ -247,7 +278,7 @@ async def websocket_chat(
             pass
 
 
-@router.post("/chat", response_model=AskResponse | CompleteResponse)
+@router.post("/chat", response_model=AskResponse | CompleteResponse, dependencies=[Depends(rate_limit("turns"))])
 async def chat(request: Request, current_user: User = Depends(get_current_user)):
     # Keep the REST endpoint as a fallback or for simple integration
     # (Existing logic same as before, but maybe user prefers WS now)
@@ -259,6 +290,9 @@ async def chat(request: Request, current_user: User = Depends(get_current_user))
     session_id = form.get("session_id")
     answer = form.get("answer")
 
+    if not session_id:
+        raise HTTPException(status_code=400, detail="session_id is required")
+
     # Handle File Uploads (Same as before)
     uploaded_files = []
     for key, value in form.items():
@@ -270,21 +304,17 @@ async def chat(request: Request, current_user: User = Depends(get_current_user))
 
     if uploaded_files:
         uploaded_info = []
-        session_upload_dir = settings.EXPORT_IMAGES_DIR / session_id
-        os.makedirs(session_upload_dir, exist_ok=True)
 
         for key, file in uploaded_files:
-            file_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             orig_filename = file.filename or ""
             ext = os.path.splitext(orig_filename)[1] or ""
             safe_key = "".join(
                 [c if c.isalnum() or c in "._-" else "_" for c in key])
-            filename = f"{file_timestamp}_{safe_key}{ext}"
 
-            file_path = session_upload_dir / filename
+            # Content-addressed: identical bytes are stored (and analyzed) once
             content = await file.read()
-            with open(file_path, "wb") as f:
-                f.write(content)
+            # Hashing and the blob/index writes stay off the event loop
+            await asyncio.to_thread(asset_store.put, session_id, safe_key, content, ext)
 
             uploaded_info.append(f"{key}{ext}")
 
@@ -294,18 +324,15 @@ async def chat(request: Request, current_user: User = Depends(get_current_user))
         else:
             answer = f"{answer} {upload_msg}"
 
-    if not session_id:
-        raise HTTPException(status_code=400, detail="session_id is required")
-
     search_pattern = settings.EXPORT_JSON_DIR / \
         f"requirements_{session_id}_*.json"
     if glob.glob(str(search_pattern)):
         raise HTTPException(
             status_code=400, detail="this project requirements are already completed")
 
-    stored_state = redis_service.get_session(session_id)
+    stored_state = await asyncio.to_thread(load_session_state, session_id)
     if not stored_state:
-        branding_data = get_branding_export(session_id)
+        branding_data = await asyncio.to_thread(get_branding_export, session_id)
         if not branding_data:
             raise HTTPException(
                 status_code=403, detail="Branding Phase Required. Please complete the company profile interview first.")
@@ -338,7 +365,10 @@ async def chat(request: Request, current_user: User = Depends(get_current_user))
         session_state.history.append(new_item)
 
     try:
-        agent_result = agent.run(
+        start_turn(session_id)
+        record_request("/chat", answer=normalized_answer)
+        agent_result = await asyncio.to_thread(
+            agent.run,
             phase=session_state.phase,
             context=session_state.context,
             answer=normalized_answer,
@@ -347,7 +377,8 @@ async def chat(request: Request, current_user: User = Depends(get_current_user))
             additional_questions_asked=session_state.additional_questions_asked,
             last_question=session_state.last_question.text if session_state.last_question else None,
             asked_questions=session_state.asked_questions,
-            company_profile=session_state.company_profile
+            company_profile=session_state.company_profile,
+            session_id=session_id
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -358,7 +389,8 @@ async def chat(request: Request, current_user: User = Depends(get_current_user))
             session_state.asked_questions.append(q_clean)
 
     if agent_result.status in ["ASK", "REJECT"]:
-        redis_service.set_session(
+        await asyncio.to_thread(
+            save_session_state,
             session_id,
             build_ask_state(
                 phase=agent_result.phase,
@@ -369,17 +401,14 @@ async def chat(request: Request, current_user: User = Depends(get_current_user))
                 history=[item.model_dump() for item in session_state.history],
                 asked_questions=session_state.asked_questions,
                 company_profile=session_state.company_profile
-            )
+            ),
+            previous_phase=session_state.phase
         )
         return AskResponse(status=agent_result.status, phase=agent_result.phase, question=agent_result.question, context=agent_result.updated_context)
 
     if agent_result.status == "COMPLETE":
-        if session_state.history:
-            save_to_excel(session_id=session_id, history=[
-                          item.model_dump() for item in session_state.history])
-            save_requirements(session_id=session_id,
-                              requirements=agent_result.requirements)
-        redis_service.delete_session(session_id)
+        await asyncio.to_thread(complete_session, session_id, history=[item.model_dump() for item in session_state.history],
+                                requirements=agent_result.requirements)
         return CompleteResponse(status="COMPLETE", requirements=agent_result.requirements)
 
     raise HTTPException(status_code=500, detail="Invalid agent response")
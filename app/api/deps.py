@@ -1,10 +1,13 @@
-from fastapi import Depends, HTTPException, status, Header
+from fastapi import Depends, HTTPException, status, Header, WebSocket, Request
 from jose import JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from app.database import get_db
+from app.database import get_async_db, AsyncSessionLocal
 from app.services.auth_service import auth_service
 from app.services.user_service import user_service
+from app.services.principal_cache import principal_cache
+from app.services.rate_limiter import rate_limiter, RateLimitExceeded
+from app.config import settings
 from app.schemas.token import TokenData
 from app.models.user import User
 
@@ -39,7 +42,23 @@ def get_token_from_header(authorization: Optional[str] = Header(None)) -> str:
     return token
 
 
-async def get_current_user(token: str = Depends(get_token_from_header), db: Session = Depends(get_db)) -> User:
+async def resolve_principal(db: AsyncSession, email: str) -> User | None:
+    """
+    User for a token subject. In-process hits return without any I/O;
+    otherwise Redis, then Postgres, are queried.
+    """
+    if not settings.principal_cache_enabled:
+        return await user_service.get_user_by_email_async(db, email)
+
+    user = principal_cache.get_local(email) or await principal_cache.get_shared(email)
+    if user is None:
+        user = await user_service.get_user_by_email_async(db, email)
+        if user is not None:
+            await principal_cache.put(user)
+    return user
+
+
+async def get_current_user(token: str = Depends(get_token_from_header), db: AsyncSession = Depends(get_async_db)) -> User:
     try:
         payload = auth_service.verify_token(token, None)
         username: str = payload.get("sub")
@@ -51,7 +70,7 @@ async def get_current_user(token: str = Depends(get_token_from_header), db: Sess
             )
 
         token_data = TokenData(username=username)
-        user = user_service.get_user_by_email(db, email=token_data.username)
+        user = await resolve_principal(db, token_data.username)
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -67,3 +86,59 @@ async def get_current_user(token: str = Depends(get_token_from_header), db: Sess
             detail=f"Token validation failed: {str(e)}",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+
+async def get_websocket_user(websocket: WebSocket, token: str):
+    try:
+        payload = auth_service.verify_token(token, None)
+        username = payload.get("sub")
+        if not username:
+            return None
+        # Short-lived session: the socket must not pin a pooled connection
+        async with AsyncSessionLocal() as db:
+            return await resolve_principal(db, username)
+    except Exception:
+        return None
+
+
+async def _request_session_id(request: Request) -> str | None:
+    """
+    session_id from the path, a JSON body or a form (all cached by the request,
+    so the route reads them again for free).
+    """
+    session_id = request.path_params.get("session_id")
+    if session_id:
+        return session_id
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("application/json"):
+            body = await request.json()
+            return body.get("session_id") if isinstance(body, dict) else None
+        if content_type.startswith(("multipart/form-data", "application/x-www-form-urlencoded")):
+            value = (await request.form()).get("session_id")
+            return value if isinstance(value, str) else None
+    except Exception:
+        # Malformed bodies are rejected by the route's own validation
+        return None
+    return None
+
+
+def rate_limit(bucket: str):
+    """
+    Dependency for LLM-backed routes: takes a token from the user's and the
+    session's bucket and holds one of the user's concurrent-request slots
+    until the response is produced. Responds 429 with Retry-After otherwise.
+    """
+    async def dependency(request: Request, current_user: User = Depends(get_current_user)):
+        try:
+            await rate_limiter.check(bucket, current_user.id, await _request_session_id(request))
+            async with rate_limiter.llm_slot(current_user.id):
+                yield current_user
+        except RateLimitExceeded as e:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=e.detail,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+
+    return dependency
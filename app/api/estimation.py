@@ -1,59 +1,77 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from app.services.export_service import get_latest_requirements_file, save_estimated_sitemap, get_branding_export, append_screens_to_excel
-from app.agent.estimator import PageEstimationAgent
-from app.schemas.estimation import SiteMapResponse, EstimateRequest, DeleteEstimationRequest
+from app.services.export_service import get_latest_requirements_file, get_branding_export, append_screens_to_excel
+from app.services.export_service import save_requirements, replace_estimated_sitemap, get_latest_sitemap, save_estimation_source, get_estimation_source
+from app.services.session_jobs import estimator, estimate_session, SessionJobError
+from app.schemas.estimation import SiteMapResponse, EstimateRequest, DeleteEstimationRequest, RefreshEstimationRequest
 from app.models.user import User
-from app.api.deps import get_current_user
-from app.config import settings
-import glob
+from app.api.deps import get_current_user, rate_limit
+from app.utils.metrics import start_turn
+from app.utils.recorder import record_request
 router = APIRouter()
-estimator = PageEstimationAgent()
 
 
 class EstimateRequest(BaseModel):
     session_id: str
 
 
-@router.post("/estimate", response_model=SiteMapResponse)
+@router.post("/estimate", response_model=SiteMapResponse, dependencies=[Depends(rate_limit("estimations"))])
 def generate_sitemap(request: EstimateRequest, current_user: User = Depends(get_current_user)):
+    start_turn(request.session_id, priority="batch")
+    record_request("/estimate")
 
-    search_pattern = settings.EXPORT_JSON_DIR / \
-        f"requirements_{request.session_id}_*.json"
-    if not glob.glob(str(search_pattern)):
-        raise HTTPException(
-            status_code=400, detail="this session for SRS is not completed yet")
-
-    search_pattern = settings.EXPORT_ESTIMATED_DIR / \
-        f"sitemap_{request.session_id}_*.json"
-    if glob.glob(str(search_pattern)):
-        raise HTTPException(
-            status_code=400, detail="this session is already estimated")
-
-    # 1. Fetch SRS Data (Technical Requirements)
-    srs_filepath, srs_data = get_latest_requirements_file(request.session_id)
-    if not srs_filepath or not srs_data:
+    try:
+        return estimate_session(request.session_id)
+    except SessionJobError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+
+@router.post("/estimate/refresh", response_model=SiteMapResponse, dependencies=[Depends(rate_limit("estimations"))])
+def refresh_sitemap(request: RefreshEstimationRequest, current_user: User = Depends(get_current_user)):
+    """
+    Incremental re-estimation: only pages affected by changed requirements
+    are regenerated, the rest of the stored sitemap is kept.
+    """
+    start_turn(request.session_id, priority="batch")
+    record_request("/estimate/refresh", requirements=request.requirements)
+    old_sitemap = get_latest_sitemap(request.session_id)
+    if not old_sitemap:
         raise HTTPException(
-            status_code=404, detail="SRS Requirements not found.")
+            status_code=404, detail="Sitemap not found. Please run /estimate first.")
+
+    # 1. Resolve the new requirements (persist them when sent inline)
+    if request.requirements is not None:
+        save_requirements(request.session_id, request.requirements)
+        srs_data = request.requirements
+    else:
+        srs_filepath, srs_data = get_latest_requirements_file(
+            request.session_id)
+        if not srs_filepath or not srs_data:
+            raise HTTPException(
+                status_code=404, detail="SRS Requirements not found.")
 
-    # 2. Fetch Branding Data (Company Profile)
     branding_data = get_branding_export(request.session_id)
 
-    if not branding_data:
-        raise HTTPException(
-            status_code=400,
-            detail="Branding is required for this session id. Please complete the branding phase first."
-        )
-
-    # 3. RUN ESTIMATOR with BOTH inputs
+    # 2. Diff against the SRS the stored sitemap was estimated from
     try:
-        sitemap = estimator.estimate(srs_data, branding_data)
+        sitemap, regenerated = estimator.estimate_incremental(
+            get_estimation_source(request.session_id),
+            srs_data,
+            SiteMapResponse.model_validate(old_sitemap),
+            branding_data
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"AI Estimation failed: {str(e)}")
 
-    # 4. Save the result
-    save_estimated_sitemap(request.session_id, sitemap.model_dump())
+    if sitemap.model_dump() == old_sitemap:
+        return sitemap
+
+    # 3. Replace the stored sitemap
+    print(
+        f"Incremental estimation for {request.session_id}: regenerated {len(regenerated)} page(s): {regenerated}")
+    replace_estimated_sitemap(request.session_id, sitemap.model_dump())
+    save_estimation_source(request.session_id, srs_data)
 
     try:
         append_screens_to_excel(request.session_id, sitemap.model_dump())
@@ -0,0 +1,144 @@
+import os
+import time
+import asyncio
+import tempfile
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from prometheus_client import Gauge
+from sqlalchemy import text
+from app.config import settings
+from app.database import async_engine
+from app.services.redis_service import redis_service
+from app.utils.lifecycle import lifecycle
+from app.utils.llm_utils import breaker_states
+from app.utils.llm_scheduler import llm_scheduler
+
+router = APIRouter()
+
+DEPENDENCY_UP = Gauge("dependency_up", "Last readiness probe result per dependency", ["dependency"])
+DEPENDENCY_LATENCY = Gauge(
+    "dependency_probe_latency_seconds", "Last readiness probe latency per dependency", ["dependency"])
+
+EXPORT_DIRS = (settings.EXPORT_XLSX_DIR, settings.EXPORT_JSON_DIR, settings.EXPORT_ESTIMATED_DIR,
+               settings.EXPORT_PROMPTS_DIR, settings.EXPORT_IMAGES_DIR, settings.EXPORT_BRANDING_DIR,
+               settings.SNAPSHOT_DIR)
+
+
+async def _probe_redis() -> None:
+    await redis_service.async_client.ping()
+
+
+async def _probe_database() -> None:
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+def _check_export_dirs() -> None:
+    for directory in EXPORT_DIRS:
+        # Directories are created on first export; until then the parent must be writable
+        target = directory if directory.exists() else directory.parent
+        with tempfile.NamedTemporaryFile(dir=target, prefix=".health-"):
+            pass
+
+
+async def _probe_exports() -> None:
+    await asyncio.to_thread(_check_export_dirs)
+
+
+class ReadinessProbe:
+    """
+    Dependency checks behind /health/ready. Results are cached for
+    HEALTH_CACHE_SECONDS and concurrent probes share one run, so load
+    balancer polling never fans out into Redis/Postgres traffic.
+    """
+
+    # Dependencies that make this pod unfit for traffic when down. The LLM
+    # provider is reported only: an outage there affects every pod alike.
+    CRITICAL = ("redis", "database", "exports")
+
+    def __init__(self):
+        self._result = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _check(self, name: str, probe) -> dict:
+        started_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(probe(), settings.health_probe_timeout_seconds)
+            result = {"ok": True}
+        except Exception as e:
+            result = {"ok": False, "error": str(e) or type(e).__name__}
+        latency = time.perf_counter() - started_at
+        result["latency_ms"] = round(1000 * latency, 1)
+        DEPENDENCY_UP.labels(name).set(1 if result["ok"] else 0)
+        DEPENDENCY_LATENCY.labels(name).set(latency)
+        return result
+
+    async def run(self) -> dict:
+        async with self._lock:
+            if self._result is not None and time.monotonic() < self._expires_at:
+                return self._result
+
+            redis, database, exports = await asyncio.gather(
+                self._check("redis", _probe_redis),
+                self._check("database", _probe_database),
+                self._check("exports", _probe_exports),
+            )
+            breakers = breaker_states()
+            llm_ok = any(b["state"] != "open" for b in breakers.values())
+            DEPENDENCY_UP.labels("llm").set(1 if llm_ok else 0)
+
+            checks = {"redis": redis, "database": database, "exports": exports,
+                      "llm": {"ok": llm_ok, "breakers": breakers, "scheduler": llm_scheduler.snapshot()}}
+            self._result = {"checks": checks, "checked_at": time.time()}
+            self._expires_at = time.monotonic() + settings.health_cache_seconds
+            return self._result
+
+
+readiness_probe = ReadinessProbe()
+
+
+@router.get("/health")
+def health_check():
+    return {
+        "status": "ok",
+        "message": "Requirement Agent API is running",
+        "state": lifecycle.state
+    }
+
+
+@router.get("/health/live")
+def liveness_check():
+    """
+    Process is up and serving; never touches dependencies.
+    """
+    return {"status": "ok", "state": lifecycle.state, "pid": os.getpid()}
+
+
+@router.get("/health/ready")
+async def readiness_check():
+    """
+    503 while warming up or draining, or when a critical dependency
+    (Redis, Postgres, export directories) fails its probe.
+    """
+    result = await readiness_probe.run()
+    checks = result["checks"]
+    critical_ok = all(checks[name]["ok"] for name in ReadinessProbe.CRITICAL)
+    ready = lifecycle.state == "ready" and critical_ok
+
+    if not ready:
+        status = "unavailable"
+    elif not checks["llm"]["ok"]:
+        status = "degraded"
+    else:
+        status = "ok"
+
+    body = {
+        "status": status,
+        "state": lifecycle.state,
+        "in_flight_turns": lifecycle.in_flight,
+        "checks": checks,
+        "checked_at": result["checked_at"],
+        "warmup": lifecycle.warmup,
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
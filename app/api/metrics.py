@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from app.agent.planner import planner
+from app.agent.agent import repetition_stats
+
+router = APIRouter()
+
+
+class AgentStatsCollector:
+    """
+    Exposes the in-process planner / repetition-guard counters at scrape time.
+    """
+
+    def collect(self):
+        stats = planner.stats.snapshot()
+        turns = CounterMetricFamily(
+            "agent_turns", "Requirement turns by path", labels=["path"])
+        turns.add_metric(["local"], stats["local_turns"])
+        turns.add_metric(["llm"], stats["llm_turns"])
+        yield turns
+        yield GaugeMetricFamily(
+            "agent_local_turn_fraction", "Fraction of turns served by the local planner",
+            value=stats["local_fraction"])
+        yield CounterMetricFamily(
+            "agent_planner_saved_seconds", "Estimated LLM latency saved by the local planner",
+            value=stats["estimated_saved_seconds"])
+
+        repetition = repetition_stats.snapshot()
+        yield CounterMetricFamily(
+            "agent_repetition_retried_turns", "LLM turns that needed a repetition/fishing retry",
+            value=repetition["retried_turns"])
+        yield CounterMetricFamily(
+            "agent_repetition_forced_rejects", "Turns forced to REJECT after exhausting retries",
+            value=repetition["forced_rejects"])
+
+
+REGISTRY.register(AgentStatsCollector())
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from uuid import UUID
 
-from app.database import get_db
+from app.database import get_async_db
 from app.schemas.user import UserCreate, UserUpdate, UserResponse, UserRegister, UserDelete, Msg
 from app.services.user_service import user_service
 from app.api.deps import get_current_user
@@ -13,35 +13,48 @@ router = APIRouter()
 
 
 @router.post("/", response_model=UserResponse)
-def create_user(request: UserRegister, db: Session = Depends(get_db)):
+async def create_user(request: UserRegister, db: AsyncSession = Depends(get_async_db)):
     try:
-        db_user = user_service.get_user_by_email(db, email=request.email)
+        db_user = await user_service.get_user_by_email_async(db, request.email)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     if db_user:
         raise HTTPException(
             status_code=400, detail="Email already registered")
-    return user_service.create_user(db=db, user=request)
+    return await user_service.create_user_async(db=db, user=request)
 
 
 @router.get("/", response_model=List[UserResponse])
-def read_users(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+async def read_users(
+    response: Response,
+    cursor: str | None = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    include_total: bool = Query(False, description="Set X-Total-Count (estimated on Postgres)"),
+    skip: int = Query(0, ge=0, deprecated=True),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     try:
-        users = user_service.get_users(db, skip=skip, limit=limit)
+        # Legacy offset paging, kept for existing callers
+        if skip:
+            return await user_service.get_users_async(db, skip=skip, limit=limit)
+
+        users, next_cursor = await user_service.list_users_page(db, cursor=cursor, limit=limit)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        if include_total:
+            response.headers["X-Total-Count"] = str(await user_service.count_users_async(db))
         return users
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-def read_user(user_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def read_user(user_id: UUID, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     try:
-        db_user = user_service.get_user(db, user_id=user_id)
+        db_user = await user_service.get_user_async(db, user_id=user_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     if db_user is None:
@@ -50,13 +63,13 @@ def read_user(user_id: UUID, db: Session = Depends(get_db), current_user: User =
 
 
 @router.patch("/", response_model=UserResponse)
-def update_user(
+async def update_user(
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     try:
-        db_user = user_service.update_user(
+        db_user = await user_service.update_user_async(
             db, user_id=user_update.user_id, user_update=user_update)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -66,9 +79,9 @@ def update_user(
 
 
 @router.delete("/", response_model=Msg)
-def delete_user(user_delete: UserDelete, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def delete_user(user_delete: UserDelete, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     try:
-        success = user_service.delete_user(db, user_id=user_delete.user_id)
+        success = await user_service.delete_user_async(db, user_id=user_delete.user_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     if not success:
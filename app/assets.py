@@ -0,0 +1,50 @@
+"""
+Maintenance of uploaded brand assets (content-addressed blob store).
+
+    python -m app.assets release s1 s2       # drop the sessions' assets
+    python -m app.assets release --sessions-file done.txt --dry-run
+
+Releasing a session removes its manifest and its references in the blob
+index; blobs no other session references are deleted together with their
+cached vision analysis. Release a session once its prompts are final:
+prompt generation (incremental included) reads the assets.
+"""
+import sys
+import argparse
+from pathlib import Path
+from app.services.asset_store import asset_store
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.assets", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    release = commands.add_parser("release", help="Drop the assets of finished sessions")
+    release.add_argument("sessions", nargs="*", help="Session ids")
+    release.add_argument("--sessions-file", help="File with one session id per line")
+    release.add_argument("--dry-run", action="store_true", help="Count each session's assets without changing anything")
+    args = parser.parse_args()
+
+    sessions = list(args.sessions)
+    if args.sessions_file:
+        lines = Path(args.sessions_file).read_text(encoding="utf-8").splitlines()
+        sessions += [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+    if not sessions:
+        sys.exit("No sessions given")
+
+    total = 0
+    for session_id in sessions:
+        if args.dry_run:
+            # Read-only: list_assets() would import (and move) legacy files
+            assets = asset_store.manifest(session_id)
+            print(f"{session_id}: {len(assets)} asset(s)")
+            continue
+        removed = asset_store.release_session(session_id)
+        total += removed
+        print(f"{session_id}: released, {removed} blob(s) deleted")
+    if not args.dry_run:
+        print(f"{len(sessions)} session(s) released, {total} blob(s) deleted")
+
+
+if __name__ == "__main__":
+    main()
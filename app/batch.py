@@ -0,0 +1,88 @@
+"""
+Batch estimation and prompt generation over many sessions.
+
+    python -m app.batch estimate                      # every eligible session
+    python -m app.batch prompts --sessions s1 s2 s3
+    python -m app.batch prompts --sessions-file sessions.txt --incremental
+    python -m app.batch estimate --resume estimate_20260101_120000_ab12cd
+
+Without --sessions, eligible sessions are discovered from the export
+directories. Progress is checkpointed to BATCH_DIR/<job_id>.json after each
+session; --resume re-runs the pending and failed sessions of a job.
+Exits with status 1 when any session failed.
+
+The CLI's LLM calls are admitted by its own, process-local scheduler, which
+knows nothing about the API workers' calls. It therefore runs with at most
+BATCH_CLI_MAX_IN_FLIGHT_PER_MODEL (--max-in-flight) calls per model; run large
+batches through POST /batch/{kind} to share the API's limits instead.
+"""
+import sys
+import json
+import logging
+import argparse
+from pathlib import Path
+from app.config import settings
+from app.services.batch_service import BatchJob, BATCH_KINDS, discover_sessions
+
+
+def _read_sessions(args) -> list[str] | None:
+    if args.sessions_file:
+        lines = Path(args.sessions_file).read_text(encoding="utf-8").splitlines()
+        return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+    return args.sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.batch", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=BATCH_KINDS)
+    sources = parser.add_mutually_exclusive_group()
+    sources.add_argument("--sessions", nargs="+", help="Session ids (default: discover eligible sessions)")
+    sources.add_argument("--sessions-file", help="File with one session id per line")
+    sources.add_argument("--resume", metavar="JOB_ID", help="Continue a previous job")
+    parser.add_argument("--incremental", action="store_true",
+                        help="prompts: regenerate changed screens of sessions that already have prompts")
+    parser.add_argument("--workers", type=int, help="Sessions processed at once (default BATCH_WORKERS)")
+    parser.add_argument("--max-in-flight", type=int, default=settings.batch_cli_max_in_flight_per_model,
+                        help="LLM calls in flight per model (default BATCH_CLI_MAX_IN_FLIGHT_PER_MODEL)")
+    parser.add_argument("--dry-run", action="store_true", help="List the sessions (with --resume: the pending and failed ones) and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:     %(message)s")
+    # Read when the scheduler creates a model's gate, i.e. on the first call
+    settings.llm_max_in_flight_per_model = max(1, args.max_in_flight)
+    # No interview turns in this process to reserve slots for
+    settings.llm_interactive_reserved_slots = 0
+
+    if args.resume:
+        job = BatchJob.load(args.resume)
+        if job is None:
+            sys.exit(f"No batch job {args.resume}")
+        if job.kind != args.kind:
+            sys.exit(f"Job {args.resume} is a {job.kind} job")
+        if args.dry_run:
+            # The sessions a resume would run, nothing more
+            for session_id in job.pending_sessions():
+                print(f"{session_id}\t{job.state['sessions'][session_id]['status']}")
+            return
+    else:
+        sessions = _read_sessions(args)
+        if args.dry_run:
+            for session_id in sessions if sessions is not None else discover_sessions(args.kind, args.incremental):
+                print(session_id)
+            return
+        job = BatchJob.create(args.kind, sessions, args.incremental)
+
+    print(f"Batch job {job.job_id}: {len(job.state['sessions'])} session(s), checkpoint {BatchJob.path(job.job_id)}")
+    summary = job.run(args.workers)
+
+    print(json.dumps(summary, indent=4))
+    for session_id, result in job.state["sessions"].items():
+        if result["status"] in ("failed", "skipped"):
+            print(f"    {result['status']:<8} {session_id}: {result.get('detail')}")
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
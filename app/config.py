@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -30,12 +31,58 @@ class Settings(BaseSettings):
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     REFRESH_TOKEN_EXPIRE_DAYS: int
+    # pbkdf2_sha256 rounds for new hashes (passlib default 29000)
+    password_hash_rounds: int = 29000
+    # Bounded pool for hashing on auth paths: "thread" (hashlib releases the GIL) or "process"
+    password_hash_executor: Literal["thread", "process"] = "thread"
+    password_hash_workers: int = 2
+    # Authenticated principals cached by token subject (skips the DB on hits)
+    principal_cache_enabled: bool = True
+    principal_cache_ttl_seconds: int = 30
+    principal_cache_redis_ttl_seconds: int = 300
+    # Token-bucket limits per user (sustained rate + burst) for LLM-backed work
+    rate_limit_enabled: bool = True
+    rate_limit_turns_per_minute: float = 20
+    rate_limit_turns_burst: int = 10
+    rate_limit_estimations_per_minute: float = 2
+    rate_limit_estimations_burst: int = 3
+    rate_limit_prompts_per_minute: float = 2
+    rate_limit_prompts_burst: int = 3
+    # Fraction of the user's rate and burst available to a single session
+    rate_limit_session_share: float = 0.5
+    # Concurrent LLM-backed requests per user (slots expire after the lease)
+    llm_concurrency_per_user: int = 3
+    llm_concurrency_lease_seconds: int = 600
 
     # OpenRouter
     openrouter_api_key: str
     openrouter_base_url: str = "https://openrouter.ai/api/v1"
     openrouter_model: str = "openai/gpt-oss-120b:free"
     openrouter_fallback_model: str = "xiaomi/mimo-v2-flash:free"
+    # Send pydantic schemas as json_schema response formats where supported
+    llm_structured_output: bool = True
+    # Seconds a model keeps the plain JSON format after rejecting a schema
+    llm_schema_rejection_ttl_seconds: int = 3600
+    # Stream completions to measure time-to-first-token (llm_time_to_first_token_seconds)
+    llm_measure_ttft: bool = False
+    # Pooled keep-alive connections to the LLM provider (shared by all calls)
+    llm_max_connections: int = 20
+    # Circuit breaker per model: skip a model after N consecutive failures for the cooldown
+    llm_breaker_failure_threshold: int = 5
+    llm_breaker_cooldown_seconds: int = 30
+    # LLM admission control (per process): in-flight calls per model, cut on
+    # provider 429s and regrown on success (AIMD); interactive turns go first
+    llm_scheduler_enabled: bool = True
+    llm_max_in_flight_per_model: int = 8
+    llm_min_in_flight_per_model: int = 1
+    # Slots per model that batch calls (estimation, prompts) never take
+    llm_interactive_reserved_slots: int = 2
+    llm_backoff_factor: float = 0.5
+    # Longest wait for a slot before the call fails (per priority class)
+    llm_queue_timeout_interactive_seconds: float = 30
+    llm_queue_timeout_batch_seconds: float = 300
+    # Record API requests + LLM exchanges per session for offline replay (benchmarks/)
+    llm_record_dir: Path | None = None
 
     #gemini
     google_api_key: str
@@ -47,6 +94,56 @@ class Settings(BaseSettings):
     langchain_project: str = "Default Project"
     langchain_endpoint: str = "https://api.smith.langchain.com"
 
+    # OpenTelemetry tracing (opt-in). Spans go to an OTLP/HTTP collector
+    # (default http://localhost:4318/v1/traces) and/or a JSON-lines file.
+    otel_tracing_enabled: bool = False
+    otel_service_name: str = "srs-agent"
+    otel_exporter_otlp_endpoint: str | None = None
+    otel_trace_file: Path | None = None
+
+    # Start-up warm-up (Redis, DB pool, LLM connections) and graceful shutdown
+    warmup_enabled: bool = True
+    warmup_db_connections: int = 2
+    warmup_timeout_seconds: int = 15
+    # Load tiktoken encodings at start-up (downloads the BPE files on first run)
+    warmup_tiktoken_encodings: list[str] = []
+    # Interview snapshots: written in the background, coalesced per session and
+    # flushed every N seconds (immediately on a phase change)
+    snapshot_enabled: bool = True
+    snapshot_flush_interval_seconds: float = 5.0
+    # Seconds to wait for in-flight interview turns on shutdown
+    shutdown_drain_timeout_seconds: int = 30
+
+    # Dependency probes behind /health/ready (results cached between probes)
+    health_cache_seconds: float = 5.0
+    health_probe_timeout_seconds: float = 2.0
+
+    # Event-loop monitor (opt-in): lag histogram + stacks of steps blocking the loop
+    loop_monitor_enabled: bool = False
+    loop_monitor_interval_seconds: float = 0.1
+    loop_blocking_threshold_seconds: float = 0.1
+
+    # Requirement agent
+    # Serve trivially structured turns (skips, short lists) without an LLM call
+    local_planner_enabled: bool = True
+    # Cosine similarity (TF-IDF over asked questions) above which a question is a repeat
+    duplicate_question_threshold: float = 0.72
+    duplicate_index_max_sessions: int = 1024
+    # Extra LLM calls allowed when a generated question is still a repeat/fishing
+    max_repetition_retries: int = 1
+
+    # Estimation (map-reduce mode for very large SRS documents)
+    estimation_chunk_threshold_chars: int = 24000
+    estimation_features_per_group: int = 25
+    estimation_max_workers: int = 4
+    estimation_timeout_seconds: int = 180
+
+    # Batch estimation / prompt generation (app.batch): sessions processed at once
+    batch_workers: int = 4
+    # The CLI is a separate process: its LLM scheduler does not see the API's
+    # calls, so it runs with a small in-flight cap per model of its own
+    batch_cli_max_in_flight_per_model: int = 2
+
     # Export
     EXPORT_XLSX_DIR: Path = BASE_DIR / "exports_xlsx"
     PROMPTS_JSON_DIR: Path = BASE_DIR / "exports_prompts_json"
@@ -56,17 +153,41 @@ class Settings(BaseSettings):
     EXPORT_PROMPTS_DIR: Path = BASE_DIR / "exports_prompts_json"
     EXPORT_IMAGES_DIR: Path = BASE_DIR / "exports_branding_images"
     EXPORT_BRANDING_DIR: Path = BASE_DIR / "exports_branding_json"
+    # Batch job checkpoints and reports
+    BATCH_DIR: Path = BASE_DIR / "batch_jobs"
+    # Interview state snapshots (recovery when the Redis session key is lost)
+    SNAPSHOT_DIR: Path = BASE_DIR / "session_snapshots"
 
     postgres_user: str
     postgres_password: str
     postgres_server: str
     postgres_port: int
     postgres_db: str
+    # Full SQLAlchemy URL overriding the Postgres settings (e.g. sqlite:///bench.db)
+    database_url_override: str | None = None
+    # Connection pool (sync and async engines each get one per process)
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_pre_ping: bool = True
+    db_pool_recycle: int = 1800
 
     @property
     def database_url(self) -> str:
+        if self.database_url_override:
+            return self.database_url_override
         return f"postgresql://{self.postgres_user}:{self.postgres_password}@{self.postgres_server}:{self.postgres_port}/{self.postgres_db}"
 
+    @property
+    def async_database_url(self) -> str:
+        url = self.database_url
+        for sync_prefix, async_prefix in (("postgresql://", "postgresql+asyncpg://"),
+                                          ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+                                          ("sqlite://", "sqlite+aiosqlite://")):
+            if url.startswith(sync_prefix):
+                return async_prefix + url[len(sync_prefix):]
+        return url
+
     model_config = SettingsConfigDict(
         env_file=BASE_DIR / ".env",
         env_file_encoding="utf-8",
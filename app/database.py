@@ -1,13 +1,27 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 
+# Pool sizing shared by the sync and async engines
+pool_options = {
+    "pool_size": settings.db_pool_size,
+    "max_overflow": settings.db_max_overflow,
+    "pool_timeout": settings.db_pool_timeout,
+    "pool_pre_ping": settings.db_pool_pre_ping,
+    "pool_recycle": settings.db_pool_recycle,
+}
+
 # Create the SQLAlchemy engine
-engine = create_engine(settings.database_url)
+engine = create_engine(settings.database_url, **pool_options)
+
+# Async engine (asyncpg) for async routes: auth, users, WebSocket auth
+async_engine = create_async_engine(settings.async_database_url, **pool_options)
 
 # Create a SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 # Base class for models
 Base = declarative_base()
@@ -18,4 +32,10 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# Async counterpart for async def routes
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
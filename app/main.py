@@ -5,12 +5,16 @@ from app.api.export import router as export_router
 from app.api.estimation import router as estimation_router
 from app.api.branding import router as branding_router
 from app.api.gen_prompts import router as gen_prompts_router
-from app.database import engine, Base
-from app.models.user import User
+from app.api.batch import router as batch_router
 from app.api.user import router as user_router
 import logging
 import os
 from app.api.auth import router as auth_router
+from app.api.metrics import router as metrics_router
+from app.api.health import router as health_router
+from app.utils.tracing import setup_tracing, start_span, set_span_attributes
+from app.utils.lifecycle import lifespan
+from fastapi import Request
 
 # Configure logging
 logging.basicConfig(
@@ -28,25 +32,44 @@ if settings.langchain_api_key:
     logger.info(
         f"LangSmith monitoring enabled for project: {settings.langchain_project}")
 
-Base.metadata.create_all(bind=engine)
+# OpenTelemetry tracing (opt-in, alongside LangSmith)
+setup_tracing()
+
+# Schema is managed by migrations (alembic upgrade head), not at startup
 
 app = FastAPI(
     title=settings.app_name,
-    debug=settings.debug
+    debug=settings.debug,
+    lifespan=lifespan
 )
 
+
+async def trace_requests(request: Request, call_next):
+    with start_span(request.method, {"http.method": request.method}) as span:
+        response = await call_next(request)
+        # Name by route template, not the raw path (which embeds session ids)
+        route = request.scope.get("route")
+        if route is not None:
+            span.update_name(f"{request.method} {route.path}")
+        set_span_attributes(span, **{"http.route": getattr(route, "path", None),
+                                     "http.status_code": response.status_code,
+                                     "session.id": request.path_params.get("session_id")})
+        return response
+
+
+# Registered only when spans are exported: a no-op span per request is
+# still a middleware hop on every call
+if settings.otel_tracing_enabled:
+    app.middleware("http")(trace_requests)
+
 app.include_router(chat_router)
 app.include_router(export_router)
 app.include_router(estimation_router)
 app.include_router(branding_router)
 app.include_router(gen_prompts_router)
+app.include_router(batch_router, tags=["Batch"])
 app.include_router(user_router, prefix="/users", tags=["Users"])
 app.include_router(auth_router, prefix="/auth", tags=["Auth"])
+app.include_router(metrics_router)
+app.include_router(health_router, tags=["Health"])
 
-
-@app.get("/health")
-def health_check():
-    return {
-        "status": "ok",
-        "message": "Requirement Agent API is running"
-    }
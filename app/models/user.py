@@ -1,5 +1,6 @@
 import uuid
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -13,4 +14,10 @@ class User(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_superuser = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set client-side so every backend stores microseconds: SQLite's
+    # CURRENT_TIMESTAMP has whole seconds only, which breaks keyset paging
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+                        server_default=func.now())
+
+    # Keyset pagination order for GET /users
+    __table_args__ = (Index("ix_users_created_at_id", "created_at", "id"),)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, field_validator
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 
 class EstimateRequest(BaseModel):
@@ -35,6 +35,12 @@ class DeleteEstimationRequest(BaseModel):
         return v
 
 
+class RefreshEstimationRequest(BaseModel):
+    session_id: str
+    # Updated requirements; the latest saved requirements are used when omitted
+    requirements: Optional[Dict[str, Any]] = None
+
+
 class PageSchema(BaseModel):
     name: str
     description: str
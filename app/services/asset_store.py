@@ -0,0 +1,230 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from app.config import settings
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+
+
+class AssetStore:
+    """
+    Content-addressed storage for uploaded brand assets.
+
+    Layout under EXPORT_IMAGES_DIR:
+      _blobs/<sha256><ext>            one file per distinct content
+      _blobs/<sha256>.analysis.txt    cached vision analysis for that blob
+      _blobs/index.json               hash -> {ext, refs: [session_id, ...]}
+      _blobs/index.lock               file lock around index updates (all workers)
+      <session_id>/manifest.json      the session's assets, referencing blobs
+    """
+
+    def __init__(self, root: Path | None = None):
+        self.root = Path(root or settings.EXPORT_IMAGES_DIR)
+        self.blob_dir = self.root / "_blobs"
+        self.index_path = self.blob_dir / "index.json"
+        self.lock_path = self.blob_dir / "index.lock"
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Paths & persistence helpers
+    # ------------------------------------------------------------------
+
+    def _manifest_path(self, session_id: str) -> Path:
+        return self.root / session_id / "manifest.json"
+
+    def blob_path(self, digest: str, ext: str) -> Path:
+        return self.blob_dir / f"{digest}{ext}"
+
+    def _analysis_path(self, digest: str) -> Path:
+        return self.blob_dir / f"{digest}.analysis.txt"
+
+    @contextmanager
+    def _index_lock(self):
+        """
+        Serializes index read-modify-writes across threads and across worker
+        processes, so no refcount update is lost (and release_session never
+        deletes a blob another session just referenced).
+        """
+        with self._lock:
+            os.makedirs(self.blob_dir, exist_ok=True)
+            with open(self.lock_path, "a+b") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    else:
+                        lock_file.seek(0)
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    @staticmethod
+    def _read_json(path: Path, default):
+        if not path.exists():
+            return default
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading {path}: {e}")
+            return default
+
+    @staticmethod
+    def _write_json(path: Path, data) -> None:
+        # Write-then-rename so readers never see a half written manifest/index;
+        # a unique temp file per write so concurrent writers never share one
+        os.makedirs(path.parent, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def put(self, session_id: str, key: str, content: bytes, ext: str) -> dict:
+        """
+        Stores the content once (keyed by its SHA-256) and records it in the
+        session manifest. Re-uploading identical bytes only adds a reference.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        ext = (ext or "").lower()
+
+        with self._index_lock():
+            index = self._read_json(self.index_path, {})
+            entry = index.setdefault(digest, {"ext": ext, "refs": []})
+            ext = entry["ext"]
+
+            blob = self.blob_path(digest, ext)
+            if not blob.exists():
+                tmp_blob = blob.with_suffix(blob.suffix + ".tmp")
+                with open(tmp_blob, "wb") as f:
+                    f.write(content)
+                os.replace(tmp_blob, blob)
+
+            manifest = self._read_json(self._manifest_path(session_id), [])
+            asset = next((a for a in manifest if a["hash"] == digest), None)
+            if asset is None:
+                asset = {
+                    "key": key,
+                    "hash": digest,
+                    "ext": ext,
+                    "size": len(content),
+                    "uploaded_at": datetime.now().isoformat()
+                }
+                manifest.append(asset)
+                self._write_json(self._manifest_path(session_id), manifest)
+
+            if session_id not in entry["refs"]:
+                entry["refs"].append(session_id)
+            self._write_json(self.index_path, index)
+
+        return asset
+
+    def manifest(self, session_id: str) -> list[dict]:
+        """
+        The session's manifest as stored; read-only (legacy files are not imported).
+        """
+        return self._read_json(self._manifest_path(session_id), [])
+
+    def list_assets(self, session_id: str) -> list[dict]:
+        """
+        Returns the session's manifest entries, each with a resolved 'path'.
+        Legacy sessions (plain files, no manifest) are imported on first access.
+        """
+        manifest_path = self._manifest_path(session_id)
+        if not manifest_path.exists():
+            self._import_legacy_files(session_id)
+
+        assets = []
+        for asset in self._read_json(manifest_path, []):
+            path = self.blob_path(asset["hash"], asset["ext"])
+            if path.exists():
+                assets.append({**asset, "path": path})
+        return assets
+
+    def get_analysis(self, digest: str) -> str | None:
+        path = self._analysis_path(digest)
+        if not path.exists():
+            return None
+        return path.read_text(encoding="utf-8")
+
+    def save_analysis(self, digest: str, analysis: str) -> None:
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._analysis_path(digest).write_text(analysis, encoding="utf-8")
+
+    def release_session(self, session_id: str) -> int:
+        """
+        Drops the session's references. Blobs (and their cached analysis)
+        that are no longer referenced by any session are deleted.
+        Returns the number of blobs removed. See `python -m app.assets release`.
+        """
+        removed = 0
+        with self._index_lock():
+            index = self._read_json(self.index_path, {})
+            manifest_path = self._manifest_path(session_id)
+
+            for asset in self._read_json(manifest_path, []):
+                entry = index.get(asset["hash"])
+                if not entry:
+                    continue
+                if session_id in entry["refs"]:
+                    entry["refs"].remove(session_id)
+                if not entry["refs"]:
+                    for path in (self.blob_path(asset["hash"], entry["ext"]), self._analysis_path(asset["hash"])):
+                        if path.exists():
+                            os.remove(path)
+                    del index[asset["hash"]]
+                    removed += 1
+
+            if manifest_path.exists():
+                os.remove(manifest_path)
+            self._write_json(self.index_path, index)
+
+        return removed
+
+    # ------------------------------------------------------------------
+    # Legacy migration
+    # ------------------------------------------------------------------
+
+    def _import_legacy_files(self, session_id: str) -> None:
+        session_dir = self.root / session_id
+        if not session_dir.is_dir():
+            return
+
+        for path in sorted(session_dir.iterdir()):
+            ext = path.suffix.lower()
+            if not path.is_file() or ext not in IMAGE_EXTENSIONS:
+                continue
+            # Legacy names are '{timestamp}_{key}{ext}' (timestamp = %Y%m%d_%H%M%S)
+            parts = path.stem.split("_", 2)
+            key = parts[2] if len(parts) == 3 else path.stem
+            with open(path, "rb") as f:
+                self.put(session_id, key, f.read(), ext)
+            os.remove(path)
+
+
+asset_store = AssetStore()
@@ -0,0 +1,177 @@
+import os
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from app.config import settings
+from app.services.export_service import get_branding_export
+from app.services.session_jobs import (
+    estimate_session, generate_session_prompts, is_estimated, has_prompts, SessionJobError)
+from app.utils.metrics import start_turn
+
+logger = logging.getLogger(__name__)
+
+BATCH_KINDS = ("estimate", "prompts")
+
+
+def _session_ids(directory, prefix: str) -> set[str]:
+    # <prefix><session_id>_<YYYYmmdd>_<HHMMSS>.json (session ids may contain "_")
+    ids = set()
+    for entry in directory.glob(f"{prefix}*.json"):
+        parts = entry.stem[len(prefix):].rsplit("_", 2)
+        if len(parts) == 3:
+            ids.add(parts[0])
+    return ids
+
+
+def discover_sessions(kind: str, incremental: bool = False) -> list[str]:
+    """
+    Sessions eligible for a batch, from the export directories:
+    estimate needs finished requirements and branding and no sitemap yet;
+    prompts needs a sitemap and no prompts (unless incremental).
+    """
+    if kind == "estimate":
+        candidates = _session_ids(settings.EXPORT_JSON_DIR, "requirements_")
+        eligible = [s for s in candidates if not is_estimated(s) and get_branding_export(s)]
+    else:
+        candidates = _session_ids(settings.EXPORT_ESTIMATED_DIR, "sitemap_")
+        eligible = [s for s in candidates if incremental or not has_prompts(s)]
+    return sorted(eligible)
+
+
+class BatchJob:
+    """
+    One batch run over many sessions. Progress is checkpointed to
+    BATCH_DIR/<job_id>.json after every session, so an interrupted run can be
+    resumed: sessions already done are skipped.
+    """
+
+    def __init__(self, job_id: str, kind: str, sessions: list[str], incremental: bool = False, state: dict | None = None):
+        if kind not in BATCH_KINDS:
+            raise ValueError(f"Unknown batch kind: {kind}")
+        self.job_id = job_id
+        self.kind = kind
+        self.incremental = incremental
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.state = state or {
+            "job_id": job_id,
+            "kind": kind,
+            "incremental": incremental,
+            "status": "pending",
+            "created_at": datetime.now().isoformat(),
+            "sessions": {},
+        }
+        for session_id in sessions:
+            self.state["sessions"].setdefault(session_id, {"status": "pending"})
+
+    @staticmethod
+    def path(job_id: str):
+        return settings.BATCH_DIR / f"{job_id}.json"
+
+    @classmethod
+    def create(cls, kind: str, sessions: list[str] | None = None, incremental: bool = False) -> "BatchJob":
+        job_id = f"{kind}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        if sessions is None:
+            sessions = discover_sessions(kind, incremental)
+        job = cls(job_id, kind, sessions, incremental)
+        job.checkpoint()
+        return job
+
+    @classmethod
+    def load(cls, job_id: str) -> "BatchJob | None":
+        path = cls.path(job_id)
+        if not re.fullmatch(r"[\w-]+", job_id) or not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        return cls(job_id, state["kind"], [], state.get("incremental", False), state=state)
+
+    def checkpoint(self) -> None:
+        os.makedirs(settings.BATCH_DIR, exist_ok=True)
+        path = self.path(self.job_id)
+        with self._write_lock:
+            with self._lock:
+                serialized = json.dumps(self.state, indent=4)
+            # Write-then-rename: a crash never leaves a truncated checkpoint
+            tmp_path = path.with_suffix(".json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(serialized)
+            os.replace(tmp_path, path)
+
+    def _process(self, session_id: str) -> None:
+        start_turn(session_id, priority="batch")
+        started_at = time.perf_counter()
+        try:
+            if self.kind == "estimate":
+                sitemap = estimate_session(session_id)
+                result = {"status": "done", "pages": len(sitemap.pages)}
+            else:
+                output = generate_session_prompts(session_id, incremental=self.incremental)
+                result = {"status": "done", "screens": len(output.screens)}
+        except SessionJobError as e:
+            # Not eligible (any more): e.g. estimated since the job was created
+            status = "skipped" if e.status_code < 500 else "failed"
+            result = {"status": status, "detail": e.detail}
+        except Exception as e:
+            logger.exception(f"Batch {self.job_id}: session {session_id} failed")
+            result = {"status": "failed", "detail": str(e)}
+
+        result["duration_s"] = round(time.perf_counter() - started_at, 1)
+        with self._lock:
+            self.state["sessions"][session_id] = result
+        self.checkpoint()
+        logger.info(f"Batch {self.job_id}: {session_id} {result['status']} ({result['duration_s']}s)")
+
+    def pending_sessions(self) -> list[str]:
+        """
+        Sessions a run (or resumed run) processes: pending and previously failed.
+        """
+        return [s for s, r in self.state["sessions"].items() if r["status"] in ("pending", "failed")]
+
+    def run(self, workers: int | None = None) -> dict:
+        """
+        Processes the pending (and previously failed) sessions through a worker
+        pool and returns the summary. LLM concurrency across workers is bounded
+        by this process's LLM scheduler: inside the API, batch calls yield to
+        interactive turns; the CLI has no view of the API's calls.
+        """
+        pending = self.pending_sessions()
+        workers = max(1, min(workers or settings.batch_workers, len(pending) or 1))
+
+        self.state["status"] = "running"
+        self.state["started_at"] = datetime.now().isoformat()
+        self.checkpoint()
+        started_at = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"batch-{self.kind}") as executor:
+            for session_id in pending:
+                executor.submit(contextvars.copy_context().run, self._process, session_id)
+
+        self.state["status"] = "finished"
+        self.state["finished_at"] = datetime.now().isoformat()
+        self.state["summary"] = {**self.summary(), "elapsed_s": round(time.perf_counter() - started_at, 1)}
+        self.checkpoint()
+        return self.state["summary"]
+
+    def summary(self) -> dict:
+        with self._lock:
+            results = list(self.state["sessions"].values())
+        counts = {status: 0 for status in ("done", "skipped", "failed", "pending")}
+        for result in results:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        return {"total": len(results), **counts}
+
+
+def start_batch(kind: str, sessions: list[str] | None = None, incremental: bool = False) -> BatchJob:
+    """
+    Creates a job and runs it in a background thread (API entry point).
+    """
+    job = BatchJob.create(kind, sessions, incremental)
+    threading.Thread(target=job.run, name=f"batch-{job.job_id}", daemon=True).start()
+    return job
@@ -1,10 +1,9 @@
-from openpyxl import load_workbook
 import os
 import json
 import glob
 from datetime import datetime
-from openpyxl import Workbook
 from app.config import settings
+from app.utils.tracing import traced
 from pathlib import Path
 
 EXPORT_XLSX_DIR = settings.BASE_DIR / "exports_xlsx"
@@ -31,10 +30,12 @@ def get_session_xlsx_path(session_id: str) -> Path:
     return EXPORT_XLSX_DIR / f"session_{session_id}_{timestamp}.xlsx"
 
 
+@traced("export_service.save_to_excel")
 def save_to_excel(session_id: str, history: list):
     """
     Saves/Appends conversation history to the 'exports_xlsx' folder.
     """
+    from openpyxl import Workbook, load_workbook  # imported on first export
     filepath = get_session_xlsx_path(session_id)
 
     if filepath.exists():
@@ -65,6 +66,7 @@ def save_to_excel(session_id: str, history: list):
     return filepath
 
 
+@traced("export_service.save_requirements")
 def save_requirements(session_id: str, requirements: dict):
     """
     Saves the final requirements JSON to the 'exports_json' folder.
@@ -81,6 +83,7 @@ def save_requirements(session_id: str, requirements: dict):
     return filepath
 
 
+@traced("export_service.get_latest_requirements_file")
 def get_latest_requirements_file(session_id: str):
     """
     Reads the SOURCE requirements from 'exports_json'.
@@ -102,6 +105,7 @@ def get_latest_requirements_file(session_id: str):
         return latest_file, None
 
 
+@traced("export_service.save_estimated_sitemap")
 def save_estimated_sitemap(session_id: str, sitemap_data: dict):
     """
     Saves the generated sitemap to the NEW 'estimated_pages_json' folder.
@@ -117,6 +121,69 @@ def save_estimated_sitemap(session_id: str, sitemap_data: dict):
     return filepath
 
 
+ESTIMATION_SOURCES_DIR = ESTIMATED_PAGES_DIR / "sources"
+
+
+@traced("export_service.replace_estimated_sitemap")
+def replace_estimated_sitemap(session_id: str, sitemap_data: dict):
+    """
+    Saves a new sitemap for the session and removes the previous ones,
+    so there is always a single current sitemap.
+    """
+    search_pattern = ESTIMATED_PAGES_DIR / f"sitemap_{session_id}_*.json"
+    old_files = glob.glob(str(search_pattern))
+
+    filepath = save_estimated_sitemap(session_id, sitemap_data)
+
+    for old_file in old_files:
+        if Path(old_file) != filepath:
+            os.remove(old_file)
+
+    return filepath
+
+
+@traced("export_service.get_latest_sitemap")
+def get_latest_sitemap(session_id: str) -> dict | None:
+    search_pattern = ESTIMATED_PAGES_DIR / f"sitemap_{session_id}_*.json"
+    files = glob.glob(str(search_pattern))
+
+    if not files:
+        return None
+
+    latest_file = max(files, key=os.path.getctime)
+    with open(latest_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@traced("export_service.save_estimation_source")
+def save_estimation_source(session_id: str, requirements: dict):
+    """
+    Keeps the requirements a sitemap was estimated from, so a later
+    incremental estimation can diff against them.
+    """
+    os.makedirs(ESTIMATION_SOURCES_DIR, exist_ok=True)
+    filepath = ESTIMATION_SOURCES_DIR / f"source_{session_id}.json"
+
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(requirements, f, indent=4, ensure_ascii=False)
+
+    return filepath
+
+
+def get_estimation_source(session_id: str) -> dict | None:
+    filepath = ESTIMATION_SOURCES_DIR / f"source_{session_id}.json"
+    if not filepath.exists():
+        return None
+
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error reading file {filepath}: {e}")
+        return None
+
+
+@traced("export_service.append_screens_to_excel")
 def append_screens_to_excel(session_id: str, sitemap_data: dict):
     # 1. Find the existing Excel file (Scanning EXPORT_XLSX_DIR)
     search_pattern = EXPORT_XLSX_DIR / f"session_{session_id}_*.xlsx"
@@ -129,6 +196,7 @@ def append_screens_to_excel(session_id: str, sitemap_data: dict):
     latest_file = max(files, key=os.path.getctime)
 
     # 2. Load Workbook
+    from openpyxl import load_workbook
     wb = load_workbook(latest_file)
 
     # 3. Manage "Screens" Sheet
@@ -159,6 +227,7 @@ def append_screens_to_excel(session_id: str, sitemap_data: dict):
     return latest_file
 
 
+@traced("export_service.delete_estimated_sitemap")
 def delete_estimated_sitemap(session_id: str):
     """
     Deletes the estimated sitemap from the NEW 'estimated_pages_json' folder.
@@ -190,6 +259,7 @@ os.makedirs(BRANDING_JSON_DIR, exist_ok=True)
 os.makedirs(BRANDING_XLSX_DIR, exist_ok=True)
 
 
+@traced("export_service.save_branding_files")
 def save_branding_files(session_id: str, state_data: dict, only_json: bool = False):
     """
     Saves both JSON profile and updates the session Excel with branding info.
@@ -211,6 +281,7 @@ def save_branding_files(session_id: str, state_data: dict, only_json: bool = Fal
         return json_path, None
 
     # 2. Update Excel Summary & Transcript
+    from openpyxl import Workbook, load_workbook  # imported on first export
     filepath = get_session_xlsx_path(session_id)
 
     if filepath.exists():
@@ -266,6 +337,7 @@ def save_branding_files(session_id: str, state_data: dict, only_json: bool = Fal
 BRANDING_JSON_DIR = settings.BASE_DIR / "exports_branding_json"
 
 
+@traced("export_service.get_branding_export")
 def get_branding_export(session_id: str) -> dict | None:
     """
     Checks if a completed Branding Profile exists for this session.
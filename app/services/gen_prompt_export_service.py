@@ -2,7 +2,6 @@ import os
 import json
 import glob
 from datetime import datetime
-from openpyxl import load_workbook
 from app.config import settings
 
 EXPORT_XLSX_DIR = settings.BASE_DIR / "exports_xlsx"
@@ -10,12 +9,51 @@ PROMPTS_JSON_DIR = settings.BASE_DIR / "exports_prompts_json"
 
 os.makedirs(PROMPTS_JSON_DIR, exist_ok=True)
 
-def save_prompts_data(session_id: str, data: dict):
+PROMPTS_SOURCES_DIR = PROMPTS_JSON_DIR / "sources"
+
+
+def get_latest_prompts(session_id: str):
+    """
+    Returns (prompts data, screen fingerprints) of the latest prompts file.
+    Fingerprints are empty for prompts generated before they were recorded.
+    """
+    search_pattern = PROMPTS_JSON_DIR / f"prompts_{session_id}_*.json"
+    files = glob.glob(str(search_pattern))
+
+    if not files:
+        return None, {}
+
+    latest_file = max(files, key=os.path.getctime)
+    with open(latest_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    fingerprints = {}
+    fingerprints_path = PROMPTS_SOURCES_DIR / f"fingerprints_{session_id}.json"
+    if fingerprints_path.exists():
+        with open(fingerprints_path, "r", encoding="utf-8") as f:
+            fingerprints = json.load(f)
+
+    return data, fingerprints
+
+
+def save_prompts_data(session_id: str, data: dict, fingerprints: dict | None = None, replace: bool = False):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
+
+    old_files = glob.glob(str(PROMPTS_JSON_DIR / f"prompts_{session_id}_*.json")) if replace else []
+
     json_path = PROMPTS_JSON_DIR / f"prompts_{session_id}_{timestamp}.json"
     with open(json_path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=4)
+
+    for old_file in old_files:
+        if old_file != str(json_path):
+            os.remove(old_file)
+
+    # Screen fingerprints let a later run regenerate only the changed screens
+    if fingerprints is not None:
+        os.makedirs(PROMPTS_SOURCES_DIR, exist_ok=True)
+        with open(PROMPTS_SOURCES_DIR / f"fingerprints_{session_id}.json", "w", encoding="utf-8") as f:
+            json.dump(fingerprints, f, indent=4)
     
     search_pattern = EXPORT_XLSX_DIR / f"session_{session_id}_*.xlsx"
     files = glob.glob(str(search_pattern))
@@ -26,6 +64,7 @@ def save_prompts_data(session_id: str, data: dict):
         
     latest_file = max(files, key=os.path.getctime)
     
+    from openpyxl import load_workbook  # imported on first export
     try:
         wb = load_workbook(latest_file)
     except Exception as e:
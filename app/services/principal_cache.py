@@ -0,0 +1,111 @@
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+import redis
+from prometheus_client import Counter
+from app.config import settings
+from app.models.user import User
+from app.services.redis_service import redis_service
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_LOOKUPS = Counter(
+    "principal_cache_lookups", "Principal resolutions by cache tier", ["result"])
+
+# Columns cached per principal (never the password hash)
+_FIELDS = ("id", "email", "username", "is_superuser", "created_at")
+
+
+class PrincipalCache:
+    """
+    Authenticated users keyed by token subject (email): a short in-process
+    TTL in front of a longer Redis TTL, so most requests skip Postgres.
+
+    Invalidation clears this process and Redis; other workers drop their
+    local entry when its (short) TTL expires.
+    """
+
+    def __init__(self):
+        self._local: dict[str, tuple[float, dict]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(email: str) -> str:
+        return f"principal:{email}"
+
+    @staticmethod
+    def _to_user(fields: dict) -> User:
+        # Detached, read-only principal; not attached to any DB session
+        fields = dict(fields)
+        if fields.get("created_at"):
+            fields["created_at"] = datetime.fromisoformat(fields["created_at"])
+        return User(**fields)
+
+    def get_local(self, email: str) -> User | None:
+        with self._lock:
+            entry = self._local.get(email)
+            if entry and entry[0] > time.monotonic():
+                PRINCIPAL_LOOKUPS.labels("local").inc()
+                return self._to_user(entry[1])
+            self._local.pop(email, None)
+        return None
+
+    async def get_shared(self, email: str) -> User | None:
+        try:
+            value = await redis_service.async_client.get(self._key(email))
+        except redis.RedisError as e:
+            logger.warning(f"Principal cache read failed: {e}")
+            return None
+        if not value:
+            return None
+
+        fields = json.loads(value)
+        self._set_local(email, fields)
+        PRINCIPAL_LOOKUPS.labels("redis").inc()
+        return self._to_user(fields)
+
+    async def put(self, user: User) -> None:
+        fields = {name: getattr(user, name) for name in _FIELDS}
+        if isinstance(fields["created_at"], datetime):
+            fields["created_at"] = fields["created_at"].isoformat()
+        fields["id"] = str(fields["id"])
+
+        self._set_local(user.email, fields)
+        PRINCIPAL_LOOKUPS.labels("miss").inc()
+        try:
+            await redis_service.async_client.setex(
+                self._key(user.email), settings.principal_cache_redis_ttl_seconds, json.dumps(fields))
+        except redis.RedisError as e:
+            logger.warning(f"Principal cache write failed: {e}")
+
+    def invalidate(self, *emails: str) -> None:
+        keys = self._drop_local(emails)
+        try:
+            if keys:
+                redis_service.client.delete(*keys)
+        except redis.RedisError as e:
+            logger.warning(f"Principal cache invalidation failed: {e}")
+
+    async def invalidate_async(self, *emails: str) -> None:
+        keys = self._drop_local(emails)
+        try:
+            if keys:
+                await redis_service.async_client.delete(*keys)
+        except redis.RedisError as e:
+            logger.warning(f"Principal cache invalidation failed: {e}")
+
+    def _drop_local(self, emails) -> list[str]:
+        emails = [email for email in emails if email]
+        with self._lock:
+            for email in emails:
+                self._local.pop(email, None)
+        return [self._key(email) for email in emails]
+
+    def _set_local(self, email: str, fields: dict) -> None:
+        with self._lock:
+            self._local[email] = (time.monotonic() + settings.principal_cache_ttl_seconds, fields)
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,183 @@
+import math
+import uuid
+import logging
+from contextlib import asynccontextmanager
+import redis
+from prometheus_client import Counter
+from app.config import settings
+from app.services.redis_service import redis_service
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = Counter(
+    "rate_limited_total", "Requests rejected by a rate limit or concurrency quota", ["bucket", "scope"])
+
+# Token buckets, checked atomically: a token is taken from every key or from
+# none. KEYS = bucket keys; ARGV = (capacity, refill per second) per key.
+# Redis server time keeps every worker on the same clock.
+_TOKEN_BUCKET_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local tokens = {}
+local wait = 0
+local denied = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local available = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    available = math.min(capacity, available + math.max(0, now - ts) * rate)
+    tokens[i] = available
+    if available < 1 then
+        local key_wait = (1 - available) / rate
+        if key_wait > wait then
+            wait = key_wait
+            denied = i
+        end
+    end
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local available = tokens[i]
+    if denied == 0 then
+        available = available - 1
+    end
+    redis.call('HSET', key, 'tokens', tostring(available), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return {denied, tostring(wait)}
+"""
+
+# Concurrency leases: a sorted set of lease ids scored by their deadline.
+# Expired leases (a worker died mid-request) are pruned on every acquire, so
+# each leaked slot frees itself after the lease, however busy the user is.
+# ARGV = (cap, lease seconds, lease id).
+_ACQUIRE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Redis token buckets per user and per session for each kind of LLM-backed
+    work (BUCKETS), plus a cap on a user's concurrent LLM requests.
+
+    Limits are shared by every worker. When Redis is unreachable requests are
+    let through: rate limiting must not take the API down with it.
+    """
+
+    # bucket -> (settings prefix) for rate/burst lookups
+    BUCKETS = {
+        "turns": "rate_limit_turns",
+        "estimations": "rate_limit_estimations",
+        "prompts": "rate_limit_prompts",
+    }
+
+    def __init__(self):
+        self._token_bucket = redis_service.async_client.register_script(_TOKEN_BUCKET_SCRIPT)
+        self._acquire = redis_service.async_client.register_script(_ACQUIRE_SCRIPT)
+
+    @classmethod
+    def _limits(cls, bucket: str) -> tuple[float, float]:
+        """
+        (burst capacity, refill per second) of a user's bucket.
+        """
+        prefix = cls.BUCKETS[bucket]
+        per_minute = getattr(settings, f"{prefix}_per_minute")
+        burst = getattr(settings, f"{prefix}_burst")
+        return float(burst), per_minute / 60
+
+    async def check(self, bucket: str, user_id, session_id: str | None = None) -> None:
+        """
+        Takes one token from the user's (and the session's) bucket or raises
+        RateLimitExceeded with the seconds until one is available.
+        """
+        if not settings.rate_limit_enabled:
+            return
+
+        capacity, rate = self._limits(bucket)
+        keys = [f"ratelimit:{bucket}:user:{user_id}"]
+        args = [capacity, rate]
+        if session_id:
+            # A session gets a share of its user's budget, so one runaway
+            # client (e.g. a reconnect loop) cannot exhaust it
+            share = settings.rate_limit_session_share
+            keys.append(f"ratelimit:{bucket}:session:{session_id}")
+            args += [max(1.0, capacity * share), rate * share]
+
+        try:
+            denied, wait = await self._token_bucket(keys=keys, args=args)
+        except redis.RedisError as e:
+            logger.warning(f"Rate limit check failed, allowing request: {e}")
+            return
+
+        if int(denied):
+            scope = "user" if int(denied) == 1 else "session"
+            RATE_LIMITED.labels(bucket, scope).inc()
+            retry_after = max(1, math.ceil(float(wait)))
+            raise RateLimitExceeded(
+                f"Rate limit exceeded for {bucket} ({scope}). Retry in {retry_after}s.", retry_after)
+
+    async def acquire_slot(self, user_id) -> tuple[str, str] | None:
+        """
+        Takes one of the user's LLM_CONCURRENCY_PER_USER slots or raises
+        RateLimitExceeded. Returns the (key, lease id) to release (None if no
+        slot was taken: limits disabled or Redis unreachable).
+        """
+        if not settings.rate_limit_enabled:
+            return None
+
+        key = f"llm_leases:user:{user_id}"
+        lease_id = uuid.uuid4().hex
+        try:
+            acquired = await self._acquire(
+                keys=[key], args=[settings.llm_concurrency_per_user, settings.llm_concurrency_lease_seconds, lease_id])
+        except redis.RedisError as e:
+            logger.warning(f"LLM concurrency check failed, allowing request: {e}")
+            return None
+
+        if not acquired:
+            RATE_LIMITED.labels("llm_concurrency", "user").inc()
+            raise RateLimitExceeded(
+                f"Too many concurrent requests (limit {settings.llm_concurrency_per_user}). Retry when one finishes.", 1)
+        return key, lease_id
+
+    async def release_slot(self, slot: tuple[str, str] | None) -> None:
+        if slot is None:
+            return
+        key, lease_id = slot
+        try:
+            await redis_service.async_client.zrem(key, lease_id)
+        except redis.RedisError as e:
+            logger.warning(f"LLM concurrency release failed: {e}")
+
+    @asynccontextmanager
+    async def llm_slot(self, user_id):
+        """
+        Holds one of the user's concurrent-request slots for the block.
+        """
+        slot = await self.acquire_slot(user_id)
+        try:
+            yield
+        finally:
+            await self.release_slot(slot)
+
+
+rate_limiter = RateLimiter()
@@ -1,6 +1,8 @@
 import json
 import redis
+import redis.asyncio
 from app.config import settings
+from app.utils.tracing import traced
 
 
 class RedisService:
@@ -11,7 +13,15 @@ class RedisService:
             db=settings.redis_db,
             decode_responses=True  
         )
+        # For async paths that must not block the loop (principal cache)
+        self.async_client = redis.asyncio.Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            db=settings.redis_db,
+            decode_responses=True
+        )
 
+    @traced("redis.get_session")
     def get_session(self, session_id: str) -> dict | None:
         key = f"session:{session_id}"
         value = self.client.get(key)
@@ -24,6 +34,7 @@ class RedisService:
         except json.JSONDecodeError:
             return None
 
+    @traced("redis.set_session")
     def set_session(self, session_id: str, data: dict) -> None:
         key = f"session:{session_id}"
         serialized = json.dumps(data)
@@ -33,6 +44,7 @@ class RedisService:
         else:
             self.client.set(key, serialized)
 
+    @traced("redis.delete_session")
     def delete_session(self, session_id: str) -> None:
         key = f"session:{session_id}"
         self.client.delete(key)
@@ -0,0 +1,118 @@
+import os
+import glob
+import json
+from app.config import settings
+from app.agent.estimator import PageEstimationAgent
+from app.agent.gen_prompt_agent import PromptGenerationAgent, page_fingerprint
+from app.schemas.estimation import SiteMapResponse
+from app.schemas.gen_prompts import PromptGenerationOutput
+from app.services.export_service import (
+    ESTIMATED_PAGES_DIR, get_latest_requirements_file, save_estimated_sitemap, save_estimation_source,
+    get_branding_export, append_screens_to_excel)
+from app.services.gen_prompt_export_service import save_prompts_data, get_latest_prompts
+
+# Shared by the API routes and batch runs (app.batch)
+estimator = PageEstimationAgent()
+prompt_agent = PromptGenerationAgent()
+
+
+class SessionJobError(Exception):
+    """
+    A session cannot be processed; status_code is the matching HTTP status.
+    """
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def is_estimated(session_id: str) -> bool:
+    return bool(glob.glob(str(settings.EXPORT_ESTIMATED_DIR / f"sitemap_{session_id}_*.json")))
+
+
+def has_prompts(session_id: str) -> bool:
+    return bool(glob.glob(str(settings.EXPORT_PROMPTS_DIR / f"prompts_{session_id}_*.json")))
+
+
+def estimate_session(session_id: str) -> SiteMapResponse:
+    """
+    Estimates the sitemap of a session whose SRS and branding are complete.
+    """
+    if not glob.glob(str(settings.EXPORT_JSON_DIR / f"requirements_{session_id}_*.json")):
+        raise SessionJobError(400, "this session for SRS is not completed yet")
+
+    if is_estimated(session_id):
+        raise SessionJobError(400, "this session is already estimated")
+
+    # 1. Fetch SRS Data (Technical Requirements)
+    srs_filepath, srs_data = get_latest_requirements_file(session_id)
+    if not srs_filepath or not srs_data:
+        raise SessionJobError(404, "SRS Requirements not found.")
+
+    # 2. Fetch Branding Data (Company Profile)
+    branding_data = get_branding_export(session_id)
+
+    if not branding_data:
+        raise SessionJobError(
+            400, "Branding is required for this session id. Please complete the branding phase first.")
+
+    # 3. RUN ESTIMATOR with BOTH inputs
+    try:
+        sitemap = estimator.estimate(srs_data, branding_data)
+    except Exception as e:
+        raise SessionJobError(500, f"AI Estimation failed: {str(e)}")
+
+    # 4. Save the result (and the SRS it was derived from, for incremental refreshes)
+    save_estimated_sitemap(session_id, sitemap.model_dump())
+    save_estimation_source(session_id, srs_data)
+
+    try:
+        append_screens_to_excel(session_id, sitemap.model_dump())
+    except Exception as e:
+        print(f"Failed to update Excel: {e}")
+
+    return sitemap
+
+
+def generate_session_prompts(session_id: str, incremental: bool = False) -> PromptGenerationOutput:
+    """
+    Generates the screen prompts of an estimated session. With incremental,
+    only screens whose sitemap page changed since the last run are regenerated.
+    """
+    sitemap_files = glob.glob(str(ESTIMATED_PAGES_DIR / f"sitemap_{session_id}_*.json"))
+
+    if not sitemap_files:
+        raise SessionJobError(404, "Sitemap not found. Please run /estimate first.")
+
+    prompts_exist = has_prompts(session_id)
+    if prompts_exist and not incremental:
+        raise SessionJobError(400, "Prompts already generated.")
+
+    latest_sitemap = max(sitemap_files, key=os.path.getctime)
+
+    with open(latest_sitemap, "r") as f:
+        sitemap_data = json.load(f)
+
+    # 3. Fetch Branding Data (to enrich prompts)
+    branding_data = get_branding_export(session_id)
+
+    previous_data, previous_fingerprints = get_latest_prompts(
+        session_id) if prompts_exist else (None, {})
+
+    # 4. Run Agent with enriched context
+    result = prompt_agent.generate(
+        session_id,
+        sitemap_data,
+        branding_data,
+        previous_screens=previous_data.get(
+            "screens") if previous_data else None,
+        previous_fingerprints=previous_fingerprints
+    )
+
+    fingerprints = {page.get("name"): page_fingerprint(page)
+                    for page in sitemap_data.get("pages", [])}
+    save_prompts_data(session_id, result.model_dump(),
+                      fingerprints=fingerprints, replace=prompts_exist)
+
+    return result
@@ -0,0 +1,169 @@
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable
+from prometheus_client import Counter
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_WRITES = Counter(
+    "session_snapshot_writes_total", "Background session artifact writes", ["kind", "outcome"])
+SNAPSHOT_COALESCED = Counter(
+    "session_snapshot_coalesced_total", "Pending writes replaced by a newer one before reaching disk", ["kind"])
+
+
+class SnapshotWriter:
+    """
+    Writes session artifacts off the request path: interview state snapshots
+    (so a session survives losing its Redis key) and the conversation Excel.
+
+    Writes are keyed per artifact and coalesced: a newer write for a key
+    replaces the pending one, so a burst of turns costs a single disk write.
+    Pending writes are flushed every SNAPSHOT_FLUSH_INTERVAL_SECONDS, right
+    away when urgent (phase change, completion), and on shutdown.
+    """
+
+    def __init__(self):
+        self._pending: "OrderedDict[tuple[str, str], Callable[[], None]]" = OrderedDict()
+        # Newest write per key until it reaches disk; a write popped by the
+        # worker but superseded or discarded meanwhile is skipped
+        self._latest: dict[tuple[str, str], Callable[[], None]] = {}
+        self._urgent = False
+        self._stopping = False
+        self._cond = threading.Condition()
+        # Serializes disk writes with discard() so a deleted snapshot stays deleted
+        self._write_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @staticmethod
+    def path(session_id: str):
+        return settings.SNAPSHOT_DIR / f"session_{session_id}.json"
+
+    # ------------------------------------------------------------------
+    # Queueing
+    # ------------------------------------------------------------------
+
+    def submit(self, kind: str, session_id: str, write: Callable[[], None], urgent: bool = False) -> None:
+        with self._cond:
+            key = (kind, session_id)
+            if key in self._pending:
+                SNAPSHOT_COALESCED.labels(kind).inc()
+                del self._pending[key]
+            self._pending[key] = write
+            self._latest[key] = write
+            self._urgent = self._urgent or urgent
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def snapshot(self, session_id: str, state: dict, urgent: bool = False) -> None:
+        """
+        Queues a snapshot of the session state (as stored in Redis). The dict
+        must not be mutated afterwards; it is serialized by the writer thread.
+        """
+        if not settings.snapshot_enabled:
+            return
+        self.submit("snapshot", session_id, lambda: self._write_snapshot(session_id, state), urgent)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not (self._pending or self._stopping):
+                    self._cond.wait()
+                if not (self._urgent or self._stopping):
+                    # Give further turns the chance to replace these writes
+                    self._cond.wait_for(lambda: self._urgent or self._stopping,
+                                        timeout=settings.snapshot_flush_interval_seconds)
+                batch, self._pending = self._pending, OrderedDict()
+                self._urgent = False
+                stopping = self._stopping
+
+            self._write_batch(batch)
+            if stopping:
+                return
+
+    def _write_batch(self, batch) -> None:
+        for (kind, session_id), write in batch.items():
+            try:
+                with self._write_lock:
+                    with self._cond:
+                        if self._latest.get((kind, session_id)) is not write:
+                            continue
+                    write()
+                    with self._cond:
+                        if self._latest.get((kind, session_id)) is write:
+                            del self._latest[(kind, session_id)]
+                SNAPSHOT_WRITES.labels(kind, "success").inc()
+            except Exception as e:
+                SNAPSHOT_WRITES.labels(kind, "error").inc()
+                logger.error(f"Background {kind} write for session {session_id} failed: {e}")
+
+    def stop(self, timeout: float = 30) -> None:
+        """
+        Flushes every pending write (shutdown).
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        # Anything submitted after the thread exited
+        with self._cond:
+            batch, self._pending = self._pending, OrderedDict()
+        self._write_batch(batch)
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def _write_snapshot(self, session_id: str, state: dict) -> None:
+        path = self.path(session_id)
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"snapshot_at": datetime.utcnow().isoformat(), "state": state}, f, ensure_ascii=False)
+        # Write-then-rename: the previous snapshot survives a crash mid-write
+        os.replace(tmp_path, path)
+
+    def load(self, session_id: str) -> dict | None:
+        """
+        Latest snapshotted state of a session (pending writes included).
+        """
+        with self._cond:
+            write = self._latest.get(("snapshot", session_id))
+        if write is not None:
+            with self._write_lock:
+                write()
+
+        path = self.path(session_id)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)["state"]
+        except Exception as e:
+            logger.error(f"Unreadable snapshot for session {session_id}: {e}")
+            return None
+
+    def discard(self, session_id: str) -> None:
+        """
+        Drops the session's snapshot (pending and on disk), e.g. once complete.
+        """
+        with self._cond:
+            self._pending.pop(("snapshot", session_id), None)
+            self._latest.pop(("snapshot", session_id), None)
+        with self._write_lock:
+            try:
+                os.remove(self.path(session_id))
+            except FileNotFoundError:
+                pass
+
+
+snapshot_writer = SnapshotWriter()
@@ -1,5 +1,12 @@
+import logging
 from datetime import datetime
+from functools import partial
 from app.schemas.state import SessionState
+from app.services.redis_service import redis_service
+from app.services.snapshot_service import snapshot_writer
+from app.services.export_service import save_to_excel, save_requirements
+
+logger = logging.getLogger(__name__)
 
 
 def initialize_state(existing_state: dict | None, branding_data: dict | None = None) -> SessionState:
@@ -40,3 +47,40 @@ def build_ask_state(
         asked_questions=asked_questions  
     )
     return state.model_dump()
+
+
+def load_session_state(session_id: str) -> dict | None:
+    """
+    Session state from Redis, or from the last snapshot when the key was
+    lost (TTL, eviction); a recovered state is written back to Redis.
+    """
+    state = redis_service.get_session(session_id)
+    if state is None:
+        state = snapshot_writer.load(session_id)
+        if state is not None:
+            logger.warning(f"Session {session_id} missing from Redis, recovered from snapshot")
+            redis_service.set_session(session_id, state)
+    return state
+
+
+def save_session_state(session_id: str, state: dict, previous_phase: str | None = None) -> None:
+    """
+    Stores the state in Redis and queues a background snapshot (written right
+    away when the interview moved to another phase).
+    """
+    redis_service.set_session(session_id, state)
+    snapshot_writer.snapshot(session_id, state, urgent=state.get("phase") != previous_phase)
+
+
+def complete_session(session_id: str, history: list, requirements: dict) -> None:
+    """
+    Persists a finished interview: the requirements JSON right away (the next
+    phases read it), the conversation Excel in the background. Then drops the
+    Redis key and the snapshot.
+    """
+    if history:
+        save_requirements(session_id=session_id, requirements=requirements)
+        snapshot_writer.submit("xlsx", session_id, partial(
+            save_to_excel, session_id=session_id, history=history), urgent=True)
+    redis_service.delete_session(session_id)
+    snapshot_writer.discard(session_id)
@@ -1,10 +1,29 @@
+import asyncio
+import base64
+import json
+import threading
+from datetime import datetime
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
+from app.services.principal_cache import principal_cache
 from passlib.context import CryptContext
 from uuid import UUID
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# Rounds only apply to new hashes; existing hashes carry their own
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"], deprecated="auto",
+    pbkdf2_sha256__default_rounds=settings.password_hash_rounds)
+
+# Columns of UserResponse; listings never load hashed_password
+USER_LIST_COLUMNS = (User.id, User.email, User.username, User.is_superuser, User.created_at)
+
+_hash_executor: Executor | None = None
+_hash_executor_lock = threading.Lock()
 
 
 def get_password_hash(password: str) -> str:
@@ -15,6 +34,49 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def _get_hash_executor() -> Executor:
+    """
+    Bounded pool for pbkdf2 work, so login/registration bursts queue here
+    instead of occupying the event loop (or every threadpool worker).
+    """
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is None:
+            if settings.password_hash_executor == "process":
+                _hash_executor = ProcessPoolExecutor(max_workers=settings.password_hash_workers)
+            else:
+                _hash_executor = ThreadPoolExecutor(
+                    max_workers=settings.password_hash_workers, thread_name_prefix="password-hash")
+        return _hash_executor
+
+
+async def get_password_hash_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_hash_executor(), get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_hash_executor(), verify_password, plain_password, hashed_password)
+
+
+def encode_cursor(created_at: datetime, user_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), str(user_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """
+    Raises ValueError for a malformed cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, user_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(user_id)
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
 class UserService:
     def authenticate_user(self, db: Session, email: str, password: str):
         user = self.get_user_by_email(db, email)
@@ -51,6 +113,7 @@ class UserService:
         if not db_user:
             return None
 
+        previous_email = db_user.email
         update_data = user_update.model_dump(exclude_unset=True)
         if "password" in update_data:
             hashed_password = get_password_hash(update_data["password"])
@@ -63,13 +126,111 @@ class UserService:
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
+        principal_cache.invalidate(previous_email, db_user.email)
         return db_user
 
     def delete_user(self, db: Session, user_id: UUID):
         db_user = self.get_user(db, user_id)
         if db_user:
+            email = db_user.email
             db.delete(db_user)
             db.commit()
+            principal_cache.invalidate(email)
+            return True
+        return False
+
+    # Async variants (AsyncSession): no threadpool hops, hashing in the hash pool
+
+    async def authenticate_user_async(self, db: AsyncSession, email: str, password: str):
+        user = await self.get_user_by_email_async(db, email)
+        if not user:
+            return False
+        if not await verify_password_async(password, user.hashed_password):
+            return False
+        return user
+
+    async def get_user_async(self, db: AsyncSession, user_id: UUID):
+        result = await db.execute(select(User).where(User.id == str(user_id)))
+        return result.scalars().first()
+
+    async def get_user_by_email_async(self, db: AsyncSession, email: str):
+        result = await db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
+
+    async def get_users_async(self, db: AsyncSession, skip: int = 0, limit: int = 100):
+        result = await db.execute(select(User).offset(skip).limit(limit))
+        return result.scalars().all()
+
+    async def list_users_page(self, db: AsyncSession, cursor: str | None = None, limit: int = 100):
+        """
+        Keyset page ordered by (created_at, id), projected to the response
+        columns. Returns (rows, next_cursor); next_cursor is None on the last page.
+        """
+        query = select(*USER_LIST_COLUMNS).order_by(User.created_at, User.id).limit(limit + 1)
+        if cursor:
+            created_at, user_id = decode_cursor(cursor)
+            query = query.where(tuple_(User.created_at, User.id) > tuple_(created_at, user_id))
+
+        rows = (await db.execute(query)).mappings().all()
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+    async def count_users_async(self, db: AsyncSession, estimate: bool = True) -> int:
+        """
+        Planner estimate from pg_class on Postgres (no table scan), exact
+        count(*) elsewhere or before the table has been analyzed.
+        """
+        if estimate and db.bind.dialect.name == "postgresql":
+            result = await db.execute(text(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = 'users'::regclass"))
+            estimated = result.scalar()
+            if estimated is not None and estimated >= 0:
+                return estimated
+        result = await db.execute(select(func.count()).select_from(User))
+        return result.scalar_one()
+
+    async def create_user_async(self, db: AsyncSession, user: UserCreate):
+        hashed_password = await get_password_hash_async(user.password)
+        db_user = User(
+            email=user.email,
+            username=user.username,
+            hashed_password=hashed_password,
+            is_superuser=False
+        )
+        db.add(db_user)
+        await db.commit()
+        await db.refresh(db_user)
+        return db_user
+
+    async def update_user_async(self, db: AsyncSession, user_id: UUID, user_update: UserUpdate):
+        db_user = await self.get_user_async(db, user_id)
+        if not db_user:
+            return None
+
+        previous_email = db_user.email
+        update_data = user_update.model_dump(exclude_unset=True)
+        if "password" in update_data:
+            update_data["hashed_password"] = await get_password_hash_async(update_data["password"])
+            del update_data["password"]
+
+        for key, value in update_data.items():
+            setattr(db_user, key, value)
+
+        db.add(db_user)
+        await db.commit()
+        await db.refresh(db_user)
+        await principal_cache.invalidate_async(previous_email, db_user.email)
+        return db_user
+
+    async def delete_user_async(self, db: AsyncSession, user_id: UUID):
+        db_user = await self.get_user_async(db, user_id)
+        if db_user:
+            email = db_user.email
+            await db.delete(db_user)
+            await db.commit()
+            await principal_cache.invalidate_async(email)
             return True
         return False
 
@@ -0,0 +1,191 @@
+import time
+import asyncio
+import signal
+import logging
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import FastAPI
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Lifecycle:
+    """
+    Process state for readiness and graceful shutdown:
+    starting -> ready -> draining, plus the number of in-flight turns.
+    """
+
+    def __init__(self):
+        self.state = "starting"
+        self.warmup: dict[str, dict] = {}
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def accepting_turns(self) -> bool:
+        return self.state != "draining"
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @contextmanager
+    def track_turn(self):
+        """
+        Wraps one interview turn (LLM call + state write) so shutdown waits for it.
+        """
+        with self._lock:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    async def drain(self, timeout: float) -> None:
+        """
+        Stops new turns and waits (up to timeout) for in-flight ones to end.
+        """
+        self.state = "draining"
+        deadline = time.monotonic() + timeout
+        while self._in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self._in_flight:
+            logger.warning(f"Shutdown with {self._in_flight} turn(s) still in flight")
+
+
+lifecycle = Lifecycle()
+
+
+async def _warm(name: str, step) -> None:
+    started_at = time.perf_counter()
+    try:
+        await asyncio.wait_for(step(), settings.warmup_timeout_seconds)
+        lifecycle.warmup[name] = {"ok": True}
+    except Exception as e:
+        lifecycle.warmup[name] = {"ok": False, "error": str(e) or type(e).__name__}
+        logger.warning(f"Warm-up of {name} failed: {e}")
+    lifecycle.warmup[name]["ms"] = round(1000 * (time.perf_counter() - started_at), 1)
+
+
+async def _warm_redis() -> None:
+    from app.services.redis_service import redis_service
+    await redis_service.async_client.ping()
+    await asyncio.to_thread(redis_service.client.ping)
+
+
+async def _warm_database() -> None:
+    from sqlalchemy import text
+    from app.database import async_engine
+
+    async def connect():
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    # Open several pooled connections at once; they stay in the pool
+    count = max(1, min(settings.warmup_db_connections, settings.db_pool_size))
+    await asyncio.gather(*(connect() for _ in range(count)))
+
+
+async def _warm_llm() -> None:
+    from app.utils.llm_utils import warm_up_llm_client
+    await asyncio.to_thread(warm_up_llm_client)
+
+
+async def _warm_agents() -> None:
+    # Deferred imports (sklearn for duplicate detection) and regex compilation
+    def load():
+        from app.agent.dedup import get_question_index
+        get_question_index(None, ["warm-up"]).max_similarity("warm-up question")
+
+        for name in settings.warmup_tiktoken_encodings:
+            import tiktoken
+            tiktoken.get_encoding(name)
+
+    await asyncio.to_thread(load)
+
+
+async def warm_up() -> None:
+    await asyncio.gather(
+        _warm("redis", _warm_redis),
+        _warm("database", _warm_database),
+        _warm("llm", _warm_llm),
+        _warm("agents", _warm_agents),
+    )
+    logger.info(f"Warm-up finished: {lifecycle.warmup}")
+
+
+async def close_resources() -> None:
+    from app.database import async_engine, engine
+    from app.services.redis_service import redis_service
+    from app.services.snapshot_service import snapshot_writer
+    from app.utils.llm_utils import close_llm_http_client
+
+    # Pending interview snapshots and Excel exports reach disk before exit
+    await asyncio.to_thread(snapshot_writer.stop)
+    await async_engine.dispose()
+    engine.dispose()
+    await redis_service.async_client.aclose()
+    redis_service.client.close()
+    close_llm_http_client()
+
+
+def install_drain_handler():
+    """
+    Wraps uvicorn's SIGTERM handler. uvicorn closes its sockets and every
+    WebSocket before the lifespan shutdown runs, so draining has to start
+    here: the process turns "draining" (readiness 503, no new turns) and
+    uvicorn's handler runs once in-flight turns have finished or
+    SHUTDOWN_DRAIN_TIMEOUT_SECONDS have passed. A second SIGTERM exits at once.
+    Returns a function restoring the original handler.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        # Not under a server that owns the signals (e.g. TestClient)
+        return lambda: None
+    original = signal.getsignal(signal.SIGTERM)
+    if not callable(original):
+        return lambda: None
+
+    loop = asyncio.get_running_loop()
+    tasks = set()
+
+    async def drain_then_exit(sig, frame):
+        await lifecycle.drain(settings.shutdown_drain_timeout_seconds)
+        original(sig, frame)
+
+    def handle_sigterm(sig, frame):
+        if lifecycle.state == "draining":
+            original(sig, frame)
+            return
+        lifecycle.state = "draining"
+        logger.info(f"SIGTERM: draining {lifecycle.in_flight} in-flight turn(s) before shutdown")
+
+        def start():
+            task = loop.create_task(drain_then_exit(sig, frame))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        loop.call_soon_threadsafe(start)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    return lambda: signal.signal(signal.SIGTERM, original)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from app.utils.loop_monitor import loop_monitor
+
+    if settings.loop_monitor_enabled:
+        loop_monitor.start()
+    if settings.warmup_enabled:
+        await warm_up()
+    lifecycle.state = "ready"
+    restore_signal_handler = install_drain_handler()
+
+    yield
+
+    restore_signal_handler()
+    lifecycle.state = "draining"
+    loop_monitor.stop()
+    await close_resources()
@@ -0,0 +1,182 @@
+import time
+import heapq
+import itertools
+import logging
+import threading
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram
+from app.config import settings
+from app.utils.metrics import priority_var
+
+logger = logging.getLogger(__name__)
+
+# Lower rank is served first; a batch call waits while any interactive call queues
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+LLM_IN_FLIGHT = Gauge(
+    "llm_scheduler_in_flight", "LLM calls holding a slot", ["model"])
+LLM_LIMIT = Gauge(
+    "llm_scheduler_limit", "Current (AIMD-adapted) in-flight limit", ["model"])
+LLM_QUEUED = Gauge(
+    "llm_scheduler_queued", "LLM calls waiting for a slot", ["model", "priority"])
+LLM_QUEUE_WAIT = Histogram(
+    "llm_queue_wait_seconds", "Time spent waiting for an LLM slot", ["priority"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128))
+LLM_QUEUE_TIMEOUTS = Counter(
+    "llm_queue_timeouts_total", "LLM calls that gave up waiting for a slot", ["model", "priority"])
+
+
+class LLMQueueTimeout(RuntimeError):
+    pass
+
+
+class _ModelGate:
+    """
+    Admission for one model: at most `limit` calls in flight, waiters served
+    by priority then arrival. Batch calls never take the last
+    LLM_INTERACTIVE_RESERVED_SLOTS slots (but always get at least one), so an
+    interview turn finds a free slot even while a batch saturates the model.
+    The limit grows by ~1 per window of successful
+    calls and is multiplied by LLM_BACKOFF_FACTOR on a provider 429 (AIMD),
+    at most once per window: 429s from calls started before the last cut are
+    the same congestion event.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self.limit = float(settings.llm_max_in_flight_per_model)
+        self.in_flight = 0
+        self.batch_in_flight = 0
+        self._waiting: list[tuple[int, int]] = []
+        self._cond = threading.Condition()
+        self._last_decrease = 0.0
+        LLM_LIMIT.labels(model).set(self.limit)
+
+    def _has_capacity(self, priority: str) -> bool:
+        limit = max(1, int(self.limit))
+        if self.in_flight >= limit:
+            return False
+        if priority == "batch":
+            return self.batch_in_flight < max(1, limit - settings.llm_interactive_reserved_slots)
+        return True
+
+    def acquire(self, priority: str, timeout: float) -> float:
+        """
+        Blocks until a slot is free for this caller; returns the admission time.
+        """
+        ticket = (PRIORITIES[priority], next(_tickets))
+        deadline = time.monotonic() + timeout
+        queued_at = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            LLM_QUEUED.labels(self.model, priority).inc()
+            admitted = False
+            try:
+                while self._waiting[0] != ticket or not self._has_capacity(priority):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        LLM_QUEUE_TIMEOUTS.labels(self.model, priority).inc()
+                        raise LLMQueueTimeout(
+                            f"No {self.model} slot within {timeout:.0f}s ({priority}, {self.in_flight} in flight)")
+                    self._cond.wait(remaining)
+                heapq.heappop(self._waiting)
+                self.in_flight += 1
+                if priority == "batch":
+                    self.batch_in_flight += 1
+                admitted = True
+                LLM_IN_FLIGHT.labels(self.model).set(self.in_flight)
+            finally:
+                if not admitted:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                LLM_QUEUED.labels(self.model, priority).dec()
+                # Next in line may now be at the head (or has capacity left)
+                self._cond.notify_all()
+
+        admitted_at = time.monotonic()
+        LLM_QUEUE_WAIT.labels(priority).observe(admitted_at - queued_at)
+        return admitted_at
+
+    def release(self, priority: str, admitted_at: float, rate_limited: bool = False, success: bool = False) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if priority == "batch":
+                self.batch_in_flight -= 1
+            if rate_limited:
+                if admitted_at >= self._last_decrease:
+                    self.limit = max(float(settings.llm_min_in_flight_per_model),
+                                     self.limit * settings.llm_backoff_factor)
+                    self._last_decrease = time.monotonic()
+                    logger.warning(
+                        f"Provider rate limit on {self.model}: in-flight limit cut to {int(self.limit)}")
+            elif success:
+                self.limit = min(float(settings.llm_max_in_flight_per_model), self.limit + 1 / self.limit)
+            LLM_IN_FLIGHT.labels(self.model).set(self.in_flight)
+            LLM_LIMIT.labels(self.model).set(self.limit)
+            self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {"limit": int(self.limit), "in_flight": self.in_flight,
+                    "batch_in_flight": self.batch_in_flight, "queued": len(self._waiting)}
+
+
+_tickets = itertools.count()
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """
+    Provider 429 (openai.RateLimitError and other APIStatusErrors carry
+    status_code; httpx.HTTPStatusError carries the response).
+    """
+    if getattr(error, "status_code", None) == 429:
+        return True
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+class LLMScheduler:
+    """
+    Process-wide admission control for LLM calls, one gate per model.
+    The caller's priority comes from the turn context (see start_turn):
+    interview turns are interactive, estimation and prompt generation batch.
+    """
+
+    def __init__(self):
+        self._gates: dict[str, _ModelGate] = {}
+        self._lock = threading.Lock()
+
+    def _gate(self, model: str) -> _ModelGate:
+        with self._lock:
+            if model not in self._gates:
+                self._gates[model] = _ModelGate(model)
+            return self._gates[model]
+
+    @contextmanager
+    def slot(self, model: str):
+        if not settings.llm_scheduler_enabled:
+            yield
+            return
+
+        priority = priority_var.get()
+        timeout = (settings.llm_queue_timeout_interactive_seconds if priority == "interactive"
+                   else settings.llm_queue_timeout_batch_seconds)
+        gate = self._gate(model)
+        admitted_at = gate.acquire(priority, timeout)
+        success = rate_limited = False
+        try:
+            yield
+            success = True
+        except Exception as e:
+            rate_limited = is_rate_limited(e)
+            raise
+        finally:
+            gate.release(priority, admitted_at, rate_limited=rate_limited, success=success)
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            gates = list(self._gates.values())
+        return {gate.model: gate.snapshot() for gate in gates}
+
+
+llm_scheduler = LLMScheduler()
@@ -1,80 +1,382 @@
-from langchain_openai import ChatOpenAI
 from app.config import settings
+from app.utils.metrics import invoke_instrumented, record_retry
+from app.utils.tracing import start_span
+from app.utils.recorder import record_llm_exchange
+from app.utils.llm_scheduler import llm_scheduler, LLMQueueTimeout
+from pydantic import BaseModel
+from functools import lru_cache
 from typing import List, Any
 import logging
-import json
+import threading
+import time
+import httpx
+import orjson
 import re
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
+def get_llm_http_client() -> httpx.Client:
+    """
+    Keep-alive connection pool shared by every ChatOpenAI instance, so calls
+    reuse warm TLS connections to the provider instead of opening new ones.
+    """
+    return httpx.Client(limits=httpx.Limits(
+        max_connections=settings.llm_max_connections,
+        max_keepalive_connections=settings.llm_max_connections))
+
+
+def warm_up_llm_client() -> None:
+    """
+    Imports the SDK and opens a pooled connection to the provider.
+    """
+    from langchain_openai import ChatOpenAI  # noqa: F401
+    from langchain_core.messages import SystemMessage, HumanMessage  # noqa: F401
+    get_llm_http_client().head(settings.openrouter_base_url, timeout=10)
+
+
+def close_llm_http_client() -> None:
+    if get_llm_http_client.cache_info().currsize:
+        get_llm_http_client().close()
+        get_llm_http_client.cache_clear()
+
+
+# One token per match: strings (possibly unterminated), comments, markdown
+# fences, structural characters, and runs of anything else
+_JSON_TOKEN_RE = re.compile(
+    r'"(?:[^"\\]|\\.)*\\?("|\Z)'
+    r"|//[^\n]*"
+    r"|/\*.*?(?:\*/|\Z)"
+    r"|```[A-Za-z]*"
+    r"|[{}\[\],:]"
+    r"|[^\"/{}\[\],:`]+"
+    r"|.",
+    re.DOTALL)
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def extract_json(content: str) -> str:
+    """
+    Single-pass, string-aware extraction of the first JSON value in an LLM
+    response. Tolerates markdown fences and surrounding prose, // and /* */
+    comments, trailing commas and truncated output (unterminated strings,
+    missing closers). Text inside strings (e.g. URLs with '//') is never touched.
+    """
+    # Fast path: already valid JSON (the usual case with response_format)
+    stripped = content.strip()
+    if stripped[:1] in ("{", "["):
+        try:
+            orjson.loads(stripped)
+            return stripped
+        except orjson.JSONDecodeError:
+            pass
+
+    # Prefer a value inside a markdown fence over braces in leading prose
+    start = _first_value(content, max(content.find("```"), 0))
+    if start == -1:
+        start = _first_value(content, 0)
+    if start == -1:
+        return content.strip()
+
+    out = []
+    stack = []
+    pending_comma = False
+    # Last two significant tokens emitted (for truncation repair)
+    last = prev = None
+
+    for match in _JSON_TOKEN_RE.finditer(content, start):
+        token = match.group()
+        first = token[0]
+
+        if first == '"':
+            if not match.group(1):
+                # Truncated inside a string: drop a dangling escape, close it
+                if token.endswith("\\") and _trailing_backslashes(token) % 2:
+                    token = token[:-1]
+                token += '"'
+        elif first == "/" and token[:2] in ("//", "/*"):
+            continue
+        elif first == "`":
+            continue
+        elif first in _CLOSERS:
+            stack.append(_CLOSERS[first])
+        elif first in "}]":
+            pending_comma = False
+            if stack:
+                stack.pop()
+            out.append(token)
+            prev, last = last, token
+            if not stack:
+                break
+            continue
+        elif first == ",":
+            pending_comma = True
+            continue
+        elif token.isspace():
+            if not pending_comma:
+                out.append(token)
+            continue
+
+        if pending_comma:
+            out.append(",")
+            prev, last = last, ","
+            pending_comma = False
+        out.append(token)
+        prev, last = last, token.strip() or token
+
+    # Repair truncated output
+    if stack:
+        if last == ":":
+            out.append("null")
+        elif stack[-1] == "}" and last and last[0] == '"' and prev in ("{", ","):
+            out.append(":null")
+        out.extend(reversed(stack))
+
+    return "".join(out).strip()
+
+
+def _first_value(content: str, offset: int) -> int:
+    starts = [i for i in (content.find("{", offset), content.find("[", offset)) if i != -1]
+    return min(starts) if starts else -1
+
+
+def _trailing_backslashes(token: str) -> int:
+    return len(token) - len(token.rstrip("\\"))
+
+
 def clean_json_content(content: str) -> str:
     """
     Clean LLM response content to ensure it's valid JSON.
-    Removes markdown backticks and common syntax errors like trailing commas.
+    Removes markdown backticks and common syntax errors like trailing commas
+    (see extract_json).
     """
-    # 1. Remove markdown code blocks if present
-    content = re.sub(r"```json\s*", "", content)
-    content = re.sub(r"```\s*", "", content)
-    content = content.strip()
+    return extract_json(content)
 
-    # 2. Remove C-style comments (/* ... */)
-    content = re.sub(r"/\*.*?\*/", "", content, flags=re.DOTALL)
 
-    # 3. Remove single-line comments (// ...)
-    # Be careful not to match // inside a URL string (http://)
-    content = re.sub(r"(?<!:)//.*", "", content)
+def parse_json_content(content: str) -> Any:
+    """
+    Extracts and parses the JSON value of an LLM response.
+    """
+    return orjson.loads(extract_json(content))
 
-    # 4. Relaxed trailing comma removal (handles ,} and ,])
-    content = re.sub(r",\s*([}\]])", r"\1", content)
 
-    # 5. Missing Brace/Bracket Recovery
-    # Count opening and closing braces
-    open_braces = content.count("{")
-    close_braces = content.count("}")
-    if open_braces > close_braces:
-        content += "}" * (open_braces - close_braces)
+# (model, schema name) pairs whose json_schema response format was rejected
+# (per process), mapped to when to try it again. Keyed by schema too: a
+# provider may accept object schemas but reject a root-level union like AgentOutput.
+_SCHEMA_UNSUPPORTED: dict[tuple[str, str], float] = {}
+# A 4xx only counts as a rejection when it names the response format;
+# other bad requests (context length, unknown model, ...) are plain failures
+_SCHEMA_ERROR_HINTS = ("response_format", "json_schema", "structured output")
 
-    open_brackets = content.count("[")
-    close_brackets = content.count("]")
-    if open_brackets > close_brackets:
-        content += "]" * (open_brackets - close_brackets)
 
-    return content
+@lru_cache(maxsize=None)
+def _json_schema_format(schema: type[BaseModel]) -> dict:
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": schema.__name__,
+            # Non-strict: registries are free-form dicts, which strict mode rejects
+            "strict": False,
+            "schema": schema.model_json_schema(),
+        },
+    }
 
 
-def call_llm_with_fallback(messages: List[Any], temperature: float = 0.3, response_format: str = "json_object") -> Any:
+def _is_schema_rejection(error: Exception) -> bool:
+    if getattr(error, "status_code", None) not in (400, 404, 422):
+        return False
+    message = str(error).lower()
+    return any(hint in message for hint in _SCHEMA_ERROR_HINTS)
+
+
+def _schema_unsupported(model: str, schema: type[BaseModel]) -> bool:
+    retry_at = _SCHEMA_UNSUPPORTED.get((model, schema.__name__))
+    if retry_at is None:
+        return False
+    if time.monotonic() >= retry_at:
+        # Providers add support over time: try json_schema again
+        _SCHEMA_UNSUPPORTED.pop((model, schema.__name__), None)
+        return False
+    return True
+
+
+def _invoke_model(model: str, messages: List[Any], temperature: float, response_format: str, schema: type[BaseModel] | None, agent: str, fallback: bool) -> Any:
+    def invoke(format_spec: dict):
+        from langchain_openai import ChatOpenAI  # heavy SDK, imported on first call
+        llm = ChatOpenAI(
+            api_key=settings.openrouter_api_key,
+            base_url=settings.openrouter_base_url,
+            model=model,
+            temperature=temperature,
+            stream_usage=True,
+            http_client=get_llm_http_client(),
+            model_kwargs={"response_format": format_spec}
+        )
+        span_attributes = {"llm.agent": agent, "llm.model": model, "llm.fallback": fallback,
+                           "llm.response_format": format_spec["type"]}
+        started_at = time.perf_counter()
+        with start_span("llm.invoke", span_attributes), llm_scheduler.slot(model):
+            response = invoke_instrumented(
+                llm, messages, agent=agent, model=model, fallback=fallback, stream=settings.llm_measure_ttft)
+        record_llm_exchange(agent, schema.__name__ if schema else None,
+                            messages, response, time.perf_counter() - started_at)
+        return response
+
+    if schema is None or not settings.llm_structured_output or _schema_unsupported(model, schema):
+        return invoke({"type": response_format})
+
+    try:
+        return invoke(_json_schema_format(schema))
+    except Exception as e:
+        if not _is_schema_rejection(e):
+            raise
+        logger.warning(
+            f"Model {model} rejected structured output for {schema.__name__} ({str(e)}). Using {response_format} for {settings.llm_schema_rejection_ttl_seconds}s.")
+        _SCHEMA_UNSUPPORTED[(model, schema.__name__)] = time.monotonic() + settings.llm_schema_rejection_ttl_seconds
+        record_retry(agent, "structured_output_rejected")
+        return invoke({"type": response_format})
+
+
+class CircuitBreaker:
+    """
+    Per-model breaker: after LLM_BREAKER_FAILURE_THRESHOLD consecutive
+    failures the model is skipped for LLM_BREAKER_COOLDOWN_SECONDS, then a
+    single trial call is let through (half-open).
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < settings.llm_breaker_cooldown_seconds:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_skipped(self) -> None:
+        """
+        The call says nothing about the provider's health (it never reached
+        the provider, or was rejected for its own content); a half-open trial
+        may be retried.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= settings.llm_breaker_failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"Circuit opened for model {self.model} after {self._failures} failures")
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self._failures}
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(model: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if model not in _breakers:
+            _breakers[model] = CircuitBreaker(model)
+        return _breakers[model]
+
+
+def breaker_states() -> dict[str, dict]:
+    return {model: get_breaker(model).snapshot()
+            for model in (settings.openrouter_model, settings.openrouter_fallback_model)}
+
+
+# Errors from the provider's SDK (openai) that mean it could not be reached
+# or did not answer in time; matched by name to keep the SDK import lazy
+_UNAVAILABLE_ERRORS = {"APIConnectionError", "APITimeoutError"}
+
+
+def is_provider_failure(error: Exception) -> bool:
+    """
+    Whether an error counts against the model's breaker: 5xx, 429, timeouts
+    and connection errors. Bad requests, parse errors and our own bugs don't.
+    """
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if status_code is not None:
+        return status_code >= 500 or status_code == 429
+    if isinstance(error, (TimeoutError, ConnectionError, httpx.TimeoutException, httpx.TransportError)):
+        return True
+    return any(cls.__name__ in _UNAVAILABLE_ERRORS for cls in type(error).__mro__)
+
+
+def _call_through_breaker(model: str, messages: List[Any], temperature: float, response_format: str, schema: type[BaseModel] | None, agent: str, fallback: bool) -> Any:
+    breaker = get_breaker(model)
+    if not breaker.allow():
+        record_retry(agent, "circuit_open")
+        raise RuntimeError(f"Circuit open for model {model}")
+    try:
+        response = _invoke_model(model, messages, temperature, response_format, schema, agent, fallback)
+    except LLMQueueTimeout:
+        # Our own queue was full, not a provider failure
+        breaker.record_skipped()
+        raise
+    except Exception as e:
+        if is_provider_failure(e):
+            breaker.record_failure()
+        else:
+            breaker.record_skipped()
+        raise
+    breaker.record_success()
+    return response
+
+
+def call_llm_with_fallback(messages: List[Any], temperature: float = 0.3, response_format: str = "json_object", schema: type[BaseModel] | None = None, agent: str = "unknown") -> Any:
     """
     Attempt to call the primary LLM model. If it fails, fallback to the specified fallback model.
+    When a pydantic schema is given, it is sent as a json_schema response format
+    (models that reject it fall back to response_format and are remembered).
+    Every call is instrumented (see app.utils.metrics), labelled by agent.
+    A model whose circuit is open is skipped without a request, and calls
+    wait for a slot from the LLM scheduler (see app.utils.llm_scheduler).
     """
     # 1. Try Primary Model
-    primary_llm = ChatOpenAI(
-        api_key=settings.openrouter_api_key,
-        base_url=settings.openrouter_base_url,
-        model=settings.openrouter_model,
-        temperature=temperature,
-        model_kwargs={"response_format": {"type": response_format}}
-    )
-
     try:
         logger.info(
             f"Attempting call with primary model: {settings.openrouter_model}")
-        return primary_llm.invoke(messages)
+        return _call_through_breaker(settings.openrouter_model, messages, temperature, response_format, schema, agent, False)
     except Exception as e:
         logger.error(
             f"Primary model failed: {str(e)}. Falling back to: {settings.openrouter_fallback_model}")
 
         # 2. Try Fallback Model
-        fallback_llm = ChatOpenAI(
-            api_key=settings.openrouter_api_key,
-            base_url=settings.openrouter_base_url,
-            model=settings.openrouter_fallback_model,
-            temperature=temperature,
-            model_kwargs={"response_format": {"type": response_format}}
-        )
-
         try:
-            return fallback_llm.invoke(messages)
+            return _call_through_breaker(settings.openrouter_fallback_model, messages, temperature, response_format, schema, agent, True)
         except Exception as fallback_err:
             logger.error(f"Fallback model also failed: {str(fallback_err)}")
             raise fallback_err
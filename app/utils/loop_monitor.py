@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from prometheus_client import Counter, Histogram
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Delay of a periodic event-loop tick beyond its schedule",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+EVENT_LOOP_BLOCKED = Counter(
+    "event_loop_blocked", "Event-loop stalls longer than the blocking threshold", ["location"])
+EVENT_LOOP_BLOCKED_SECONDS = Counter(
+    "event_loop_blocked_seconds", "Time the event loop spent blocked, by location", ["location"])
+
+_APP_DIR = str(settings.BASE_DIR)
+
+
+def _blame(frame) -> str:
+    """
+    Innermost application frame of the blocked stack (what to offload),
+    falling back to the innermost frame.
+    """
+    innermost = frame
+    while frame is not None:
+        if frame.f_code.co_filename.startswith(_APP_DIR):
+            break
+        frame = frame.f_back
+    frame = frame or innermost
+    path = os.path.relpath(frame.f_code.co_filename, os.path.dirname(_APP_DIR)) \
+        if frame.f_code.co_filename.startswith(_APP_DIR) else os.path.basename(frame.f_code.co_filename)
+    return f"{path}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+class LoopMonitor:
+    """
+    Measures event-loop lag with a periodic tick and, from a watchdog thread,
+    reports any stall longer than the threshold with the loop thread's stack.
+    """
+
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id = None
+        self._stall_location = None
+        self._task = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._tick())
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+        logger.info(
+            f"Event-loop monitor enabled (tick {self.interval}s, blocking threshold {self.threshold}s)")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _tick(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            EVENT_LOOP_LAG.observe(lag)
+
+            # The loop is running again: close out a reported stall
+            location = self._stall_location
+            if location is not None:
+                self._stall_location = None
+                EVENT_LOOP_BLOCKED_SECONDS.labels(location).inc(lag)
+            self._heartbeat = now
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.threshold / 2):
+            stalled_for = time.monotonic() - self._heartbeat - self.interval
+            if stalled_for < self.threshold or self._stall_location is not None:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            location = _blame(frame)
+            self._stall_location = location
+            EVENT_LOOP_BLOCKED.labels(location).inc()
+            stack = "".join(traceback.format_stack(frame))
+            logger.warning(
+                f"Event loop blocked for >{stalled_for:.3f}s at {location}\n{stack}")
+
+
+loop_monitor = LoopMonitor(
+    interval=settings.loop_monitor_interval_seconds,
+    threshold=settings.loop_blocking_threshold_seconds)
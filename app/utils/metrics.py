@@ -0,0 +1,105 @@
+import time
+import uuid
+import logging
+import contextvars
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Request correlation, set by the API layer and copied into worker threads
+session_id_var: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "session_id", default=None)
+turn_id_var: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "turn_id", default=None)
+# LLM scheduling class of the turn: "interactive" (a user is waiting) or "batch"
+priority_var: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "priority", default="interactive")
+
+
+def start_turn(session_id: str | None, priority: str = "interactive") -> str:
+    """
+    Binds the session id, a fresh turn id and the LLM priority class to the
+    current context.
+    """
+    turn_id = uuid.uuid4().hex[:12]
+    session_id_var.set(session_id)
+    turn_id_var.set(turn_id)
+    priority_var.set(priority)
+    return turn_id
+
+
+# ----------------------------------------------------------------------
+# Prometheus metrics (exposed on /metrics)
+# ----------------------------------------------------------------------
+_LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128)
+
+LLM_CALLS = Counter(
+    "llm_calls_total", "LLM invocations", ["agent", "model", "outcome"])
+LLM_FALLBACKS = Counter(
+    "llm_fallbacks_total", "Calls served by the fallback model", ["agent"])
+LLM_LATENCY = Histogram(
+    "llm_call_latency_seconds", "Total LLM call latency", ["agent", "model"],
+    buckets=_LATENCY_BUCKETS)
+LLM_TTFT = Histogram(
+    "llm_time_to_first_token_seconds", "Time to first streamed token", ["agent", "model"],
+    buckets=_LATENCY_BUCKETS)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Prompt/completion tokens", ["agent", "model", "kind"])
+LLM_RETRIES = Counter(
+    "llm_retries_total", "Extra LLM calls made by agent-level retries", ["agent", "reason"])
+LLM_PARSE = Counter(
+    "llm_parse_total", "Parsing/validation of LLM output", ["agent", "outcome"])
+
+
+def invoke_instrumented(llm, messages, *, agent: str, model: str, fallback: bool = False, stream: bool = False):
+    """
+    Invokes a LangChain chat model and records latency, tokens and (when
+    streaming) time-to-first-token. Returns the (aggregated) message.
+    """
+    started_at = time.perf_counter()
+    ttft = None
+    outcome = "error"
+    response = None
+    try:
+        if stream:
+            for chunk in llm.stream(messages):
+                if ttft is None and chunk.content:
+                    ttft = time.perf_counter() - started_at
+                response = chunk if response is None else response + chunk
+        else:
+            response = llm.invoke(messages)
+        outcome = "success"
+        return response
+    finally:
+        latency = time.perf_counter() - started_at
+        usage = getattr(response, "usage_metadata", None) or {}
+        prompt_tokens = usage.get("input_tokens", 0)
+        completion_tokens = usage.get("output_tokens", 0)
+
+        LLM_CALLS.labels(agent, model, outcome).inc()
+        LLM_LATENCY.labels(agent, model).observe(latency)
+        if ttft is not None:
+            LLM_TTFT.labels(agent, model).observe(ttft)
+        if prompt_tokens:
+            LLM_TOKENS.labels(agent, model, "prompt").inc(prompt_tokens)
+        if completion_tokens:
+            LLM_TOKENS.labels(agent, model, "completion").inc(completion_tokens)
+        if fallback and outcome == "success":
+            LLM_FALLBACKS.labels(agent).inc()
+
+        logger.info(
+            f"llm_call agent={agent} model={model} fallback={fallback} outcome={outcome} "
+            f"session={session_id_var.get()} turn={turn_id_var.get()} "
+            f"prompt_tokens={prompt_tokens} completion_tokens={completion_tokens} "
+            f"ttft_ms={round(ttft * 1000) if ttft is not None else None} latency_ms={round(latency * 1000)}")
+
+
+def record_retry(agent: str, reason: str) -> None:
+    LLM_RETRIES.labels(agent, reason).inc()
+
+
+def record_parse(agent: str, ok: bool) -> None:
+    LLM_PARSE.labels(agent, "success" if ok else "failure").inc()
+    if not ok:
+        logger.info(
+            f"llm_parse_failure agent={agent} session={session_id_var.get()} turn={turn_id_var.get()}")
@@ -0,0 +1,67 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from app.config import settings
+from app.utils.metrics import session_id_var, turn_id_var
+
+# Session recorder for offline replay benchmarks (benchmarks/replay.py).
+# When LLM_RECORD_DIR is set, every API request and LLM exchange of a
+# session is appended to <LLM_RECORD_DIR>/<session_id>.jsonl.
+
+_lock = threading.Lock()
+
+_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+
+def recording_enabled() -> bool:
+    return settings.llm_record_dir is not None
+
+
+def request_fingerprint(messages: list[tuple[str, object]]) -> str:
+    """
+    Stable hash of (role, content) pairs. The stub LLM server computes the
+    same hash over OpenAI-format messages to find the recorded response.
+    """
+    normalized = [[role, content if isinstance(content, str) else json.dumps(content, sort_keys=True)]
+                  for role, content in messages]
+    return hashlib.sha256(json.dumps(normalized, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def langchain_fingerprint(messages: list) -> str:
+    return request_fingerprint([(_ROLES.get(m.type, m.type), m.content) for m in messages])
+
+
+def _append(event: dict) -> None:
+    session_id = session_id_var.get() or "_unscoped"
+    path = os.path.join(settings.llm_record_dir, f"{session_id}.jsonl")
+    event = {"at": datetime.now().isoformat(), "turn": turn_id_var.get(), **event}
+    with _lock:
+        os.makedirs(settings.llm_record_dir, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+
+
+def record_request(endpoint: str, **fields) -> None:
+    """
+    Records an API request (the user's answer and other inputs) of the
+    current session.
+    """
+    if recording_enabled():
+        _append({"type": "request", "endpoint": endpoint, **fields})
+
+
+def record_llm_exchange(agent: str, schema: str | None, messages: list, response, latency: float) -> None:
+    if recording_enabled():
+        _append({
+            "type": "llm",
+            "agent": agent,
+            "schema": schema,
+            "key": langchain_fingerprint(messages),
+            # Identifies the agent's prompt when no schema was sent
+            "system_key": langchain_fingerprint(messages[:1]),
+            "response": str(response.content),
+            "usage": getattr(response, "usage_metadata", None),
+            "latency_ms": round(latency * 1000),
+        })
@@ -0,0 +1,87 @@
+import functools
+import logging
+from contextlib import contextmanager
+from opentelemetry import trace
+from app.config import settings
+from app.utils.metrics import session_id_var, turn_id_var
+
+logger = logging.getLogger(__name__)
+
+# No-op until setup_tracing() installs a provider, so spans cost ~nothing
+# when tracing is disabled.
+tracer = trace.get_tracer("srs_agent")
+
+_ATTRIBUTE_TYPES = (str, bool, int, float)
+
+
+def setup_tracing() -> None:
+    """
+    Installs an SDK tracer provider exporting to an OTLP/HTTP collector
+    and/or a JSON-lines file. Runs alongside the LangSmith hook.
+    """
+    if not settings.otel_tracing_enabled:
+        return
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    provider = TracerProvider(resource=Resource.create(
+        {"service.name": settings.otel_service_name}))
+
+    if settings.otel_trace_file:
+        trace_file = open(settings.otel_trace_file, "a", encoding="utf-8")
+        provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter(
+            out=trace_file, formatter=lambda span: span.to_json(indent=None) + "\n")))
+        logger.info(f"Tracing spans written to {settings.otel_trace_file}")
+
+    if settings.otel_exporter_otlp_endpoint or not settings.otel_trace_file:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        endpoint = settings.otel_exporter_otlp_endpoint or "http://localhost:4318/v1/traces"
+        provider.add_span_processor(
+            BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint)))
+        logger.info(f"Tracing spans exported to OTLP collector at {endpoint}")
+
+    trace.set_tracer_provider(provider)
+
+
+def set_span_attributes(span=None, **attributes) -> None:
+    """
+    Sets attributes on the given (default: current) span. None values are
+    skipped; non-primitive values are stringified.
+    """
+    span = span or trace.get_current_span()
+    if not span.is_recording():
+        return
+    for key, value in attributes.items():
+        if value is None:
+            continue
+        if not isinstance(value, _ATTRIBUTE_TYPES):
+            value = getattr(value, "value", None) or str(value)
+        span.set_attribute(key, value)
+
+
+@contextmanager
+def start_span(name: str, attributes: dict | None = None):
+    """
+    Starts a span tagged with the current session/turn ids plus attributes.
+    """
+    with tracer.start_as_current_span(name) as span:
+        if span.is_recording():
+            set_span_attributes(
+                span, **{"session.id": session_id_var.get(), "turn.id": turn_id_var.get()})
+            set_span_attributes(span, **(attributes or {}))
+        yield span
+
+
+def traced(name: str):
+    """
+    Decorator: runs the function inside a span called name.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,108 @@
+"""
+Helpers shared by the benchmark scripts: bench user + JWT minting,
+percentiles, and per-commit result files.
+"""
+import json
+import os
+import subprocess
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+
+
+def ensure_bench_user(email: str = BENCH_EMAIL) -> None:
+    """
+    Creates the benchmark user in the configured database if missing
+    (DATABASE_URL_OVERRIDE points this at a SQLite stand-in).
+    """
+    from app.database import SessionLocal
+    from app.schemas.user import UserCreate
+    from app.services.user_service import user_service
+
+    db = SessionLocal()
+    try:
+        if not user_service.get_user_by_email(db, email):
+            user_service.create_user(db, UserCreate(
+                email=email, username=email.split("@")[0], password=BENCH_PASSWORD))
+    finally:
+        db.close()
+
+
+def mint_token(email: str = BENCH_EMAIL) -> str:
+    from app.services.auth_service import auth_service
+    return auth_service.create_access_token({"sub": email})
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low, high = int(rank), min(int(rank) + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(latencies: list[float], errors: int = 0) -> dict:
+    """
+    Latencies in seconds -> count/errors/mean/p50/p95/p99 in milliseconds.
+    """
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "mean_ms": round(1000 * sum(latencies) / len(latencies), 1) if latencies else 0.0,
+        "p50_ms": round(1000 * percentile(latencies, 50), 1),
+        "p95_ms": round(1000 * percentile(latencies, 95), 1),
+        "p99_ms": round(1000 * percentile(latencies, 99), 1),
+    }
+
+
+def git_commit() -> tuple[str, bool]:
+    """
+    Returns (HEAD commit, working tree dirty).
+    """
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], text=True).strip()
+        dirty = bool(subprocess.check_output(
+            ["git", "status", "--porcelain", "--untracked-files=no"], text=True).strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def save_results(kind: str, results: dict, label: str | None = None) -> Path:
+    commit, dirty = git_commit()
+    results = {"kind": kind, "commit": commit, "dirty": dirty, "label": label, **results}
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    name = f"{kind}-{commit[:12]}{'-dirty' if dirty else ''}{'-' + label if label else ''}.json"
+    path = RESULTS_DIR / name
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def compare_results(baseline_path: str, current: dict, threshold: float) -> bool:
+    """
+    Prints per-endpoint p50/p95/p99 deltas against a baseline result file.
+    Returns False when any endpoint's p95 regressed by more than threshold.
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    ok = True
+    print(f"\nvs {baseline.get('commit', '?')[:12]} ({baseline_path})")
+    for endpoint, stats in current["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(endpoint)
+        if not base:
+            print(f"  {endpoint:24} (new)")
+            continue
+        deltas = []
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            change = (stats[key] - base[key]) / base[key] if base[key] else 0.0
+            deltas.append(f"{key[:3]} {base[key]:>8.1f} -> {stats[key]:>8.1f} ({change:+.1%})")
+            if key == "p95_ms" and change > threshold:
+                ok = False
+        print(f"  {endpoint:24} " + "  ".join(deltas))
+    return ok
@@ -0,0 +1,109 @@
+"""
+Worker start-up budget: time to import app.main in a fresh interpreter,
+the slowest modules (python -X importtime), and a check that heavy
+dependencies stay deferred until first use.
+
+    python -m benchmarks.import_time --runs 5 --budget-ms 1500
+
+Exits with status 1 when the median import time exceeds the budget or a
+deferred module is imported at start-up, so it can gate CI.
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from benchmarks.common import save_results
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Imported on first use (LLM call, export, duplicate check), never at start-up
+DEFERRED_MODULES = (
+    "langchain_core.messages",
+    "langchain_openai",
+    "langchain_google_genai",
+    "openpyxl",
+    "sklearn",
+    "scipy",
+)
+
+PROBE = f"""
+import sys, time
+started_at = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started_at
+loaded = [m for m in {DEFERRED_MODULES!r} if m in sys.modules]
+print(f"{{elapsed}} {{','.join(loaded)}}")
+"""
+
+_IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def run_once(importtime: bool = False) -> tuple[float, list[str], str]:
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", PROBE]
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f"import app.main failed:\n{result.stderr[-2000:]}")
+    elapsed, _, loaded = result.stdout.strip().splitlines()[-1].partition(" ")
+    return float(elapsed), [m for m in loaded.split(",") if m], result.stderr
+
+
+def slowest_modules(importtime_output: str, top: int) -> list[tuple[str, float]]:
+    """
+    Top-level-ish modules by cumulative import time (ms).
+    """
+    modules = []
+    for line in importtime_output.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match and len(match.group(3)) <= 4:
+            modules.append((match.group(4), int(match.group(2)) / 1000))
+    return sorted(modules, key=lambda m: m[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    parser.add_argument("--label")
+    args = parser.parse_args()
+
+    # Warm the bytecode cache so the first run is not an outlier
+    run_once()
+    timings, deferred_loaded = [], set()
+    for _ in range(args.runs):
+        elapsed, loaded, _ = run_once()
+        timings.append(elapsed * 1000)
+        deferred_loaded.update(loaded)
+    _, _, importtime_output = run_once(importtime=True)
+
+    median = statistics.median(timings)
+    print(f"import app.main: median {median:.0f}ms  min {min(timings):.0f}ms  "
+          f"max {max(timings):.0f}ms  (budget {args.budget_ms:.0f}ms, {args.runs} runs)")
+    for module, ms in slowest_modules(importtime_output, args.top):
+        print(f"    {ms:>8.1f}ms  {module}")
+
+    results = {
+        "runs": args.runs,
+        "median_ms": round(median, 1),
+        "min_ms": round(min(timings), 1),
+        "budget_ms": args.budget_ms,
+        "deferred_loaded": sorted(deferred_loaded),
+        "slowest": slowest_modules(importtime_output, args.top),
+    }
+    print(f"saved {save_results('import_time', results, args.label)}")
+
+    ok = True
+    if deferred_loaded:
+        print(f"FAIL: imported at start-up: {', '.join(sorted(deferred_loaded))}")
+        ok = False
+    if median > args.budget_ms:
+        print(f"FAIL: median {median:.0f}ms over budget {args.budget_ms:.0f}ms")
+        ok = False
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Fuzz + throughput comparison of the LLM JSON cleanup paths.
+
+  legacy : the previous regex-based clean_json_content followed by the
+           fence/brace stripping RequirementAgent.run used to do
+  scanner: app.utils.llm_utils.extract_json (single pass)
+
+Usage (from the repository root):
+    python -m benchmarks.json_extract [--cases 500] [--seed 7]
+"""
+import argparse
+import json
+import random
+import re
+import time
+import orjson
+from app.utils.llm_utils import extract_json
+
+
+def legacy_clean(content: str) -> str:
+    content = re.sub(r"```json\s*", "", content)
+    content = re.sub(r"```\s*", "", content)
+    content = content.strip()
+    content = re.sub(r"/\*.*?\*/", "", content, flags=re.DOTALL)
+    content = re.sub(r"(?<!:)//.*", "", content)
+    content = re.sub(r",\s*([}\]])", r"\1", content)
+
+    open_braces, close_braces = content.count("{"), content.count("}")
+    if open_braces > close_braces:
+        content += "}" * (open_braces - close_braces)
+    open_brackets, close_brackets = content.count("["), content.count("]")
+    if open_brackets > close_brackets:
+        content += "]" * (open_brackets - close_brackets)
+
+    content = content.strip()
+    if not content.startswith("{"):
+        idx = content.find("{")
+        if idx != -1:
+            content = content[idx:]
+    if not content.endswith("}"):
+        idx = content.rfind("}")
+        if idx != -1:
+            content = content[:idx + 1]
+    return content
+
+
+def sample_payload(rng: random.Random, slashes: bool = False) -> dict:
+    """
+    An agent reply. slashes=True puts "//" inside string values (URLs, quoted
+    text), which a regex comment stripper mangles.
+    """
+    roles = {f"Role{i}": [f"Feature {j}" for j in range(rng.randint(1, 6))]
+             for i in range(rng.randint(1, 5))}
+    if slashes:
+        urls = ["https://example.com//landing", "http://a.io/x//y"]
+        preferences = ["Primary #1A2B3C", "Say \"hi\" // not a comment"]
+    else:
+        urls = ["example.com/landing"]
+        preferences = ["Primary #1A2B3C", "Say \"hi\""]
+    return {
+        "status": "ASK",
+        "phase": "FUNCTIONAL",
+        "question": "Which pages, e.g. {home} or [dashboard], do you need?",
+        "updated_context": {
+            "roles": roles,
+            "design_requirements": {
+                "inspiration_urls": urls,
+                "design_preferences": preferences,
+            },
+            "budget": "Not Provided",
+            "notes": "multi\nline, with } and ] inside",
+        },
+        "pending_intent": {"type": "ROLE_FEATURES", "role": next(iter(roles))},
+        "additional_questions_asked": rng.randint(0, 3),
+    }
+
+
+def add_trailing_commas(text: str, rng: random.Random) -> str:
+    # Only outside strings: re-serialize with commas before closers
+    return re.sub(r"(\n\s*)([}\]])", lambda m: ("," if rng.random() < 0.5 else "") + m.group(1) + m.group(2), text)
+
+
+def wrap(text: str, rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        text = f"```json\n{text}\n```"
+    if rng.random() < 0.5:
+        text = "Here is the JSON you asked for:\n" + text + "\nLet me know!"
+    return text
+
+
+def add_comments(text: str, rng: random.Random) -> str:
+    text = add_trailing_commas(text, rng)
+    text = text.replace('"budget"', '// budget is optional\n  "budget"', 1)
+    if rng.random() < 0.5:
+        text = text.replace('"status"', '/* status */ "status"', 1)
+    return text
+
+
+# Each category isolates one kind of LLM output; results are reported per
+# category, so one failure mode cannot hide the others (or the speed on clean input)
+CATEGORIES = ("clean", "wrapped", "commented", "slashes_in_strings", "slashes_and_comments", "truncated")
+
+
+def make_case(category: str, rng: random.Random) -> tuple[dict, str, bool]:
+    """
+    Returns (payload, llm-like text, complete) where complete=False means truncated.
+    """
+    payload = sample_payload(rng, slashes=category.startswith("slashes"))
+    text = json.dumps(payload, indent=2, ensure_ascii=False)
+    if category in ("wrapped", "commented", "slashes_and_comments", "truncated"):
+        if category != "wrapped":
+            text = add_comments(text, rng)
+        text = wrap(text, rng)
+    if category == "truncated":
+        return payload, text[:rng.randint(len(text) // 2, len(text) - 1)], False
+    return payload, text, True
+
+
+def run(cleaner, cases) -> dict:
+    exact = parsed = 0
+    for payload, text, complete in cases:
+        try:
+            data = orjson.loads(cleaner(text))
+        except Exception:
+            continue
+        parsed += 1
+        if complete and data == payload:
+            exact += 1
+
+    started = time.perf_counter()
+    for _, text, _ in cases:
+        cleaner(text)
+    elapsed = time.perf_counter() - started
+
+    complete_cases = sum(1 for c in cases if c[2])
+    result = {"parsed": f"{parsed}/{len(cases)}"}
+    if complete_cases:
+        result["exact"] = f"{exact}/{complete_cases}"
+    result["us_per_doc"] = round(1e6 * elapsed / len(cases), 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cases", type=int, default=500, help="Cases per category")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for category in CATEGORIES:
+        cases = [make_case(category, rng) for _ in range(args.cases)]
+        print(category)
+        for name, cleaner in (("legacy", legacy_clean), ("scanner", extract_json)):
+            print(f"  {name:8} {run(cleaner, cases)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+WebSocket load generator for /ws/branding/{id} followed by /ws/chat/{id}.
+
+Opens N concurrent interviews with minted JWTs and drives the scripted
+answers of the Postman collection (Brand Q*, SRS Q*). Reports connection
+counts, per-message latency (p50/p95/p99 + histogram), error rates and
+server event-loop lag, probed as the latency of GET /health while the
+interviews run (a blocked loop delays it).
+
+Run it against a server using the stub LLM (see benchmarks/README.md):
+    python -m benchmarks.loadtest --users 50 --ramp 10 --think 1
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+import httpx
+import websockets
+from benchmarks.common import ensure_bench_user, mint_token, summarize, save_results, compare_results
+
+COLLECTION = Path(__file__).resolve().parent.parent / "SRS final_v.3.postman_collection.json"
+HISTOGRAM_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+def load_script(path: Path) -> dict[str, list[str]]:
+    """
+    Answers per phase, in collection order, from requests with an 'answer'.
+    """
+    with open(path, encoding="utf-8") as f:
+        collection = json.load(f)
+
+    script = {"branding": [], "chat": []}
+    for item in collection.get("item", []):
+        request = item.get("request", {})
+        url = request.get("url", {})
+        raw_url = url.get("raw", "") if isinstance(url, dict) else str(url)
+        try:
+            body = json.loads(request.get("body", {}).get("raw") or "{}")
+        except json.JSONDecodeError:
+            continue
+        if not body.get("answer"):
+            continue
+        if raw_url.endswith("/branding/chat"):
+            script["branding"].append(body["answer"])
+        elif raw_url.endswith("/chat"):
+            script["chat"].append(body["answer"])
+    return script
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.opened = 0
+        self.failed_connections = 0
+        self.open_now = 0
+        self.peak_open = 0
+        self.completed = defaultdict(int)
+
+    def connection_opened(self):
+        self.opened += 1
+        self.open_now += 1
+        self.peak_open = max(self.peak_open, self.open_now)
+
+    def connection_closed(self):
+        self.open_now -= 1
+
+
+async def run_phase(ws_url: str, answers: list[str], phase: str, stats: Stats, think: float, timeout: float) -> bool:
+    """
+    Runs one interview phase. Returns True when the server reported COMPLETE.
+    """
+    try:
+        websocket = await asyncio.wait_for(websockets.connect(ws_url, max_size=None), timeout)
+    except Exception:
+        stats.failed_connections += 1
+        return False
+
+    stats.connection_opened()
+    try:
+        started_at = time.perf_counter()
+        first = json.loads(await asyncio.wait_for(websocket.recv(), timeout))
+        stats.latencies[f"ws/{phase} open"].append(time.perf_counter() - started_at)
+        if first.get("status") == "ERROR":
+            stats.errors[f"ws/{phase} open"] += 1
+            return False
+
+        for answer in answers:
+            await asyncio.sleep(think)
+            started_at = time.perf_counter()
+            await websocket.send(answer)
+            reply = json.loads(await asyncio.wait_for(websocket.recv(), timeout))
+            key = f"ws/{phase} message"
+            if reply.get("status") == "ERROR":
+                stats.errors[key] += 1
+                return False
+            stats.latencies[key].append(time.perf_counter() - started_at)
+            if reply.get("status") == "COMPLETE":
+                stats.completed[phase] += 1
+                return True
+        return False
+    except Exception:
+        stats.errors[f"ws/{phase} message"] += 1
+        return False
+    finally:
+        stats.connection_closed()
+        await websocket.close()
+
+
+def seed_branding(session_id: str) -> None:
+    # The canned stub never completes branding; give the chat phase a profile
+    from app.services.export_service import save_branding_files
+    save_branding_files(session_id, {"profile": {"name": "Load Test Co"}, "history": []}, only_json=True)
+
+
+async def virtual_user(index: int, args, script: dict, token: str, stats: Stats) -> None:
+    session_id = f"load-{uuid.uuid4().hex[:8]}-{index}"
+    base = args.ws_url.rstrip("/")
+
+    completed = await run_phase(f"{base}/ws/branding/{session_id}?token={token}",
+                                script["branding"], "branding", stats, args.think, args.timeout)
+    if not completed:
+        if not args.seed_branding:
+            return
+        await asyncio.to_thread(seed_branding, session_id)
+
+    await run_phase(f"{base}/ws/chat/{session_id}?token={token}",
+                    script["chat"], "chat", stats, args.think, args.timeout)
+
+
+async def probe_loop_lag(base_url: str, stats: Stats, stop: asyncio.Event, interval: float) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        while not stop.is_set():
+            started_at = time.perf_counter()
+            try:
+                await client.get("/health")
+                stats.latencies["event loop lag (/health probe)"].append(time.perf_counter() - started_at)
+            except httpx.HTTPError:
+                stats.errors["event loop lag (/health probe)"] += 1
+            try:
+                await asyncio.wait_for(stop.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+def histogram(latencies: list[float]) -> str:
+    counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+    for latency in latencies:
+        ms = latency * 1000
+        index = next((i for i, bound in enumerate(HISTOGRAM_BUCKETS_MS) if ms <= bound), len(HISTOGRAM_BUCKETS_MS))
+        counts[index] += 1
+    labels = [f"<={b}ms" for b in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}ms"]
+    peak = max(counts) or 1
+    return "\n".join(f"    {label:>10} {count:>6} {'#' * round(40 * count / peak)}"
+                     for label, count in zip(labels, counts) if count)
+
+
+async def main_async(args) -> dict:
+    script = load_script(Path(args.collection))
+    if args.answers:
+        script = {phase: answers[:args.answers] for phase, answers in script.items()}
+
+    await asyncio.to_thread(ensure_bench_user)
+    token = mint_token()
+    stats = Stats()
+
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe_loop_lag(args.base_url, stats, stop, args.probe_interval))
+
+    started_at = time.perf_counter()
+    users = []
+    for i in range(args.users):
+        users.append(asyncio.create_task(virtual_user(i, args, script, token, stats)))
+        if args.ramp:
+            await asyncio.sleep(args.ramp / args.users)
+    await asyncio.gather(*users)
+    wall = time.perf_counter() - started_at
+
+    stop.set()
+    await prober
+
+    endpoints = {key: summarize(values, stats.errors.get(key, 0))
+                 for key, values in sorted(stats.latencies.items())}
+    for key, count in stats.errors.items():
+        endpoints.setdefault(key, summarize([], count))
+
+    print(f"users={args.users} opened={stats.opened} failed={stats.failed_connections} "
+          f"peak_open={stats.peak_open} completed={dict(stats.completed)} wall={wall:.1f}s")
+    for key, summary in endpoints.items():
+        total = summary["count"] + summary["errors"]
+        error_rate = summary["errors"] / total if total else 0.0
+        print(f"{key:32} n={summary['count']:<6} err={error_rate:6.1%} "
+              f"p50={summary['p50_ms']:>8.1f}ms p95={summary['p95_ms']:>8.1f}ms p99={summary['p99_ms']:>8.1f}ms")
+        if stats.latencies.get(key):
+            print(histogram(stats.latencies[key]))
+
+    return {
+        "users": args.users,
+        "connections": {"opened": stats.opened, "failed": stats.failed_connections, "peak_open": stats.peak_open},
+        "completed": dict(stats.completed),
+        "wall_seconds": round(wall, 2),
+        "endpoints": endpoints,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10, help="Concurrent interviews")
+    parser.add_argument("--ramp", type=float, default=0, help="Seconds over which users are started")
+    parser.add_argument("--think", type=float, default=0.5, help="Seconds between answers")
+    parser.add_argument("--answers", type=int, help="Use only the first N answers per phase")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--ws-url", default="ws://127.0.0.1:8000")
+    parser.add_argument("--collection", default=str(COLLECTION))
+    parser.add_argument("--probe-interval", type=float, default=0.5)
+    parser.add_argument("--no-seed-branding", dest="seed_branding", action="store_false",
+                        help="Do not write a branding profile when branding does not complete")
+    parser.add_argument("--label")
+    parser.add_argument("--compare", help="Baseline result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    print(f"saved {save_results('loadtest', results, args.label)}")
+    if args.compare and not compare_results(args.compare, results, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Login throughput: N concurrent clients hammering POST /auth/login while
+GET /health is probed, so event-loop stalls from hashing show up as
+/health latency (a login storm should not slow other requests).
+
+    python -m benchmarks.login --clients 32 --duration 20
+
+--hash-only skips the server and measures pbkdf2 hashes/second in-process
+for the configured PASSWORD_HASH_ROUNDS, to size rounds and pool workers.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from collections import defaultdict
+import httpx
+from benchmarks.common import BENCH_EMAIL, BENCH_PASSWORD, ensure_bench_user, summarize, save_results, compare_results
+
+
+async def login_client(client: httpx.AsyncClient, deadline: float, samples: dict, errors: dict) -> None:
+    body = {"email": BENCH_EMAIL, "password": BENCH_PASSWORD}
+    while time.perf_counter() < deadline:
+        started_at = time.perf_counter()
+        try:
+            response = await client.post("/auth/login", json=body)
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        if ok:
+            samples["/auth/login"].append(time.perf_counter() - started_at)
+        else:
+            errors["/auth/login"] += 1
+
+
+async def probe_health(client: httpx.AsyncClient, deadline: float, samples: dict, errors: dict, interval: float) -> None:
+    while time.perf_counter() < deadline:
+        started_at = time.perf_counter()
+        try:
+            await client.get("/health")
+            samples["/health (during logins)"].append(time.perf_counter() - started_at)
+        except httpx.HTTPError:
+            errors["/health (during logins)"] += 1
+        await asyncio.sleep(interval)
+
+
+async def run_http(args) -> dict:
+    await asyncio.to_thread(ensure_bench_user)
+    samples, errors = defaultdict(list), defaultdict(int)
+    limits = httpx.Limits(max_connections=args.clients + 1)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        deadline = time.perf_counter() + args.duration
+        started_at = time.perf_counter()
+        await asyncio.gather(
+            probe_health(client, deadline, samples, errors, args.probe_interval),
+            *(login_client(client, deadline, samples, errors) for _ in range(args.clients)))
+        wall = time.perf_counter() - started_at
+
+    endpoints = {key: summarize(samples.get(key, []), errors.get(key, 0))
+                 for key in sorted(set(samples) | set(errors))}
+    logins = len(samples["/auth/login"])
+    print(f"clients={args.clients} logins={logins} logins/s={logins / wall:.1f} wall={wall:.1f}s")
+    for key, stats in endpoints.items():
+        print(f"{key:26} n={stats['count']:<6} err={stats['errors']:<4} "
+              f"p50={stats['p50_ms']:>8.1f}ms p95={stats['p95_ms']:>8.1f}ms p99={stats['p99_ms']:>8.1f}ms")
+    return {
+        "clients": args.clients,
+        "duration": args.duration,
+        "logins_per_second": round(logins / wall, 2),
+        "endpoints": endpoints,
+    }
+
+
+def run_hash_only(args) -> None:
+    from app.config import settings
+    from app.services.user_service import get_password_hash, verify_password
+
+    hashed = get_password_hash(BENCH_PASSWORD)
+    count = 0
+    started_at = time.perf_counter()
+    while time.perf_counter() - started_at < args.duration:
+        verify_password(BENCH_PASSWORD, hashed)
+        count += 1
+    elapsed = time.perf_counter() - started_at
+    print(f"rounds={settings.password_hash_rounds} verify={1000 * elapsed / count:.1f}ms "
+          f"({count / elapsed:.1f}/s per core)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15, help="Seconds to run")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--probe-interval", type=float, default=0.2)
+    parser.add_argument("--hash-only", action="store_true", help="Measure hashing in-process, no server")
+    parser.add_argument("--label")
+    parser.add_argument("--compare", help="Baseline result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    if args.hash_only:
+        run_hash_only(args)
+        return
+
+    results = asyncio.run(run_http(args))
+    print(f"saved {save_results('login', results, args.label)}")
+    if args.compare and not compare_results(args.compare, results, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
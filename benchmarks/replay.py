@@ -0,0 +1,136 @@
+"""
+Replays recorded sessions against a running API and reports latency
+percentiles per endpoint and turns/second per worker.
+
+Recording (real LLM): start the app with LLM_RECORD_DIR=recordings/ and
+run sessions as usual; each session is written to recordings/<id>.jsonl.
+
+Replay (no tokens spent):
+    DATABASE_URL_OVERRIDE=sqlite:///./bench.db alembic upgrade head
+    python -m benchmarks.stub_llm --recordings recordings/ --latency lognormal:900,0.4 &
+    OPENROUTER_BASE_URL=http://127.0.0.1:9100/v1 \\
+    DATABASE_URL_OVERRIDE=sqlite:///./bench.db uvicorn app.main:app --port 8000 &
+    python -m benchmarks.replay --recordings recordings/ --concurrency 4 --repeat 3
+
+Each run writes benchmarks/results/replay-<commit>.json; pass
+--compare <older result> to fail (exit 1) on a p95 regression.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from benchmarks.common import ensure_bench_user, mint_token, summarize, save_results, compare_results
+
+FORM_ENDPOINTS = {"/branding/chat", "/chat"}
+
+
+def load_sessions(directory: str) -> dict[str, list[dict]]:
+    sessions = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.jsonl"))):
+        with open(path, encoding="utf-8") as f:
+            requests = [event for event in map(json.loads, f)
+                        if event.get("type") == "request"]
+        if requests:
+            sessions[os.path.splitext(os.path.basename(path))[0]] = requests
+    return sessions
+
+
+def replay_session(client: httpx.Client, requests: list[dict], session_id: str, samples: dict) -> None:
+    for event in requests:
+        endpoint = event["endpoint"]
+        if endpoint in FORM_ENDPOINTS:
+            form = {"session_id": session_id}
+            if event.get("answer") is not None:
+                form["answer"] = str(event["answer"])
+            call = lambda: client.post(endpoint, data=form)
+        else:
+            body = {"session_id": session_id}
+            for key in ("requirements", "incremental"):
+                if event.get(key) is not None:
+                    body[key] = event[key]
+            call = lambda: client.post(endpoint, json=body)
+
+        started_at = time.perf_counter()
+        try:
+            response = call()
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        samples[endpoint].append((time.perf_counter() - started_at, ok))
+
+
+def run_worker(base_url: str, token: str, jobs: list[tuple[str, list[dict]]], timeout: float) -> tuple[dict, float, int]:
+    samples = defaultdict(list)
+    busy = 0.0
+    with httpx.Client(base_url=base_url, headers={"Authorization": f"Bearer {token}"}, timeout=timeout) as client:
+        for original_id, requests in jobs:
+            session_id = f"replay-{original_id}-{uuid.uuid4().hex[:8]}"
+            started_at = time.perf_counter()
+            replay_session(client, requests, session_id, samples)
+            busy += time.perf_counter() - started_at
+    turns = sum(len(v) for v in samples.values())
+    return samples, busy, turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recordings", required=True)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=1, help="Parallel workers (one session at a time each)")
+    parser.add_argument("--repeat", type=int, default=1, help="Replays of every recorded session")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--label", help="Suffix for the result file (e.g. the stub latency profile)")
+    parser.add_argument("--compare", help="Baseline result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed p95 regression (fraction)")
+    args = parser.parse_args()
+
+    sessions = load_sessions(args.recordings)
+    if not sessions:
+        sys.exit(f"No recorded sessions in {args.recordings}")
+
+    ensure_bench_user()
+    token = mint_token()
+
+    jobs = [item for _ in range(args.repeat) for item in sessions.items()]
+    per_worker = [jobs[i::args.concurrency] for i in range(args.concurrency)]
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        outcomes = list(pool.map(lambda w: run_worker(args.base_url, token, w, args.timeout), per_worker))
+    wall = time.perf_counter() - started_at
+
+    merged = defaultdict(list)
+    for samples, _, _ in outcomes:
+        for endpoint, values in samples.items():
+            merged[endpoint].extend(values)
+
+    endpoints = {endpoint: summarize([lat for lat, ok in values if ok], sum(1 for _, ok in values if not ok))
+                 for endpoint, values in sorted(merged.items())}
+    rates = [turns / busy for _, busy, turns in outcomes if busy]
+    results = {
+        "sessions": len(sessions),
+        "repeat": args.repeat,
+        "concurrency": args.concurrency,
+        "wall_seconds": round(wall, 2),
+        "turns_per_second_per_worker": round(sum(rates) / len(rates), 3) if rates else 0.0,
+        "endpoints": endpoints,
+    }
+
+    for endpoint, stats in endpoints.items():
+        print(f"{endpoint:24} n={stats['count']:<5} err={stats['errors']:<3} "
+              f"p50={stats['p50_ms']:>8.1f}ms p95={stats['p95_ms']:>8.1f}ms p99={stats['p99_ms']:>8.1f}ms")
+    print(f"turns/s per worker: {results['turns_per_second_per_worker']}  (wall {results['wall_seconds']}s)")
+    print(f"saved {save_results('replay', results, args.label)}")
+
+    if args.compare and not compare_results(args.compare, results, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Deterministic OpenAI-compatible stub LLM server for offline benchmarks.
+
+Responses are looked up in recorded sessions (LLM_RECORD_DIR, see
+app/utils/recorder.py) by the exact request fingerprint; on a miss the
+next recorded response for the same agent is served round-robin, and
+without any recording a minimal schema-valid canned response is used.
+Latency is drawn from a seeded distribution so runs are repeatable.
+
+Usage (from the repository root, same environment as the app):
+    python -m benchmarks.stub_llm --recordings recordings/ --latency lognormal:900,0.4
+    # then start the app with OPENROUTER_BASE_URL=http://127.0.0.1:9100/v1
+
+Latency specs (milliseconds):
+    fixed:800 | uniform:200,1500 | lognormal:<median>,<sigma> | recorded
+"""
+import argparse
+import asyncio
+import glob
+import itertools
+import json
+import math
+import os
+import random
+import time
+from collections import defaultdict
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.utils.recorder import request_fingerprint
+
+_counter = itertools.count(1)
+
+CANNED = {
+    "AgentOutput": lambda n: {
+        "status": "ASK", "phase": "ADDITIONAL", "question": f"Stub question {n}?",
+        "updated_context": {}, "pending_intent": {"type": "ADDITIONAL_INFO"},
+        "additional_questions_asked": 0,
+    },
+    "BrandingAgentOutput": lambda n: {
+        "updated_profile": {"name": "Stub Co"}, "next_question": f"Stub branding question {n}?",
+        "is_complete": False,
+    },
+    "SiteMapResponse": lambda n: {
+        "business_type": "Stub", "pages": [
+            {"name": "Home", "description": "Stub page", "features": ["Overview"], "url": "/"}],
+    },
+    "ScreenDetail": lambda n: {
+        "screen_name": "Home", "complexity": "Low", "notes": "",
+        "prompts": {"developer": "Build it.", "designer": "Design it.", "copywriter": "Write it."},
+    },
+}
+
+
+class LatencyModel:
+    def __init__(self, spec: str, seed: int):
+        self.kind, _, params = spec.partition(":")
+        self.params = [float(p) for p in params.split(",") if p]
+        self.rng = random.Random(seed)
+
+    def sample(self, recorded_ms: float | None) -> float:
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = self.rng.uniform(*self.params)
+        elif self.kind == "lognormal":
+            median, sigma = self.params
+            ms = self.rng.lognormvariate(math.log(median), sigma)
+        elif self.kind == "recorded":
+            ms = recorded_ms if recorded_ms is not None else (self.params or [0])[0]
+        else:
+            raise ValueError(f"Unknown latency spec: {self.kind}")
+        return ms / 1000
+
+
+class Recordings:
+    def __init__(self, directory: str | None):
+        self.by_key = {}
+        self.by_agent = defaultdict(list)
+        self.schema_by_system = {}
+        self._cursors = defaultdict(itertools.count)
+
+        for path in sorted(glob.glob(os.path.join(directory or "", "*.jsonl"))) if directory else []:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    event = json.loads(line)
+                    if event.get("type") != "llm":
+                        continue
+                    self.by_key.setdefault(event["key"], event)
+                    self.by_agent[event["schema"] or event["agent"]].append(event)
+                    if event.get("schema"):
+                        self.schema_by_system[event["system_key"]] = event["schema"]
+
+    def lookup(self, key: str, agent_key: str | None):
+        if key in self.by_key:
+            return self.by_key[key], "hit"
+        events = self.by_agent.get(agent_key)
+        if events:
+            return events[next(self._cursors[agent_key]) % len(events)], "agent"
+        return None, "canned"
+
+
+def create_app(recordings: Recordings, latency: LatencyModel) -> FastAPI:
+    app = FastAPI(title="Stub LLM")
+    stats = defaultdict(int)
+
+    @app.post("/chat/completions")
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        key = request_fingerprint([(m.get("role"), m.get("content")) for m in messages])
+
+        response_format = body.get("response_format") or {}
+        schema = (response_format.get("json_schema") or {}).get("name")
+        if schema is None and messages:
+            system_key = request_fingerprint([(messages[0].get("role"), messages[0].get("content"))])
+            schema = recordings.schema_by_system.get(system_key)
+
+        event, source = recordings.lookup(key, schema)
+        stats[source] += 1
+        n = next(_counter)
+        if event is not None:
+            content = event["response"]
+        else:
+            content = json.dumps(CANNED.get(schema, lambda n: {})(n))
+
+        await asyncio.sleep(latency.sample(event.get("latency_ms") if event else None))
+
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                 "total_tokens": prompt_tokens + len(content) // 4}
+        base = {"id": f"stub-{n}", "created": int(time.time()), "model": body.get("model", "stub")}
+
+        if body.get("stream"):
+            def events():
+                chunk = {**base, "object": "chat.completion.chunk", "choices": [
+                    {"index": 0, "delta": {"role": "assistant", "content": content}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                final = {**base, "object": "chat.completion.chunk", "choices": [
+                    {"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+                yield f"data: {json.dumps(final)}\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return JSONResponse({**base, "object": "chat.completion", "choices": [
+            {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage})
+
+    @app.get("/stats")
+    def get_stats():
+        return dict(stats)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recordings", help="Directory of recorded sessions (*.jsonl)")
+    parser.add_argument("--latency", default="fixed:0")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    app = create_app(Recordings(args.recordings), LatencyModel(args.latency, args.seed))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""index users (created_at, id) for keyset pagination
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY on Postgres: no write lock on a large users table
+    with op.get_context().autocommit_block():
+        op.create_index("ix_users_created_at_id", "users", ["created_at", "id"],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_created_at_id", table_name="users")
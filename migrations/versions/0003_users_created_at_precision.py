@@ -0,0 +1,24 @@
+"""normalize users.created_at precision on SQLite
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # SQLite stores timestamps as text; rows from CURRENT_TIMESTAMP lack the
+    # fraction SQLAlchemy writes and binds, so they sort before cursor values
+    # of the same second. Postgres stores microseconds natively.
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("UPDATE users SET created_at = created_at || '.000000' WHERE length(created_at) = 19")
+
+
+def downgrade() -> None:
+    pass